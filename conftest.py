@@ -0,0 +1,17 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# * Set before `main` is imported by test modules
+_CACHE_DIR = tempfile.mkdtemp(prefix="app-cache-")
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Caches of the application, e.g. `main.item_cache`, are private to the run
+    os.environ["APP_CACHE_DIR"] = _CACHE_DIR
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    shutil.rmtree(_CACHE_DIR, ignore_errors=True)
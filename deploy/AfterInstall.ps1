@@ -3,6 +3,26 @@ $ErrorActionPreference = 'Stop'
 
 Set-Location C:\app
 
+# Runtime stack baked into the AMI (see `infra/install-runtime-stack.yaml.jinja`)
+$uv = 'C:\uv\bin\uv.exe'
+if ((Test-Path $uv) -and (Test-Path C:\app\wheelhouse)) {
+    # Dependency wheels bundled by `scripts/build-and-upload.sh`; no network access
+    & $uv venv --allow-existing
+    if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+    & $uv pip install --offline --no-index --find-links C:\app\wheelhouse `
+        --require-hashes --requirement C:\app\wheelhouse\requirements.txt
+    exit $LASTEXITCODE
+}
+if (Test-Path $uv) {
+    # Dependencies are already in the uv cache; fall back to network if not
+    & $uv sync --frozen --offline --no-default-groups
+    if ($LASTEXITCODE -ne 0) {
+        Write-Warning "Offline sync failed; retrying with network access"
+        & $uv sync --frozen --no-default-groups
+    }
+    exit $LASTEXITCODE
+}
+
 # Install pipx
 # TODO(lasuillard): Command pipx is not recognized in the current session
 #                   Chocolatey Update-SessionEnvironment (refreshenv) also can't help
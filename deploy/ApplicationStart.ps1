@@ -2,12 +2,30 @@ $ErrorActionPreference = 'Stop'
 
 Set-Location C:\app
 
-nssm install MainApplication (Get-Command python).Source -m pipx run uv run --frozen `
-    uvicorn `
-    main:app `
-    --host 0.0.0.0
+# Left over by a stop that failed to clean up
+Remove-Item C:\ProgramData\app\drain -Recurse -Force -ErrorAction SilentlyContinue
+
+# Runtime stack baked into the AMI (see `infra/install-runtime-stack.yaml.jinja`)
+$uv = 'C:\uv\bin\uv.exe'
+if (Test-Path $uv) {
+    nssm install MainApplication $uv run --frozen --no-sync `
+        python -m src.launcher
+} else {
+    nssm install MainApplication (Get-Command python).Source -m pipx run uv run --frozen `
+        python -m src.launcher
+}
 
 nssm set MainApplication AppDirectory C:\app
+# Request metrics in CloudWatch embedded metric format, see `src/metrics.py`,
+# drain requested by `deploy/ApplicationStop.ps1`, see `src/drain.py`, and the
+# response cache, keyed by deployment, see `src/response_cache.py`
+nssm set MainApplication AppEnvironmentExtra `
+    APP_METRICS_EMF_DIR=C:\ProgramData\app\metrics `
+    APP_DRAIN_DIR=C:\ProgramData\app\drain `
+    APP_CACHE_DIR=C:\ProgramData\app\cache `
+    "APP_VERSION=$env:DEPLOYMENT_ID"
+# Worker count and limits are sized to the instance; override with `APP_*`
+# variables, e.g. `nssm set MainApplication AppEnvironmentExtra +APP_WORKERS=2`
 nssm start MainApplication
 Start-Sleep 5
 nssm status MainApplication
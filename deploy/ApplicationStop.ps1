@@ -1,4 +1,22 @@
 $ErrorActionPreference = 'Continue'
 
+# Drain the workers before stopping them, see `src/drain.py`: readiness fails so
+# that the load balancer stops routing requests, then requests in flight complete
+$drain = 'C:\ProgramData\app\drain'
+if ((nssm status MainApplication) -eq 'SERVICE_RUNNING' -and (Test-Path $drain)) {
+    New-Item (Join-Path $drain 'drain') -ItemType File -Force | Out-Null
+    # Drain delay and timeout of the workers, with some margin
+    $deadline = (Get-Date).AddSeconds(60)
+    while ((Get-Date) -lt $deadline) {
+        $states = Get-ChildItem $drain -Filter 'worker-*' | Get-Content
+        if (-not ($states | Where-Object { $_ -ne 'drained' })) {
+            break
+        }
+        Start-Sleep 1
+    }
+    Write-Output "Worker states: $($states -join ', ')"
+}
+
 nssm stop MainApplication
 nssm remove MainApplication confirm
+Remove-Item $drain -Recurse -Force -ErrorAction SilentlyContinue
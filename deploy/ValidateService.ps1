@@ -1,29 +1,23 @@
 $ErrorActionPreference = 'Continue'
 
-$Uri = "http://localhost:8000"
+Set-Location C:\app
 
-# Try up to 100 times (about 300 seconds)
-$maxRetries = 100
-$retryCount = 0
-$sleepDuration = 5
+# Process started by the service, so that the probe gives up as soon as it exits
+$service = Get-CimInstance Win32_Service -Filter "Name='MainApplication'"
+$process = Get-CimInstance Win32_Process -Filter "ParentProcessId=$($service.ProcessId)" |
+    Where-Object { $_.Name -ne 'conhost.exe' } |
+    Select-Object -First 1
+$pidOption = if ($process) { @('--pid', $process.ProcessId) } else { @() }
 
-while ($retryCount -lt $maxRetries) {
-    Write-Host "Attempting health check... ($($retryCount + 1) / $maxRetries)"
-    try {
-        $response = Invoke-WebRequest -Uri $Uri -UseBasicParsing -TimeoutSec 5
-        if ($response.StatusCode -eq 200) {
-            Write-Host "Health check passed."
-            exit 0
-        } else {
-            Write-Host "Health check failed with status code: $($response.StatusCode)"
-        }
-    } catch {
-        Write-Host "Health check failed with exception: $_, retrying in $sleepDuration seconds..."
-    }
-
-    Start-Sleep -Seconds $sleepDuration
-    $retryCount++
+# Polls fast at first then backs off, within the hook timeout; see `src/readiness.py`
+$report = 'C:\ProgramData\app\readiness.json'
+$uv = 'C:\uv\bin\uv.exe'
+if (Test-Path $uv) {
+    & $uv run --frozen --no-sync python -m src.readiness @pidOption --report $report
+} else {
+    python -m pipx run uv run --frozen python -m src.readiness @pidOption --report $report
 }
+$status = $LASTEXITCODE
 
-Write-Host "Health check failed after $maxRetries attempts."
-exit 1
+Get-Content $report
+exit $status
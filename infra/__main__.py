@@ -10,5 +10,6 @@ from infra import (  # noqa: E402, F401
     export,
     github,
     image_builder,
+    launch_template,
     vpc,
 )
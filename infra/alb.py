@@ -61,16 +61,38 @@ target_group = aws.lb.TargetGroup(
     health_check={
         "enabled": True,
         "protocol": "HTTP",
-        "path": "/",
-        "matcher": "200-399",
-        "interval": 30,
-        "timeout": 10,
+        "path": "/readyz",  # Answered ahead of the application, see `src/health.py`
+        "matcher": "200",
+        # Fails within 10 seconds when draining, see `src/drain.py`
+        "interval": 5,
+        "timeout": 4,
         "healthy_threshold": 2,
-        "unhealthy_threshold": 5,
+        "unhealthy_threshold": 2,
     },
     slow_start=60,
     deregistration_delay=60,
 )
+# Metrics of the workers are for scrapers within the VPC only
+aws.lb.ListenerRule(
+    "app-metrics",
+    listener_arn=listener_80.arn,
+    priority=10,
+    conditions=[
+        {
+            "path_pattern": {"values": ["/metrics", "/metrics/*"]},
+        },
+    ],
+    actions=[
+        {
+            "type": "fixed-response",
+            "fixed_response": {
+                "status_code": "404",
+                "content_type": "text/plain",
+                "message_body": "Not Found",
+            },
+        },
+    ],
+)
 aws.lb.ListenerRule(
     "app-8000",
     listener_arn=listener_80.arn,
@@ -0,0 +1,39 @@
+"""Process-wide, memoized AWS context lookups.
+
+Each function performs its provider invoke only once per process (thus once per
+stack run); every later call returns the cached result.
+"""
+
+from functools import cache
+
+import pulumi_aws as aws
+
+
+@cache
+def partition() -> str:
+    """AWS partition of the current provider, e.g. `aws`."""
+    return aws.get_partition().partition
+
+
+@cache
+def region() -> str:
+    """AWS region of the current provider, e.g. `ap-northeast-2`."""
+    return aws.get_region().region
+
+
+@cache
+def account_id() -> str:
+    """AWS account ID of the current caller."""
+    return aws.get_caller_identity().account_id
+
+
+@cache
+def service_role_arn(name: str) -> str:
+    """ARN of an existing (service-linked) IAM role looked up by name."""
+    return aws.iam.get_role(name).arn
+
+
+def cache_clear() -> None:
+    """Forget every memoized lookup; mostly useful for tests."""
+    for lookup in (partition, region, account_id, service_role_arn):
+        lookup.cache_clear()
@@ -6,6 +6,18 @@ from urllib.parse import urlparse
 import pulumi_aws as aws
 from pulumi import ComponentResource, Input, Inputs, ResourceOptions
 
+from . import aws_context
+from .policy_document import policy_document, render_policy_document
+
+_DEFAULT_ASSUME_ROLE_POLICY = render_policy_document(
+    statements=[
+        {
+            "actions": ["sts:AssumeRole"],
+            "principals": [{"type": "AWS", "identifiers": ["*"]}],
+        },
+    ],
+)
+
 
 class Component(ComponentResource, ABC):
     """Custom base class for all component resources."""
@@ -37,21 +49,10 @@ class Role(Component):
     def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: D107
         super().__init__(*args, **kwargs)
 
-        # AWS context
-        self._partition = aws.get_partition().partition
-        self._account_id = aws.get_caller_identity().account_id
-
         # Properties
-        self._assume_role_policy = aws.iam.get_policy_document(
-            statements=[
-                {
-                    "actions": ["sts:AssumeRole"],
-                    "principals": [{"type": "AWS", "identifiers": ["*"]}],
-                },
-            ],
-        )
+        self._assume_role_policy: Input[str] = _DEFAULT_ASSUME_ROLE_POLICY
         self._policy_arns: Sequence[Input[str]] = ()
-        self._policy_documents: Sequence[aws.iam.AwaitableGetPolicyDocumentResult] = ()
+        self._policy_documents: Sequence[Input[str]] = ()
         self._policy_attachment_exclusive: bool = True
 
     def assumable(
@@ -62,7 +63,7 @@ class Role(Component):
         actions: Sequence[Input[str]] = ("sts:AssumeRole", "sts:TagSession"),
     ) -> Self:
         """Specify assume role policy for AWS services or roles."""
-        self._assume_role_policy = aws.iam.get_policy_document(
+        self._assume_role_policy = policy_document(
             statements=[
                 {
                     "effect": "Allow",
@@ -88,7 +89,7 @@ class Role(Component):
         else:
             provider_domain = provider_domain_or_url
 
-        self._assume_role_policy = aws.iam.get_policy_document(
+        self._assume_role_policy = policy_document(
             statements=[
                 {
                     "effect": "Allow",
@@ -96,7 +97,7 @@ class Role(Component):
                         {
                             "type": "Federated",
                             "identifiers": [
-                                f"arn:{self._partition}:iam::{self._account_id}:oidc-provider/{provider_domain}",
+                                f"arn:{aws_context.partition()}:iam::{aws_context.account_id()}:oidc-provider/{provider_domain}",
                             ],
                         },
                     ],
@@ -122,22 +123,21 @@ class Role(Component):
         self,
         *,
         arns: Sequence[Input[str]] = (),
-        documents: Sequence[dict | aws.iam.AwaitableGetPolicyDocumentResult] = (),
+        documents: Sequence[dict | Input[str]] = (),
         exclusive: bool = True,
     ) -> Self:
         """Specify policies to attach to the role.
 
         Args:
             arns: The ARNs of the policies to attach.
-            documents: The policy documents to create and attach.
+            documents: The policy documents to create and attach, either as
+                `aws.iam.get_policy_document` arguments or JSON strings.
             exclusive: Whether to use exclusive policy attachment.
 
         """
         self._policy_arns = arns
         self._policy_documents = [
-            aws.iam.get_policy_document(**document)
-            if isinstance(document, dict)
-            else document
+            policy_document(**document) if isinstance(document, dict) else document
             for document in documents
         ]
         self._policy_attachment_exclusive = exclusive
@@ -148,17 +148,17 @@ class Role(Component):
         role = aws.iam.Role(
             self._name,
             opts=ResourceOptions(parent=self),
-            assume_role_policy=self._assume_role_policy.json,
+            assume_role_policy=self._assume_role_policy,
             **self._kwargs,
         )
 
         # Create document policies
         document_policy_arns: list[Input[str]] = []
-        for idx, policy_document in enumerate(self._policy_documents):
+        for idx, document in enumerate(self._policy_documents):
             policy = aws.iam.Policy(
                 f"{self._name}-inline-{idx}",
                 opts=ResourceOptions(parent=self),
-                policy=policy_document.json,
+                policy=document,
             )
             document_policy_arns.append(policy.arn)
 
@@ -0,0 +1,56 @@
+from collections import Counter
+from collections.abc import Iterator
+from typing import Any
+
+import pulumi
+import pytest
+
+from . import aws_context
+
+
+class InvokeCountingMocks(pulumi.runtime.Mocks):
+    """Pulumi mocks that record resources and count provider invokes by token."""
+
+    def __init__(self) -> None:
+        self.invokes: Counter[str] = Counter()
+        self.resources: list[pulumi.runtime.MockResourceArgs] = []
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs) -> tuple[str, dict]:
+        self.resources.append(args)
+        return f"{args.name}-id", {**args.inputs, "arn": f"arn:aws:mock::{args.name}"}
+
+    def call(self, args: pulumi.runtime.MockCallArgs) -> dict:
+        self.invokes[args.token] += 1
+        return _INVOKE_RESULTS.get(args.token, lambda _: {})(args.args)
+
+
+_INVOKE_RESULTS: dict[str, Any] = {
+    "aws:index/getPartition:getPartition": lambda _: {
+        "partition": "aws",
+        "dnsSuffix": "amazonaws.com",
+    },
+    "aws:index/getRegion:getRegion": lambda _: {
+        "region": "ap-northeast-2",
+        "name": "ap-northeast-2",
+    },
+    "aws:index/getCallerIdentity:getCallerIdentity": lambda _: {
+        "accountId": "123456789012",
+        "arn": "arn:aws:iam::123456789012:user/mock",
+        "userId": "mock",
+    },
+    "aws:iam/getRole:getRole": lambda args: {
+        "name": args["name"],
+        "arn": f"arn:aws:iam::123456789012:role/{args['name']}",
+    },
+    "aws:iam/getPolicyDocument:getPolicyDocument": lambda _: {"json": "{}"},
+}
+
+
+@pytest.fixture
+def pulumi_mocks() -> Iterator[InvokeCountingMocks]:
+    """Install Pulumi mocks with an empty AWS context cache."""
+    mocks = InvokeCountingMocks()
+    pulumi.runtime.set_mocks(mocks, preview=False)
+    aws_context.cache_clear()
+    yield mocks
+    aws_context.cache_clear()
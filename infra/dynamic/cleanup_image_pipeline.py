@@ -1,9 +1,29 @@
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from pulumi import Input, ResourceOptions, log
 from pulumi.dynamic import CreateResult, Resource, ResourceProvider
 
+# Upper bound of concurrent delete calls; kept below botocore's default HTTP pool
+_MAX_WORKERS = 8
+
+# EC2 accepts up to 200 values per filter
+_MAX_FILTER_VALUES = 200
+
+# Errors meaning the resource is already gone, e.g. deleted by a previous attempt
+_NOT_FOUND_ERROR_CODES = frozenset(
+    {
+        "InvalidAMIID.NotFound",
+        "InvalidAMIID.Unavailable",
+        "InvalidSnapshot.NotFound",
+        "ResourceNotFoundException",
+    },
+)
+
 
 class _Provider(ResourceProvider):
     def create(self, props: Any) -> CreateResult:
@@ -11,60 +31,163 @@ class _Provider(ResourceProvider):
 
     def delete(self, _id: str, props: Any) -> None:
         session = boto3.Session(region_name=props.get("region", None))
-        ec2, imagebuilder = session.client("ec2"), session.client("imagebuilder")
+        config = Config(
+            max_pool_connections=_MAX_WORKERS,
+            retries={"mode": "adaptive"},
+        )
+        delete_image_pipeline_outputs(
+            session.client("ec2", config=config),
+            session.client("imagebuilder", config=config),
+            _id,
+        )
+
 
-        # Lookup Image Builder images to find AMIs and snapshots to delete
-        images = imagebuilder.list_images(
-            filters=[{"name": "name", "values": [_id]}],
+def delete_image_pipeline_outputs(
+    ec2: Any,
+    imagebuilder: Any,
+    image_name: str,
+    *,
+    max_workers: int = _MAX_WORKERS,
+) -> None:
+    """Delete every image, AMI and snapshot built for given image name.
+
+    Lookups walk all pages. Deletes run on a bounded thread pool in three phases,
+    AMIs, snapshots then Image Builder images, and a phase starts only if the
+    previous one fully succeeded. Resources already deleted are skipped, so a
+    failed run can simply be retried.
+    """
+    # Lookup Image Builder images to find AMIs and snapshots to delete
+    image_arns = [
+        v["arn"]
+        for page in imagebuilder.get_paginator("list_images").paginate(
+            filters=[{"name": "name", "values": [image_name]}],
         )
-        image_arns = [v["arn"] for v in images["imageVersionList"]]
-        image_arn_patterns = [f"{arn}/*" for arn in image_arns]
-        log.info(f"Image ARNs to delete: {image_arns}")
+        for v in page["imageVersionList"]
+    ]
+    image_arn_patterns = [f"{arn}/*" for arn in image_arns]
+    log.info(f"Image ARNs to delete: {image_arns}")
 
-        # AMIs to delete
-        amis = ec2.describe_images(
-            Filters=[
-                {"Name": "tag:CreatedBy", "Values": ["EC2 Image Builder"]},
-                {"Name": "tag:Ec2ImageBuilderArn", "Values": image_arn_patterns},
-            ],
+    # AMIs to delete
+    ami_ids = [
+        img["ImageId"]
+        for page in _paginate_by_tags(
+            ec2, "describe_images", image_arn_patterns, Owners=["self"]
+        )
+        for img in page["Images"]
+    ]
+    log.info(f"AMIs to delete: {ami_ids}")
+
+    # Snapshots to delete
+    snapshot_ids = [
+        snap["SnapshotId"]
+        for page in _paginate_by_tags(
+            ec2, "describe_snapshots", image_arn_patterns, OwnerIds=["self"]
         )
-        ami_ids = [img["ImageId"] for img in amis["Images"]]
-        log.info(f"AMIs to delete: {ami_ids}")
+        for snap in page["Snapshots"]
+    ]
+    log.info(f"Snapshots to delete: {snapshot_ids}")
 
-        # Snapshots to delete
-        snapshots = ec2.describe_snapshots(
+    # Image build versions to delete
+    image_build_version_arns = [
+        v["arn"]
+        for image_arn in image_arns
+        for page in imagebuilder.get_paginator("list_image_build_versions").paginate(
+            imageVersionArn=image_arn,
+        )
+        for v in page["imageSummaryList"]
+    ]
+    log.info(f"Image build versions to delete: {image_build_version_arns}")
+
+    # Delete resources
+    with ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix="cleanup-image-pipeline",
+    ) as executor:
+        _delete_all(
+            executor,
+            "AMI",
+            lambda v: ec2.deregister_image(ImageId=v),
+            ami_ids,
+        )
+        _delete_all(
+            executor,
+            "snapshot",
+            lambda v: ec2.delete_snapshot(SnapshotId=v),
+            snapshot_ids,
+        )
+
+        # * Delete images at last for cases of partial failures; if image is deleted,
+        # * we can't find AMIs and snapshots to delete
+        _delete_all(
+            executor,
+            "image build version",
+            lambda v: imagebuilder.delete_image(imageBuildVersionArn=v),
+            image_build_version_arns,
+        )
+
+    log.info("Resources deleted successfully.")
+
+
+def _paginate_by_tags(
+    ec2: Any,
+    operation: str,
+    image_arn_patterns: Sequence[str],
+    **kwargs: Any,
+) -> Iterator[dict]:
+    """Paginate EC2 resources tagged by Image Builder for given image ARNs."""
+    paginator = ec2.get_paginator(operation)
+    for start in range(0, len(image_arn_patterns), _MAX_FILTER_VALUES):
+        yield from paginator.paginate(
             Filters=[
                 {"Name": "tag:CreatedBy", "Values": ["EC2 Image Builder"]},
-                {"Name": "tag:Ec2ImageBuilderArn", "Values": image_arn_patterns},
+                {
+                    "Name": "tag:Ec2ImageBuilderArn",
+                    "Values": image_arn_patterns[start : start + _MAX_FILTER_VALUES],
+                },
             ],
+            **kwargs,
         )
-        snapshot_ids = [snap["SnapshotId"] for snap in snapshots["Snapshots"]]
-        log.info(f"Snapshots to delete: {snapshot_ids}")
 
-        # Delete resources
-        for ami_id in ami_ids:
-            log.info(f"Deregistering AMI: {ami_id}")
-            ec2.deregister_image(ImageId=ami_id)
 
-        for snapshot_id in snapshot_ids:
-            log.info(f"Deleting snapshot: {snapshot_id}")
-            ec2.delete_snapshot(SnapshotId=snapshot_id)
+def _delete_all(
+    executor: ThreadPoolExecutor,
+    kind: str,
+    delete: Callable[[str], Any],
+    resource_ids: Sequence[str],
+) -> None:
+    """Delete resources concurrently, raising once all attempts are done."""
+    errors = executor.map(lambda v: _try_delete(kind, delete, v), resource_ids)
+    failures = [
+        (resource_id, err)
+        for resource_id, err in zip(resource_ids, errors, strict=True)
+        if err is not None
+    ]
+    if failures:
+        msg = (
+            f"Failed to delete {len(failures)} of {len(resource_ids)} {kind}(s),"
+            f" retry to resume: {failures}"
+        )
+        raise RuntimeError(msg)
 
-        # * Delete images at last for cases of partial failures; if image is deleted,
-        # * we can't find AMIs and snapshots to delete
-        for image_arn in image_arns:
-            log.info(f"Deleting image builder image: {image_arn}")
-            image_build_versions = imagebuilder.list_image_build_versions(
-                imageVersionArn=image_arn,
-            )
-            image_build_version_arns = [
-                v["arn"] for v in image_build_versions["imageSummaryList"]
-            ]
-            for image_build_version_arn in image_build_version_arns:
-                log.info(f"Deleting image build version: {image_build_version_arn}")
-                imagebuilder.delete_image(imageBuildVersionArn=image_build_version_arn)
-
-        log.info("Resources deleted successfully.")
+
+def _try_delete(
+    kind: str,
+    delete: Callable[[str], Any],
+    resource_id: str,
+) -> Exception | None:
+    """Delete a resource, returning the error instead of raising it."""
+    log.info(f"Deleting {kind}: {resource_id}")
+    try:
+        delete(resource_id)
+    except ClientError as err:
+        if err.response.get("Error", {}).get("Code") in _NOT_FOUND_ERROR_CODES:
+            log.info(f"{kind} already deleted: {resource_id}")
+            return None
+
+        log.warn(f"Failed to delete {kind} {resource_id}: {err}")
+        return err
+
+    return None
 
 
 class CleanupImagePipeline(Resource):
@@ -0,0 +1,227 @@
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+from .cleanup_image_pipeline import delete_image_pipeline_outputs
+
+IMAGE_ARN = "arn:aws:imagebuilder:ap-northeast-2:123456789012:image/app/1.0.0"
+FILTERS = [
+    {"Name": "tag:CreatedBy", "Values": ["EC2 Image Builder"]},
+    {"Name": "tag:Ec2ImageBuilderArn", "Values": [f"{IMAGE_ARN}/*"]},
+]
+DELETE_OPERATIONS = ("DeregisterImage", "DeleteSnapshot", "DeleteImage")
+
+
+class _Clients:
+    def __init__(self) -> None:
+        session = boto3.Session(
+            region_name="ap-northeast-2",
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+        )
+        self.ec2 = session.client("ec2")
+        self.imagebuilder = session.client("imagebuilder")
+        self.ec2_stub = Stubber(self.ec2)
+        self.imagebuilder_stub = Stubber(self.imagebuilder)
+        self.calls: list[tuple[str, dict]] = []
+        self._lock = threading.Lock()
+        self.latency = 0.0
+
+        # Record calls and simulate network latency before the stubbed response
+        for client in (self.ec2, self.imagebuilder):
+            client.meta.events.register("provide-client-params.*.*", self._record)
+
+    def _record(self, params: dict, model: Any, **_kwargs: Any) -> None:
+        with self._lock:
+            self.calls.append((model.name, params))
+
+        if model.name in DELETE_OPERATIONS:
+            time.sleep(self.latency)
+
+    def names(self, operation: str) -> list[str]:
+        return [name for name, _ in self.calls if name == operation]
+
+
+@pytest.fixture
+def clients() -> Iterator[_Clients]:
+    clients = _Clients()
+    with clients.ec2_stub, clients.imagebuilder_stub:
+        yield clients
+
+    clients.ec2_stub.assert_no_pending_responses()
+    clients.imagebuilder_stub.assert_no_pending_responses()
+
+
+def _stub_lookups(
+    clients: _Clients,
+    amis: list[str],
+    snapshots: list[str],
+    build_versions: list[str],
+    *,
+    page_size: int,
+) -> None:
+    """Stub paginated lookup responses, `page_size` items per page."""
+
+    def pages(items: list[str]) -> Iterator[tuple[list[str], str | None, str | None]]:
+        """Yield each page with its next token and the token used to request it."""
+        chunks = [items[i : i + page_size] for i in range(0, len(items), page_size)]
+        for idx, chunk in enumerate(chunks or [[]]):
+            next_token = f"token-{idx + 1}" if idx + 1 < len(chunks) else None
+            yield chunk, next_token, f"token-{idx}" if idx else None
+
+    def ec2_tokens(next_token: str | None, token: str | None) -> tuple[dict, dict]:
+        return (
+            {"NextToken": next_token} if next_token else {},
+            {"NextToken": token} if token else {},
+        )
+
+    clients.imagebuilder_stub.add_response(
+        "list_images",
+        {"imageVersionList": [{"arn": IMAGE_ARN}]},
+        {"filters": [{"name": "name", "values": ["app"]}]},
+    )
+    for chunk, next_token, token in pages(amis):
+        response, request = ec2_tokens(next_token, token)
+        clients.ec2_stub.add_response(
+            "describe_images",
+            {"Images": [{"ImageId": v} for v in chunk], **response},
+            {"Filters": FILTERS, "Owners": ["self"], **request},
+        )
+    for chunk, next_token, token in pages(snapshots):
+        response, request = ec2_tokens(next_token, token)
+        clients.ec2_stub.add_response(
+            "describe_snapshots",
+            {"Snapshots": [{"SnapshotId": v} for v in chunk], **response},
+            {"Filters": FILTERS, "OwnerIds": ["self"], **request},
+        )
+    for chunk, next_token, token in pages(build_versions):
+        clients.imagebuilder_stub.add_response(
+            "list_image_build_versions",
+            {
+                "imageSummaryList": [{"arn": v} for v in chunk],
+                **({"nextToken": next_token} if next_token else {}),
+            },
+            {
+                "imageVersionArn": IMAGE_ARN,
+                **({"nextToken": token} if token else {}),
+            },
+        )
+
+
+def _stub_deletes(
+    clients: _Clients,
+    amis: list[str],
+    snapshots: list[str],
+    build_versions: list[str],
+) -> None:
+    # Deletes run concurrently, so responses are matched by operation only
+    for _ in amis:
+        clients.ec2_stub.add_response("deregister_image", {}, {"ImageId": ANY})
+    for _ in snapshots:
+        clients.ec2_stub.add_response("delete_snapshot", {}, {"SnapshotId": ANY})
+    for _ in build_versions:
+        clients.imagebuilder_stub.add_response(
+            "delete_image",
+            {},
+            {"imageBuildVersionArn": ANY},
+        )
+
+
+@pytest.mark.unit
+def test_delete_walks_every_page(clients: _Clients) -> None:
+    amis = [f"ami-{i:08x}" for i in range(7)]
+    snapshots = [f"snap-{i:08x}" for i in range(7)]
+    build_versions = [f"{IMAGE_ARN}/{i}" for i in range(1, 8)]
+    _stub_lookups(clients, amis, snapshots, build_versions, page_size=3)
+    _stub_deletes(clients, amis, snapshots, build_versions)
+
+    delete_image_pipeline_outputs(clients.ec2, clients.imagebuilder, "app")
+
+    deleted = [params for name, params in clients.calls if name in DELETE_OPERATIONS]
+    assert sorted(p["ImageId"] for p in deleted if "ImageId" in p) == amis
+    assert sorted(p["SnapshotId"] for p in deleted if "SnapshotId" in p) == snapshots
+    assert sorted(
+        p["imageBuildVersionArn"] for p in deleted if "imageBuildVersionArn" in p
+    ) == sorted(build_versions)
+
+
+@pytest.mark.unit
+def test_delete_deletes_images_last(clients: _Clients) -> None:
+    amis, snapshots = ["ami-1", "ami-2"], ["snap-1", "snap-2"]
+    build_versions = [f"{IMAGE_ARN}/1", f"{IMAGE_ARN}/2"]
+    _stub_lookups(clients, amis, snapshots, build_versions, page_size=10)
+    _stub_deletes(clients, amis, snapshots, build_versions)
+
+    delete_image_pipeline_outputs(clients.ec2, clients.imagebuilder, "app")
+
+    operations = [name for name, _ in clients.calls if name in DELETE_OPERATIONS]
+    assert operations == [
+        "DeregisterImage",
+        "DeregisterImage",
+        "DeleteSnapshot",
+        "DeleteSnapshot",
+        "DeleteImage",
+        "DeleteImage",
+    ]
+
+
+@pytest.mark.unit
+def test_delete_partial_failure_keeps_images(clients: _Clients) -> None:
+    _stub_lookups(
+        clients,
+        ["ami-1", "ami-2", "ami-3"],
+        ["snap-1"],
+        [f"{IMAGE_ARN}/1"],
+        page_size=10,
+    )
+    clients.ec2_stub.add_response("deregister_image", {}, {"ImageId": ANY})
+    clients.ec2_stub.add_client_error(
+        "deregister_image",
+        service_error_code="InvalidAMIID.NotFound",
+        expected_params={"ImageId": ANY},
+    )
+    clients.ec2_stub.add_client_error(
+        "deregister_image",
+        service_error_code="RequestLimitExceeded",
+        expected_params={"ImageId": ANY},
+    )
+
+    with pytest.raises(RuntimeError, match="Failed to delete 1 of 3 AMI"):
+        delete_image_pipeline_outputs(
+            clients.ec2,
+            clients.imagebuilder,
+            "app",
+            max_workers=1,
+        )
+
+    # Snapshots and images are left for the retry to find
+    assert not clients.names("DeleteSnapshot")
+    assert not clients.names("DeleteImage")
+
+
+@pytest.mark.benchmark
+def test_delete_throughput(clients: _Clients) -> None:
+    count, latency, max_workers = 24, 0.05, 8
+    amis = [f"ami-{i:08x}" for i in range(count)]
+    snapshots = [f"snap-{i:08x}" for i in range(count)]
+    build_versions = [f"{IMAGE_ARN}/{i}" for i in range(count)]
+    _stub_lookups(clients, amis, snapshots, build_versions, page_size=10)
+    _stub_deletes(clients, amis, snapshots, build_versions)
+    clients.latency = latency
+
+    started = time.perf_counter()
+    delete_image_pipeline_outputs(
+        clients.ec2,
+        clients.imagebuilder,
+        "app",
+        max_workers=max_workers,
+    )
+    elapsed = time.perf_counter() - started
+
+    # Sequential deletes take at least `3 * count * latency`
+    assert elapsed < 3 * count * latency / 2
@@ -0,0 +1,271 @@
+from collections.abc import Iterator
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+from .trigger_image_pipeline import _client_token, _Provider, wait_for_image
+
+PIPELINE_ARN = "arn:aws:imagebuilder:ap-northeast-2:123456789012:image-pipeline/app"
+IMAGE_ARN = "arn:aws:imagebuilder:ap-northeast-2:123456789012:image/app/1.0.0/1"
+PROPS = {
+    "image_pipeline_arn": PIPELINE_ARN,
+    "client_token": "initial-build",
+    "region": "ap-northeast-2",
+    "revision": "1.0.12345",
+    "wait": True,
+    "wait_timeout": None,
+}
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def imagebuilder() -> Iterator[tuple[object, Stubber]]:
+    client = boto3.Session(
+        region_name="ap-northeast-2",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    ).client("imagebuilder")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def _add_image(
+    stubber: Stubber,
+    status: str,
+    arn: str = IMAGE_ARN,
+    **image: object,
+) -> None:
+    stubber.add_response(
+        "get_image",
+        {"image": {"arn": arn, "state": {"status": status}, **image}},
+        {"imageBuildVersionArn": arn},
+    )
+
+
+def _add_start(stubber: Stubber, arn: str = IMAGE_ARN, token: object = ANY) -> None:
+    stubber.add_response(
+        "start_image_pipeline_execution",
+        {"imageBuildVersionArn": arn},
+        {"imagePipelineArn": PIPELINE_ARN, "clientToken": token},
+    )
+
+
+@pytest.mark.unit
+def test_wait_for_image_backs_off_until_available(
+    imagebuilder: tuple[object, Stubber],
+) -> None:
+    client, stubber = imagebuilder
+    for status in ("PENDING", "BUILDING", "BUILDING", "BUILDING", "DISTRIBUTING"):
+        _add_image(stubber, status)
+    _add_image(
+        stubber,
+        "AVAILABLE",
+        outputResources={"amis": [{"region": "ap-northeast-2", "image": "ami-1"}]},
+    )
+    clock = _FakeClock()
+
+    image = wait_for_image(
+        client,
+        IMAGE_ARN,
+        timeout=3600,
+        initial_delay=10,
+        max_delay=60,
+        sleep=clock.sleep,
+        clock=clock,
+    )
+
+    assert image["outputResources"]["amis"][0]["image"] == "ami-1"
+    assert len(clock.sleeps) == 5
+    assert all(10 <= v <= 60 for v in clock.sleeps)
+    # Upper bounds grow exponentially: 10, 20, 40, 60 (capped), 60
+    assert clock.sleeps[0] == 10
+    assert clock.sleeps[1] <= 20
+    assert clock.sleeps[2] <= 40
+
+
+@pytest.mark.unit
+def test_wait_for_image_failed(imagebuilder: tuple[object, Stubber]) -> None:
+    client, stubber = imagebuilder
+    stubber.add_response(
+        "get_image",
+        {"image": {"state": {"status": "FAILED", "reason": "Step failed"}}},
+        {"imageBuildVersionArn": IMAGE_ARN},
+    )
+
+    with pytest.raises(RuntimeError, match="FAILED: Step failed"):
+        wait_for_image(client, IMAGE_ARN, sleep=lambda _: None)
+
+
+@pytest.mark.unit
+def test_wait_for_image_timeout(imagebuilder: tuple[object, Stubber]) -> None:
+    client, stubber = imagebuilder
+    # Polls at 0, 10, 20, 30 and 35 seconds
+    for _ in range(5):
+        _add_image(stubber, "BUILDING")
+    clock = _FakeClock()
+
+    with pytest.raises(TimeoutError, match="last status: BUILDING"):
+        wait_for_image(
+            client,
+            IMAGE_ARN,
+            timeout=35,
+            initial_delay=10,
+            max_delay=10,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+    # Never sleeps past the deadline
+    assert clock.now == 35
+
+
+@pytest.mark.unit
+def test_create_outputs_ami_ids(
+    monkeypatch: pytest.MonkeyPatch,
+    imagebuilder: tuple[object, Stubber],
+) -> None:
+    client, stubber = imagebuilder
+    _add_start(stubber)
+    _add_image(stubber, "PENDING")
+    _add_image(
+        stubber,
+        "AVAILABLE",
+        outputResources={
+            "amis": [
+                {"region": "us-east-1", "image": "ami-us"},
+                {"region": "ap-northeast-2", "image": "ami-kr"},
+            ],
+        },
+    )
+    monkeypatch.setattr(boto3.Session, "client", lambda *_args, **_kwargs: client)
+
+    result = _Provider().create(PROPS)
+
+    assert result.outs is not None
+    assert result.outs["image_build_version_arn"] == IMAGE_ARN
+    assert result.outs["ami_ids"] == ["ami-us", "ami-kr"]
+    assert result.outs["ami_id"] == "ami-kr"
+
+
+@pytest.mark.unit
+def test_diff_identical_inputs_no_rebuild() -> None:
+    olds = {**PROPS, "ami_id": "ami-1", "ami_ids": ["ami-1"], "__provider": "old"}
+    news = {**PROPS, "__provider": "new"}
+
+    result = _Provider().diff("id", olds, news)
+
+    assert result.changes is False
+    assert result.replaces == []
+
+
+@pytest.mark.unit
+def test_diff_wait_options_no_rebuild() -> None:
+    result = _Provider().diff("id", PROPS, {**PROPS, "wait": False, "wait_timeout": 60})
+
+    assert result.changes is False
+    assert result.replaces == []
+
+
+@pytest.mark.unit
+def test_diff_changed_pipeline_rebuild() -> None:
+    key = "image_pipeline_arn"
+    result = _Provider().diff("id", PROPS, {**PROPS, key: f"{PIPELINE_ARN}-2"})
+
+    assert result.changes is True
+    assert result.replaces == [key]
+    assert result.delete_before_replace is False
+
+
+@pytest.mark.unit
+def test_diff_changed_revision_update() -> None:
+    result = _Provider().diff("id", PROPS, {**PROPS, "revision": "1.0.67890"})
+
+    assert result.changes is True
+    assert result.replaces == []
+
+
+@pytest.mark.unit
+def test_update_starts_build_without_waiting(
+    monkeypatch: pytest.MonkeyPatch,
+    imagebuilder: tuple[object, Stubber],
+) -> None:
+    client, stubber = imagebuilder
+    new_image_arn = IMAGE_ARN.replace("1.0.0/1", "1.0.1/1")
+    _add_start(stubber, new_image_arn)
+    _add_image(stubber, "PENDING", new_image_arn)
+    monkeypatch.setattr(boto3.Session, "client", lambda *_args, **_kwargs: client)
+    olds = {**PROPS, "ami_id": "ami-1", "ami_ids": ["ami-1"]}
+
+    result = _Provider().update("id", olds, {**PROPS, "revision": "1.0.67890"})
+
+    assert result.outs is not None
+    assert result.outs["image_build_version_arn"] == new_image_arn
+    assert result.outs["revision"] == "1.0.67890"
+    # Still the AMI of the initial build
+    assert result.outs["ami_id"] == "ami-1"
+
+
+@pytest.mark.unit
+def test_start_skips_failed_attempts(
+    monkeypatch: pytest.MonkeyPatch,
+    imagebuilder: tuple[object, Stubber],
+) -> None:
+    client, stubber = imagebuilder
+    retried_image_arn = IMAGE_ARN.replace("/1", "/2")
+    # The execution of the first attempt, e.g. started before an interruption
+    _add_start(stubber, token=_client_token("initial-build", "1.0.12345", 0))
+    _add_image(stubber, "FAILED")
+    _add_start(
+        stubber, retried_image_arn, _client_token("initial-build", "1.0.12345", 1)
+    )
+    _add_image(stubber, "BUILDING", retried_image_arn)
+    monkeypatch.setattr(boto3.Session, "client", lambda *_args, **_kwargs: client)
+
+    result = _Provider().update("id", PROPS, {**PROPS, "wait": False})
+
+    assert result.outs is not None
+    assert result.outs["image_build_version_arn"] == retried_image_arn
+
+
+@pytest.mark.unit
+def test_start_reuses_running_execution(
+    monkeypatch: pytest.MonkeyPatch,
+    imagebuilder: tuple[object, Stubber],
+) -> None:
+    client, stubber = imagebuilder
+    token = _client_token("initial-build", "1.0.12345", 0)
+    # Retried requests are answered with the same execution, not a new build
+    for _ in range(2):
+        _add_start(stubber, token=token)
+        _add_image(stubber, "BUILDING")
+    monkeypatch.setattr(boto3.Session, "client", lambda *_args, **_kwargs: client)
+
+    first = _Provider().update("id", PROPS, {**PROPS, "wait": False})
+    second = _Provider().update("id", PROPS, {**PROPS, "wait": False})
+
+    assert first.outs == second.outs
+
+
+@pytest.mark.unit
+def test_client_token_per_revision_and_attempt() -> None:
+    token = _client_token("initial-build", "1.0.1", 1)
+
+    assert token == _client_token("initial-build", "1.0.1", 1)
+    assert token != _client_token("initial-build", "1.0.2", 1)
+    # Another attempt, after a failed one, is a new execution
+    assert token != _client_token("initial-build", "1.0.1", 2)
+    assert len(_client_token("a" * 64, "1.0.1", 1)) == 36
@@ -1,29 +1,186 @@
+import random
+import time
+import uuid
+from collections.abc import Callable
 from typing import Any
 
 import boto3
-from pulumi import Input, ResourceOptions
-from pulumi.dynamic import CreateResult, Resource, ResourceProvider
+from pulumi import Input, Output, ResourceOptions, log
+from pulumi.dynamic import (
+    CreateResult,
+    DiffResult,
+    Resource,
+    ResourceProvider,
+    UpdateResult,
+)
+
+# Image Builder image states
+_SUCCEEDED_STATES = frozenset({"AVAILABLE"})
+_FAILED_STATES = frozenset({"CANCELLED", "FAILED", "DELETED", "DEPRECATED", "DISABLED"})
+
+# Polling backoff, in seconds; a Windows image build takes about an hour
+_DEFAULT_WAIT_TIMEOUT = 2 * 60 * 60
+_INITIAL_POLL_DELAY = 15
+_MAX_POLL_DELAY = 5 * 60
+
+# Inputs that require a new, initial pipeline execution when changed
+_REPLACE_ON_CHANGES = ("image_pipeline_arn", "client_token", "region")
 
 
 class _Provider(ResourceProvider):
-    def create(self, props: Any) -> CreateResult:
-        client_token = props["client_token"]
+    def diff(self, _id: str, olds: Any, news: Any) -> DiffResult:
+        # * Waiting options do not affect the built image; the build is started
+        # * again only if the pipeline or the revision of its inputs has changed
+        replaces = [
+            key for key in _REPLACE_ON_CHANGES if olds.get(key) != news.get(key)
+        ]
+        return DiffResult(
+            changes=bool(replaces) or olds.get("revision") != news.get("revision"),
+            replaces=replaces,
+            delete_before_replace=False,
+        )
 
+    def create(self, props: Any) -> CreateResult:
         session = boto3.Session(region_name=props.get("region", None))
         imagebuilder = session.client("imagebuilder")
+        client_token, image_build_version_arn = _start(imagebuilder, props)
+
+        amis: list[dict] = []
+        if props.get("wait"):
+            image = wait_for_image(
+                imagebuilder,
+                image_build_version_arn,
+                timeout=props.get("wait_timeout") or _DEFAULT_WAIT_TIMEOUT,
+            )
+            amis = image.get("outputResources", {}).get("amis", [])
+
+        region = session.region_name
+        return CreateResult(
+            id_=client_token,
+            outs={
+                **props,
+                "image_build_version_arn": image_build_version_arn,
+                "ami_ids": [ami["image"] for ami in amis],
+                "ami_id": next(
+                    (ami["image"] for ami in amis if ami.get("region") == region),
+                    amis[0]["image"] if amis else None,
+                ),
+            },
+        )
+
+    def update(self, _id: str, olds: Any, news: Any) -> UpdateResult:
+        # * Only the initial build is awaited; builds of later revisions reach the
+        # * launch template through the distribution configuration
+        session = boto3.Session(region_name=news.get("region", None))
+        _, image_build_version_arn = _start(session.client("imagebuilder"), news)
+        return UpdateResult(
+            outs={
+                **news,
+                "image_build_version_arn": image_build_version_arn,
+                "ami_ids": olds.get("ami_ids") or [],
+                "ami_id": olds.get("ami_id"),
+            },
+        )
+
+
+def _start(imagebuilder: Any, props: Any) -> tuple[str, str]:
+    """Start a pipeline execution, returning its client token and image ARN.
+
+    Tokens are derived from the inputs, so that a retried request returns the
+    execution already started. Attempts whose execution has failed are skipped,
+    starting a new one.
+    """
+    attempt = 0
+    while True:
+        client_token = _client_token(
+            props["client_token"], props.get("revision"), attempt
+        )
         response = imagebuilder.start_image_pipeline_execution(
             imagePipelineArn=props["image_pipeline_arn"],
             clientToken=client_token,
         )
+        image_build_version_arn = response["imageBuildVersionArn"]
+        image = imagebuilder.get_image(imageBuildVersionArn=image_build_version_arn)
+        status = image["image"].get("state", {}).get("status")
+        if status not in _FAILED_STATES:
+            return client_token, image_build_version_arn
 
-        return CreateResult(
-            id_=client_token,
-            outs={"image_build_version_arn": response["imageBuildVersionArn"], **props},
-        )
+        log.info(f"Image build {image_build_version_arn} {status}, starting another")
+        attempt += 1
+
+
+def _client_token(client_token: str, revision: str | None, attempt: int) -> str:
+    """Idempotency token for a pipeline execution, unique per revision and attempt."""
+    # Tokens are limited to 36 characters, the length of an UUID
+    return str(
+        uuid.uuid5(uuid.NAMESPACE_URL, f"{client_token}/{revision or ''}/{attempt}")
+    )
+
+
+def wait_for_image(
+    imagebuilder: Any,
+    image_build_version_arn: str,
+    *,
+    timeout: float = _DEFAULT_WAIT_TIMEOUT,
+    initial_delay: float = _INITIAL_POLL_DELAY,
+    max_delay: float = _MAX_POLL_DELAY,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> dict:
+    """Poll `get_image` until the image build completes and return the image.
+
+    Delays grow exponentially from `initial_delay` up to `max_delay`, with random
+    jitter, and never sleep past the deadline.
+
+    Raises:
+        RuntimeError: If the build ends in a failed state.
+        TimeoutError: If the build does not complete within `timeout` seconds.
+
+    """
+    deadline = clock() + timeout
+    attempt = 0
+    while True:
+        image = imagebuilder.get_image(imageBuildVersionArn=image_build_version_arn)
+        image = image["image"]
+        state = image.get("state", {})
+        status = state.get("status")
+        log.info(f"Image {image_build_version_arn} status: {status}")
+        if status in _SUCCEEDED_STATES:
+            return image
+
+        if status in _FAILED_STATES:
+            msg = (
+                f"Image build {image_build_version_arn} ended with status {status}:"
+                f" {state.get('reason')}"
+            )
+            raise RuntimeError(msg)
+
+        remaining = deadline - clock()
+        if remaining <= 0:
+            msg = (
+                f"Image build {image_build_version_arn} did not complete within"
+                f" {timeout} seconds (last status: {status})"
+            )
+            raise TimeoutError(msg)
+
+        backoff = min(max_delay, initial_delay * 2**attempt)
+        sleep(min(remaining, random.uniform(initial_delay, backoff)))
+        attempt += 1
 
 
 class TriggerImagePipeline(Resource):
-    """Trigger an AWS Image Builder pipeline to build an image."""
+    """Trigger an AWS Image Builder pipeline to build an image.
+
+    A build is started on creation, and again whenever the pipeline or
+    `revision` changes, e.g. a hash of the image recipe inputs. With `wait`
+    enabled, creation blocks until the build completes and the AMIs it produced
+    are available as `ami_id` and `ami_ids` outputs. Builds started on a
+    revision change are not awaited, and the outputs keep the initial AMIs.
+    """
+
+    image_build_version_arn: Output[str]
+    ami_id: Output[str | None]
+    ami_ids: Output[list[str]]
 
     def __init__(  # noqa: D107
         self,
@@ -33,6 +190,9 @@ class TriggerImagePipeline(Resource):
         image_pipeline_arn: Input[str],
         client_token: Input[str] | None = None,
         region: Input[str] | None = None,
+        revision: Input[str] | None = None,
+        wait: Input[bool] = False,
+        wait_timeout: Input[float] | None = None,
     ) -> None:
         super().__init__(
             _Provider(),
@@ -41,6 +201,12 @@ class TriggerImagePipeline(Resource):
                 "image_pipeline_arn": image_pipeline_arn,
                 "client_token": client_token or resource_name,
                 "region": region,
+                "revision": revision,
+                "wait": wait,
+                "wait_timeout": wait_timeout,
+                "image_build_version_arn": None,
+                "ami_id": None,
+                "ami_ids": None,
             },
             opts,
         )
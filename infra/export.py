@@ -1,9 +1,9 @@
 from pulumi import export
 
-from . import alb, asg, codedeploy, codedeploy_application
+from . import alb, codedeploy, codedeploy_application, launch_template
 
 # SSH Key to access the Windows instances in the ASG
-export("asg.ssh-key.private-key", asg.ssh_key.private_key_pem)
+export("asg.ssh-key.private-key", launch_template.ssh_key.private_key_pem)
 
 # CodeDeploy configuration to deploy the application
 export(
@@ -5,7 +5,7 @@ import pulumi_github as github
 import pulumi_tls as tls
 from pulumi import Config, Output, log
 
-from . import codedeploy, codedeploy_application, components, metadata
+from . import aws_context, codedeploy, codedeploy_application, components, metadata
 
 config = Config()
 
@@ -79,7 +79,7 @@ def main() -> None:
 
     # Actions variables
     for key, value in {
-        "AWS_REGION": aws.get_region().name,
+        "AWS_REGION": aws_context.region(),
         "S3_BUCKET": codedeploy.build_artifacts.bucket,
         "CODEDEPLOY_APPLICATION_NAME": codedeploy_application.app.name,
         "CODEDEPLOY_DEPLOYMENT_GROUP_NAME": codedeploy_application.deployment_group.deployment_group_name,
@@ -2,11 +2,20 @@ from pathlib import Path
 
 import pulumi_aws as aws
 
-from . import asg, components, dynamic, metadata, vpc
+from . import (
+    aws_context,
+    components,
+    dynamic,
+    launch_template,
+    metadata,
+    runtime_stack,
+    versioning,
+    vpc,
+)
 
-partition = aws.get_partition().partition
-region = aws.get_region().name
-account_id = aws.get_caller_identity().account_id
+partition = aws_context.partition()
+region = aws_context.region()
+account_id = aws_context.account_id()
 
 # EC2 Image Builder Infrastructure
 # ----------------------------------------------------------------------------
@@ -55,42 +64,99 @@ default_infra_config = aws.imagebuilder.InfrastructureConfiguration(
 # ----------------------------------------------------------------------------
 # * AutoLogon configuration gets removed by the Image Builder service (SysPrep),
 # * so each instance should do on their own user data script to enable it
+# * Versions are derived from the content, so the component, the recipe and thus
+# * the image are rebuilt only when their inputs change
+kftcvan_component_data = (
+    Path(__file__).parent / "install-kftcvan-security-program.yaml"
+).read_text()
+kftcvan_component_args = {
+    "name": "Install-KFTCVAN-Security-Program",
+    "platform": "Windows",
+    "supported_os_versions": ["Microsoft Windows Server 2022"],
+    "data": kftcvan_component_data,
+}
+kftcvan_component_version = versioning.content_version(kftcvan_component_args)
 install_kftcvan_security_program = aws.imagebuilder.Component(
     "install-kftcvan-security-program",
-    name="Install-KFTCVAN-Security-Program",
-    version="1.0.0",
-    platform="Windows",
-    supported_os_versions=["Microsoft Windows Server 2022"],
-    data=(Path(__file__).parent / "install-kftcvan-security-program.yaml").read_text(),
+    version=kftcvan_component_version,
+    skip_destroy=False,
+    **kftcvan_component_args,
+)
+runtime_stack_component_args = {
+    "name": "Install-Runtime-Stack",
+    "platform": "Windows",
+    "supported_os_versions": ["Microsoft Windows Server 2022"],
+    "data": runtime_stack.render_component(),
+}
+runtime_stack_component_version = versioning.content_version(
+    runtime_stack_component_args,
+)
+install_runtime_stack = aws.imagebuilder.Component(
+    "install-runtime-stack",
+    description="Pre-install nssm, uv, Python and locked app dependencies.",
+    version=runtime_stack_component_version,
     skip_destroy=False,
+    **runtime_stack_component_args,
 )
 image_name = f"{metadata.full_name}-imagebuilder"
+image_recipe_description = (
+    "Build recipe for Windows Server 2022 with CodeDeploy and extra packages."
+)
+parent_image = f"arn:{partition}:imagebuilder:{region}:aws:image/windows-server-2022-english-full-base-x86/x.x.x"
+managed_components = [
+    {
+        "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/amazon-cloudwatch-agent-windows/x.x.x",
+        "parameters": [],
+    },
+    {
+        "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/aws-codedeploy-agent-windows/x.x.x",
+        "parameters": [
+            {
+                "name": "SetAgentDisabled",
+                "value": "no",
+            },
+        ],
+    },
+    {
+        "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/chocolatey/x.x.x",
+        "parameters": [],
+    },
+    {
+        "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/python-3-windows/3.12.0",
+        "parameters": [],
+    },
+]
+working_directory = "C:/"
+image_recipe_version = versioning.content_version(
+    {
+        "name": image_name,
+        "description": image_recipe_description,
+        "parent_image": parent_image,
+        "components": [
+            *managed_components,
+            {
+                "name": runtime_stack_component_args["name"],
+                "version": runtime_stack_component_version,
+            },
+            {
+                "name": kftcvan_component_args["name"],
+                "version": kftcvan_component_version,
+            },
+        ],
+        "working_directory": working_directory,
+    },
+)
 image_recipe = aws.imagebuilder.ImageRecipe(
     "windows-fleet",
     name=image_name,
-    description="Build recipe for Windows Server 2022 with CodeDeploy and extra packages.",
-    version="1.0.0",
-    parent_image=f"arn:{partition}:imagebuilder:{region}:aws:image/windows-server-2022-english-full-base-x86/x.x.x",
+    description=image_recipe_description,
+    version=image_recipe_version,
+    parent_image=parent_image,
     components=[
+        *managed_components,
+        # Requires Chocolatey from the managed components
         {
-            "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/amazon-cloudwatch-agent-windows/x.x.x",
-            "parameters": [],
-        },
-        {
-            "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/aws-codedeploy-agent-windows/x.x.x",
-            "parameters": [
-                {
-                    "name": "SetAgentDisabled",
-                    "value": "no",
-                },
-            ],
-        },
-        {
-            "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/chocolatey/x.x.x",
-            "parameters": [],
-        },
-        {
-            "component_arn": f"arn:{partition}:imagebuilder:{region}:aws:component/python-3-windows/3.12.0",
+            "component_arn": install_runtime_stack.arn,
             "parameters": [],
         },
         {
@@ -98,7 +164,7 @@ image_recipe = aws.imagebuilder.ImageRecipe(
             "parameters": [],
         },
     ],
-    working_directory="C:/",
+    working_directory=working_directory,
 )
 # Currently it's not possible to set the log group name in the image recipe
 # -- it is automatically created by the Image Builder service.
@@ -118,10 +184,11 @@ distro_config = aws.imagebuilder.DistributionConfiguration(
                 # BUG: AMI name format shown in console like: "aws-codedeploy-windows-{{" (but works OK)
                 "name": metadata.full_name + "-{{ imagebuilder:buildDate }}",
             },
+            # Every AMI built, by any pipeline run, becomes the fleet's default
             "launch_template_configurations": [
                 {
                     "account_id": account_id,
-                    "launch_template_id": asg.launch_template.id,
+                    "launch_template_id": launch_template.launch_template.id,
                     "default": True,
                 },
             ],
@@ -134,7 +201,7 @@ image_pipeline = aws.imagebuilder.ImagePipeline(
     name=f"{metadata.full_name}-imagebuilder",
     description="Image build pipeline for Windows Server 2022 with CodeDeploy.",
     image_recipe_arn=image_recipe.arn,
-    execution_role=aws.iam.get_role("AWSServiceRoleForImageBuilder").arn,
+    execution_role=aws_context.service_role_arn("AWSServiceRoleForImageBuilder"),
     infrastructure_configuration_arn=default_infra_config.arn,
     distribution_configuration_arn=distro_config.arn,
     workflows=[
@@ -144,10 +211,15 @@ image_pipeline = aws.imagebuilder.ImagePipeline(
         # ! Skipping the test workflow for now, but recommended for production
     ],
 )
-dynamic.TriggerImagePipeline(
+# * Wait for the initial build only, so the fleet launches from the baked AMI on
+# * the first `up`; a new build starts when the recipe version (content hash)
+# * changes, without blocking `up`, and is distributed to the launch template
+image_build = dynamic.TriggerImagePipeline(
     "windows-fleet-initial-build",
     image_pipeline_arn=image_pipeline.arn,
     region=region,
+    revision=image_recipe_version,
+    wait=True,
 )
 dynamic.CleanupImagePipeline(
     "windows-fleet-cleanup",
@@ -0,0 +1,272 @@
+"""Local IAM policy document compiler.
+
+Drop-in replacement for `aws.iam.get_policy_document` that renders the same
+canonical JSON as the provider without a provider invoke:
+
+- `Version` defaults to `2012-10-17` and `Effect` to `Allow`.
+- Action, resource and principal identifier sets are deduplicated and sorted in
+  reverse order; a single value collapses into a plain string.
+- Statement keys follow the provider's field order, map keys are sorted.
+- Statements are merged by `Sid` with source and override documents.
+"""
+
+import json
+import re
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+import pulumi_aws as aws
+from pulumi import Input, Output
+
+_DEFAULT_VERSION = "2012-10-17"
+
+# Order of fields of a statement in the rendered document
+_STATEMENT_FIELDS = (
+    ("sid", "Sid"),
+    ("effect", "Effect"),
+    ("actions", "Action"),
+    ("not_actions", "NotAction"),
+    ("resources", "Resource"),
+    ("not_resources", "NotResource"),
+    ("principals", "Principal"),
+    ("not_principals", "NotPrincipal"),
+    ("conditions", "Condition"),
+)
+
+# IAM policy variables are written as `&{...}` to avoid interpolation
+_POLICY_VARIABLE = re.compile(r"&\{(?=[^}]+\})")
+
+_JSON_ESCAPES = {
+    "<": r"\u003c",
+    ">": r"\u003e",
+    "&": r"\u0026",
+    "\u2028": r"\u2028",
+    "\u2029": r"\u2029",
+}
+
+
+class PolicyDocumentError(ValueError):
+    """Raised for policy documents the provider would reject."""
+
+
+def policy_document(
+    *,
+    statements: Input[Sequence[Input[aws.iam.GetPolicyDocumentStatementArgsDict]]] = (),
+    version: Input[str] | None = None,
+    policy_id: Input[str] | None = None,
+    source_policy_documents: Input[Sequence[Input[str]]] = (),
+    override_policy_documents: Input[Sequence[Input[str]]] = (),
+) -> Output[str]:
+    """Compile a policy document whose inputs may contain outputs.
+
+    Takes the same arguments as `aws.iam.get_policy_document` and resolves to the
+    same JSON, but no provider invoke is made.
+    """
+    return Output.from_input(
+        {
+            "statements": statements,
+            "version": version,
+            "policy_id": policy_id,
+            "source_policy_documents": source_policy_documents,
+            "override_policy_documents": override_policy_documents,
+        },
+    ).apply(lambda args: render_policy_document(**args))  # ty: ignore[missing-argument]
+
+
+def render_policy_document(
+    *,
+    statements: Sequence[Mapping[str, Any]] | None = (),
+    version: str | None = None,
+    policy_id: str | None = None,
+    source_policy_documents: Sequence[str] | None = (),
+    override_policy_documents: Sequence[str] | None = (),
+) -> str:
+    """Render a policy document from plain (already resolved) values."""
+    merged: dict[str, Any] = {}
+    for source in source_policy_documents or ():
+        _merge(merged, _decode(source))
+
+    sids: set[str] = set()
+    rendered_statements = []
+    for statement in statements or ():
+        rendered = _render_statement(statement)
+        if sid := rendered.get("Sid"):
+            if sid in sids:
+                msg = f"found duplicate sid ({sid}) in statements"
+                raise PolicyDocumentError(msg)
+            sids.add(sid)
+        rendered_statements.append(rendered)
+
+    _merge(
+        merged,
+        {
+            "Version": version or _DEFAULT_VERSION,
+            "Id": policy_id,
+            "Statement": rendered_statements,
+        },
+    )
+    for override in override_policy_documents or ():
+        _merge(merged, _decode(override))
+
+    return _dumps(merged)
+
+
+def _render_statement(statement: Mapping[str, Any]) -> dict[str, Any]:
+    unknown = set(statement) - {field for field, _ in _STATEMENT_FIELDS}
+    if unknown:
+        msg = f"unknown statement fields: {sorted(unknown)}"
+        raise PolicyDocumentError(msg)
+
+    rendered: dict[str, Any] = {}
+    for field, key in _STATEMENT_FIELDS:
+        value = statement.get(field)
+        if field == "effect":
+            rendered[key] = value or "Allow"
+        elif field == "sid":
+            if value:
+                rendered[key] = value
+        elif field in ("principals", "not_principals"):
+            if value:
+                rendered[key] = _render_principals(value)
+        elif field == "conditions":
+            if value:
+                rendered[key] = _render_conditions(value)
+        elif value:
+            rendered[key] = _string_set(value)
+
+    return rendered
+
+
+def _render_principals(principals: Sequence[Mapping[str, Any]]) -> str | dict:
+    if len(principals) == 1 and principals[0]["type"] == "*":
+        return "*"
+
+    rendered: dict[str, Any] = {}
+    for principal in principals:
+        type_ = principal["type"]
+        identifiers = _string_set(principal.get("identifiers") or ())
+        existing = rendered.get(type_)
+        if existing is None:
+            rendered[type_] = identifiers
+        else:
+            rendered[type_] = [
+                *_as_list(existing),
+                *_as_list(identifiers),
+            ]
+
+    return dict(sorted(rendered.items()))
+
+
+def _render_conditions(conditions: Sequence[Mapping[str, Any]]) -> dict:
+    rendered: dict[str, dict[str, Any]] = {}
+    for condition in conditions:
+        variables = rendered.setdefault(condition["test"], {})
+        values = _string_list(condition["values"])
+        existing = variables.get(condition["variable"])
+        if existing is None:
+            variables[condition["variable"]] = values
+        else:
+            variables[condition["variable"]] = [
+                *_as_list(existing),
+                *_as_list(values),
+            ]
+
+    return {
+        test: dict(sorted(variables.items()))
+        for test, variables in sorted(rendered.items())
+    }
+
+
+def _string_set(values: str | Sequence[str]) -> str | list[str]:
+    """Render a set of strings the way the provider does."""
+    if isinstance(values, str):
+        values = [values]
+
+    return _string_list(list(dict.fromkeys(values)))
+
+
+def _string_list(values: str | Sequence[str]) -> str | list[str]:
+    """Render a list of strings: single value as string, others reverse-sorted."""
+    if isinstance(values, str):
+        values = [values]
+
+    values = [_POLICY_VARIABLE.sub("${", value) for value in values]
+    if len(values) == 1:
+        return values[0]
+
+    return sorted(values, reverse=True)
+
+
+def _as_list(value: str | list[str]) -> list[str]:
+    return [value] if isinstance(value, str) else value
+
+
+def _decode(document: str) -> dict[str, Any]:
+    """Decode a JSON policy document into its canonical form."""
+    decoded = json.loads(document)
+    statements = decoded.get("Statement") or []
+    if isinstance(statements, Mapping):
+        statements = [statements]
+
+    canonical: dict[str, Any] = {}
+    for key in ("Version", "Id"):
+        if decoded.get(key):
+            canonical[key] = decoded[key]
+
+    canonical["Statement"] = [_canonical_statement(s) for s in statements]
+    return canonical
+
+
+def _canonical_statement(statement: Mapping[str, Any]) -> dict[str, Any]:
+    canonical: dict[str, Any] = {}
+    for _, key in _STATEMENT_FIELDS:
+        value = statement.get(key)
+        if not value:
+            continue
+
+        if key in ("Principal", "NotPrincipal") and isinstance(value, Mapping):
+            value = {
+                type_: _string_list(identifiers)
+                for type_, identifiers in sorted(value.items())
+            }
+        elif key == "Condition":
+            value = {
+                test: dict(sorted(variables.items()))
+                for test, variables in sorted(value.items())
+            }
+
+        canonical[key] = value
+
+    return canonical
+
+
+def _merge(document: dict[str, Any], other: Mapping[str, Any]) -> None:
+    """Merge `other` into `document`, overwriting statements with the same Sid."""
+    version = max(document.get("Version", ""), other.get("Version") or "")
+    policy_id = other.get("Id") or document.get("Id")
+    statements = document.get("Statement", [])
+    for statement in other.get("Statement") or ():
+        sid = statement.get("Sid")
+        for idx, existing in enumerate(statements):
+            if sid and existing.get("Sid") == sid:
+                statements[idx] = statement
+                break
+        else:
+            statements.append(statement)
+
+    # Rebuild to keep the provider's key order: `Version`, `Id` then `Statement`
+    document.clear()
+    if version:
+        document["Version"] = version
+    if policy_id:
+        document["Id"] = policy_id
+    if statements:
+        document["Statement"] = statements
+
+
+def _dumps(document: Mapping[str, Any]) -> str:
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    for char, escaped in _JSON_ESCAPES.items():
+        text = text.replace(char, escaped)
+
+    return text
@@ -0,0 +1,76 @@
+"""Image Builder component baking the application runtime stack into the AMI.
+
+The component installs nssm, uv and the pinned Python, then warms the uv cache
+with the application dependencies locked in `uv.lock`, so deployments only need
+an offline `uv sync`.
+"""
+
+import tomllib
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from pulumi_extra import render_template
+
+from scripts.uv_lock import locked_packages, root_package
+
+ROOT_DIR = Path(__file__).parent.parent
+TEMPLATE = Path(__file__).parent / "install-runtime-stack.yaml.jinja"
+
+UV_VERSION = "0.13.1"
+
+# Machine-wide locations, shared by Image Builder and the CodeDeploy agent
+UV_INSTALL_DIR = "C:\\uv\\bin"
+UV_CACHE_DIR = "C:\\uv\\cache"
+UV_PYTHON_INSTALL_DIR = "C:\\uv\\python"
+
+
+def locked_requirements(
+    lock: Mapping[str, Any],
+    *,
+    project: str,
+    groups: Sequence[str] = (),
+) -> list[str]:
+    """Pinned requirements of a project, resolved from a parsed `uv.lock`.
+
+    Walks the dependencies (and requested extras) of the project and given
+    dependency groups. Environment markers are carried along so that the
+    requirements can be installed on any platform, e.g. Windows.
+    """
+    requirements = []
+    for package, markers in locked_packages(lock, project=project, groups=groups):
+        requirement = f"{package['name']}=={package['version']}"
+        if None not in markers:
+            conditions = sorted(m for m in markers if m)
+            requirement += " ; " + (
+                conditions[0]
+                if len(conditions) == 1
+                else " or ".join(f"({marker})" for marker in conditions)
+            )
+        requirements.append(requirement)
+
+    return requirements
+
+
+def render_component(
+    *,
+    lockfile: Path = ROOT_DIR / "uv.lock",
+    python_version_file: Path = ROOT_DIR / ".python-version",
+    uv_version: str = UV_VERSION,
+) -> str:
+    """Render the component document for the runtime stack."""
+    lock = tomllib.loads(lockfile.read_text())
+    project = root_package(lock)["name"]
+    return str(
+        render_template(
+            TEMPLATE,
+            context={
+                "python_version": python_version_file.read_text().strip(),
+                "uv_version": uv_version,
+                "uv_install_dir": UV_INSTALL_DIR,
+                "uv_cache_dir": UV_CACHE_DIR,
+                "uv_python_install_dir": UV_PYTHON_INSTALL_DIR,
+                "requirements": locked_requirements(lock, project=project),
+            },
+        ),
+    )
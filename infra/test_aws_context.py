@@ -0,0 +1,48 @@
+import pytest
+
+from . import aws_context, components
+from .conftest import InvokeCountingMocks
+
+
+@pytest.mark.unit
+def test_lookups_are_memoized(pulumi_mocks: InvokeCountingMocks) -> None:
+    for _ in range(3):
+        assert aws_context.partition() == "aws"
+        assert aws_context.region() == "ap-northeast-2"
+        assert aws_context.account_id() == "123456789012"
+
+    assert pulumi_mocks.invokes["aws:index/getPartition:getPartition"] == 1
+    assert pulumi_mocks.invokes["aws:index/getRegion:getRegion"] == 1
+    assert pulumi_mocks.invokes["aws:index/getCallerIdentity:getCallerIdentity"] == 1
+
+
+@pytest.mark.unit
+def test_service_role_arn_is_memoized_per_name(
+    pulumi_mocks: InvokeCountingMocks,
+) -> None:
+    for _ in range(2):
+        assert aws_context.service_role_arn("A").endswith(":role/A")
+        assert aws_context.service_role_arn("B").endswith(":role/B")
+
+    assert pulumi_mocks.invokes["aws:iam/getRole:getRole"] == 2
+
+
+@pytest.mark.unit
+def test_cache_clear(pulumi_mocks: InvokeCountingMocks) -> None:
+    aws_context.partition()
+    aws_context.cache_clear()
+    aws_context.partition()
+
+    assert pulumi_mocks.invokes["aws:index/getPartition:getPartition"] == 2
+
+
+@pytest.mark.unit
+def test_roles_share_aws_context(pulumi_mocks: InvokeCountingMocks) -> None:
+    for idx in range(5):
+        components.Role(f"role-{idx}").assumable_with_oidc(
+            "https://token.actions.githubusercontent.com",
+            oidc_subjects_with_wildcards=["repo:owner/name:*"],
+        )
+
+    assert pulumi_mocks.invokes["aws:index/getPartition:getPartition"] == 1
+    assert pulumi_mocks.invokes["aws:index/getCallerIdentity:getCallerIdentity"] == 1
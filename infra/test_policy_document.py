@@ -0,0 +1,282 @@
+import importlib.metadata
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+import pulumi
+import pulumi_aws as aws
+import pytest
+from pulumi import automation
+
+from . import components
+from .conftest import InvokeCountingMocks
+from .policy_document import (
+    PolicyDocumentError,
+    policy_document,
+    render_policy_document,
+)
+
+GOLDEN_DIR = Path(__file__).parent / "testdata" / "policy_documents"
+
+# Set to rewrite the golden files from the provider, see `test_provider_golden`
+UPDATE_GOLDEN_VARIABLE = "UPDATE_POLICY_DOCUMENT_GOLDEN"
+
+# Inputs of each golden file; expected JSON is what `aws.iam.get_policy_document`
+# returns for the same arguments.
+CASES: dict[str, dict[str, Any]] = {
+    "default-trust": {
+        "statements": [
+            {
+                "actions": ["sts:AssumeRole"],
+                "principals": [{"type": "AWS", "identifiers": ["*"]}],
+            },
+        ],
+    },
+    "assumable-service": {
+        "statements": [
+            {
+                "effect": "Allow",
+                "principals": [
+                    {"type": "AWS", "identifiers": []},
+                    {"type": "Service", "identifiers": ["codedeploy.amazonaws.com"]},
+                ],
+                "actions": ["sts:AssumeRole", "sts:TagSession"],
+            },
+        ],
+    },
+    "assumable-with-oidc": {
+        "statements": [
+            {
+                "effect": "Allow",
+                "principals": [
+                    {
+                        "type": "Federated",
+                        "identifiers": [
+                            "arn:aws:iam::123456789012:oidc-provider/token.actions.githubusercontent.com",
+                        ],
+                    },
+                ],
+                "conditions": [
+                    {
+                        "test": "StringEquals",
+                        "variable": "token.actions.githubusercontent.com:aud",
+                        "values": ["sts.amazonaws.com"],
+                    },
+                    {
+                        "test": "StringLike",
+                        "variable": "token.actions.githubusercontent.com:sub",
+                        "values": ["repo:lasuillard/aws-codedeploy-windows:*"],
+                    },
+                ],
+                "actions": ["sts:AssumeRoleWithWebIdentity"],
+            },
+        ],
+    },
+    "build-artifacts-access": {
+        "statements": [
+            {
+                "sid": "GetBuildArtifactsForCodeDeploy",
+                "effect": "Allow",
+                "actions": ["s3:Get*", "s3:List*"],
+                "resources": [
+                    "arn:aws:s3:::codedeploy-build-artifacts",
+                    "arn:aws:s3:::codedeploy-build-artifacts/*",
+                ],
+            },
+        ],
+    },
+    "sets-and-conditions": {
+        "policy_id": "sets",
+        "statements": [
+            {
+                "sid": "Deny",
+                "effect": "Deny",
+                "not_actions": ["iam:*", "iam:*", "sts:*", "ec2:*"],
+                "not_resources": ["arn:aws:s3:::home/&{aws:username}/*"],
+                "principals": [
+                    {"type": "AWS", "identifiers": ["arn:aws:iam::1:root"]},
+                    {
+                        "type": "AWS",
+                        "identifiers": ["arn:aws:iam::2:root", "arn:aws:iam::3:root"],
+                    },
+                    {"type": "Service", "identifiers": ["ec2.amazonaws.com"]},
+                ],
+                "conditions": [
+                    {
+                        "test": "StringLike",
+                        "variable": "s3:prefix",
+                        "values": ["a/<b>", "c&d"],
+                    },
+                    {
+                        "test": "Bool",
+                        "variable": "aws:SecureTransport",
+                        "values": ["false"],
+                    },
+                    {"test": "StringLike", "variable": "s3:prefix", "values": ["z"]},
+                ],
+            },
+            {
+                "not_principals": [{"type": "*", "identifiers": ["*"]}],
+                "actions": ["s3:GetObject"],
+                "resources": ["*"],
+            },
+        ],
+    },
+    "merged": {
+        "source_policy_documents": [
+            json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Sid": "A",
+                            "Effect": "Allow",
+                            "Action": "s3:*",
+                            "Resource": "*",
+                        },
+                        {
+                            "Sid": "B",
+                            "Effect": "Allow",
+                            "Action": "ec2:*",
+                            "Resource": "*",
+                        },
+                        {"Effect": "Allow", "Action": "logs:*", "Resource": "*"},
+                    ],
+                },
+            ),
+        ],
+        "statements": [
+            {"sid": "B", "effect": "Deny", "actions": ["ec2:*"], "resources": ["*"]},
+            {"sid": "C", "actions": ["sqs:*"], "resources": ["*"]},
+        ],
+        "override_policy_documents": [
+            json.dumps(
+                {
+                    "Statement": {
+                        "Sid": "C",
+                        "Resource": "arn:aws:sqs:*:*:queue",
+                        "Action": "sqs:SendMessage",
+                        "Effect": "Allow",
+                        "Principal": {"Service": ["b", "a"], "AWS": "*"},
+                    },
+                },
+            ),
+        ],
+    },
+}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_render_matches_provider_golden(case: str) -> None:
+    expected = (GOLDEN_DIR / f"{case}.json").read_text().rstrip("\n")
+
+    assert render_policy_document(**CASES[case]) == expected
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(shutil.which("pulumi") is None, reason="Pulumi CLI not installed")
+def test_provider_golden(tmp_path: Path) -> None:
+    """Golden files are the JSON the provider returns.
+
+    Run with `UPDATE_POLICY_DOCUMENT_GOLDEN=1` to rewrite them, e.g. after a
+    provider upgrade. Needs the Pulumi CLI; no AWS credentials are used.
+    """
+
+    def program() -> None:
+        for case, args in CASES.items():
+            pulumi.export(case, aws.iam.get_policy_document(**args).json)
+
+    stack = automation.create_stack(
+        "golden",
+        project_name="policy-documents",
+        program=program,
+        opts=automation.LocalWorkspaceOptions(
+            work_dir=str(tmp_path),
+            env_vars={
+                "PULUMI_BACKEND_URL": tmp_path.as_uri(),
+                "PULUMI_CONFIG_PASSPHRASE": "",
+            },
+        ),
+    )
+    stack.workspace.install_plugin("aws", importlib.metadata.version("pulumi-aws"))
+    stack.set_all_config(
+        {
+            "aws:region": automation.ConfigValue("us-east-1"),
+            "aws:accessKey": automation.ConfigValue("test"),
+            "aws:secretKey": automation.ConfigValue("test"),
+            "aws:skipCredentialsValidation": automation.ConfigValue("true"),
+            "aws:skipRequestingAccountId": automation.ConfigValue("true"),
+            "aws:skipMetadataApiCheck": automation.ConfigValue("true"),
+        },
+    )
+    outputs = stack.up(on_output=lambda _: None).outputs
+
+    for case in CASES:
+        path = GOLDEN_DIR / f"{case}.json"
+        if os.environ.get(UPDATE_GOLDEN_VARIABLE):
+            path.write_text(outputs[case].value + "\n")
+
+        assert outputs[case].value == path.read_text().rstrip("\n")
+
+
+@pytest.mark.unit
+def test_render_duplicate_sid() -> None:
+    with pytest.raises(PolicyDocumentError, match="duplicate sid"):
+        render_policy_document(
+            statements=[
+                {"sid": "A", "actions": ["s3:*"]},
+                {"sid": "A", "actions": ["ec2:*"]},
+            ],
+        )
+
+
+@pytest.mark.unit
+def test_render_unknown_field() -> None:
+    with pytest.raises(PolicyDocumentError, match="unknown statement fields"):
+        render_policy_document(statements=[{"action": ["s3:*"]}])
+
+
+@pytest.mark.unit
+@pulumi.runtime.test
+def test_policy_document_resolves_outputs(
+    pulumi_mocks: InvokeCountingMocks,
+) -> pulumi.Output:
+    document = policy_document(
+        statements=[
+            {
+                "sid": "GetBuildArtifactsForCodeDeploy",
+                "effect": "Allow",
+                "actions": ["s3:Get*", "s3:List*"],
+                "resources": [
+                    pulumi.Output.from_input("arn:aws:s3:::codedeploy-build-artifacts"),
+                    pulumi.Output.concat(
+                        "arn:aws:s3:::codedeploy-build-artifacts",
+                        "/*",
+                    ),
+                ],
+            },
+        ],
+    )
+    expected = (GOLDEN_DIR / "build-artifacts-access.json").read_text().rstrip("\n")
+
+    return document.apply(lambda text: _assert_equal(text, expected))  # ty: ignore[missing-argument]
+
+
+@pytest.mark.unit
+def test_role_needs_no_invokes(pulumi_mocks: InvokeCountingMocks) -> None:
+    (
+        components.Role("role")
+        .assumable(services=["ec2.amazonaws.com"])
+        .with_policies(documents=[CASES["build-artifacts-access"]])
+        .build()
+    )
+    components.Role("default").build()
+
+    assert not pulumi_mocks.invokes
+
+
+def _assert_equal(actual: str, expected: str) -> None:
+    assert actual == expected
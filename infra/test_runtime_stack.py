@@ -0,0 +1,127 @@
+import tomllib
+
+import pytest
+import yaml
+
+from scripts.uv_lock import LockError
+
+from .runtime_stack import ROOT_DIR, locked_requirements, render_component
+
+# Image Builder limits inline component data to 16,000 characters
+_COMPONENT_DATA_LIMIT = 16_000
+
+
+@pytest.mark.unit
+def test_render_component() -> None:
+    data = render_component()
+
+    assert len(data) < _COMPONENT_DATA_LIMIT
+    document = yaml.safe_load(data)
+    steps = {
+        step["name"]: step for phase in document["phases"] for step in phase["steps"]
+    }
+    assert list(steps) == [
+        "InstallNssm",
+        "InstallUv",
+        "InstallPython",
+        "WarmCache",
+        "ValidateToolchain",
+    ]
+    python_version = (ROOT_DIR / ".python-version").read_text().strip()
+    assert f"python install {python_version}" in data
+
+
+@pytest.mark.unit
+def test_render_component_pins_locked_requirements() -> None:
+    lock = tomllib.loads((ROOT_DIR / "uv.lock").read_text())
+    versions = {package["name"]: package["version"] for package in lock["package"]}
+
+    data = render_component()
+
+    assert f"fastapi=={versions['fastapi']}\n" in data
+    assert f"uvicorn=={versions['uvicorn']}\n" in data
+    # Platform-specific requirements keep their markers
+    assert f"uvloop=={versions['uvloop']} ; " in data
+    # Dependency groups are not part of the runtime stack
+    assert "pytest==" not in data
+    assert "pulumi==" not in data
+
+
+@pytest.mark.unit
+def test_locked_requirements() -> None:
+    lock = {
+        "package": [
+            {
+                "name": "app",
+                "version": "0.1.0",
+                "source": {"virtual": "."},
+                "dependencies": [
+                    {"name": "web", "extra": ["standard"]},
+                    {"name": "colors", "marker": "sys_platform == 'win32'"},
+                ],
+                "dev-dependencies": {"dev": [{"name": "tester"}]},
+            },
+            {
+                "name": "web",
+                "version": "1.0.0",
+                "dependencies": [{"name": "core"}],
+                "optional-dependencies": {
+                    "standard": [
+                        {"name": "loop", "marker": "sys_platform != 'win32'"},
+                        {"name": "colors", "marker": "sys_platform == 'darwin'"},
+                    ],
+                },
+            },
+            {"name": "core", "version": "2.0.0"},
+            {"name": "loop", "version": "3.0.0"},
+            {"name": "colors", "version": "4.0.0"},
+            {"name": "tester", "version": "5.0.0", "dependencies": [{"name": "core"}]},
+        ],
+    }
+
+    assert locked_requirements(lock, project="app") == [
+        "colors==4.0.0 ; (sys_platform == 'darwin') or (sys_platform == 'win32')",
+        "core==2.0.0",
+        "loop==3.0.0 ; sys_platform != 'win32'",
+        "web==1.0.0",
+    ]
+    assert "tester==5.0.0" in locked_requirements(lock, project="app", groups=["dev"])
+
+
+@pytest.mark.unit
+def test_locked_requirements_forked_resolution() -> None:
+    lock = {
+        "package": [
+            {"name": "app", "version": "0.1.0", "dependencies": [{"name": "core"}]},
+            {"name": "core", "version": "1.0.0"},
+            {"name": "core", "version": "2.0.0"},
+        ],
+    }
+
+    with pytest.raises(LockError, match="Forked resolution of 'core'"):
+        locked_requirements(lock, project="app")
+
+
+@pytest.mark.unit
+def test_locked_requirements_resolution_markers() -> None:
+    lock = {
+        "package": [
+            {"name": "app", "version": "0.1.0", "dependencies": [{"name": "core"}]},
+            {
+                "name": "core",
+                "version": "1.0.0",
+                "resolution-markers": ["python_full_version < '3.14'"],
+            },
+            {
+                "name": "core",
+                "version": "2.0.0",
+                "resolution-markers": ["python_full_version >= '3.14'"],
+            },
+        ],
+    }
+
+    # A requirement per fork, installed where its resolution markers apply
+    assert locked_requirements(lock, project="app") == [
+        "core==1.0.0 ; python_full_version < '3.14'",
+        "core==2.0.0 ; python_full_version >= '3.14'",
+    ]
@@ -0,0 +1,35 @@
+import re
+
+import pytest
+
+from .versioning import content_hash, content_version
+
+
+@pytest.mark.unit
+def test_content_version_is_semantic() -> None:
+    version = content_version("name: Component", major=2, minor=3)
+
+    assert re.fullmatch(r"2\.3\.\d+", version)
+    assert int(version.split(".")[2]) < 2**30
+
+
+@pytest.mark.unit
+def test_identical_content_same_version() -> None:
+    recipe = {"parent_image": "arn:image", "components": [{"arn": "a"}, {"arn": "b"}]}
+    reordered = {
+        "components": [{"arn": "a"}, {"arn": "b"}],
+        "parent_image": "arn:image",
+    }
+
+    assert content_version(recipe) == content_version(reordered)
+    assert content_version("a: 1\r\nb: 2\r\n") == content_version("a: 1\nb: 2\n")
+    assert content_hash(b"data") == content_hash("data")
+
+
+@pytest.mark.unit
+def test_changed_content_new_version() -> None:
+    recipe = {"parent_image": "arn:image", "components": [{"arn": "a"}, {"arn": "b"}]}
+    reversed_components = {**recipe, "components": recipe["components"][::-1]}
+
+    assert content_version(recipe) != content_version(reversed_components)
+    assert content_version("a: 1\n") != content_version("a: 2\n")
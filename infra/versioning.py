@@ -0,0 +1,37 @@
+"""Content-derived versions for Image Builder components and recipes.
+
+Image Builder resources are immutable per semantic version, so deriving the
+version from the content means a new version, and a new image build, only when
+the content actually changes.
+"""
+
+import hashlib
+import json
+from collections.abc import Mapping, Sequence
+
+# Image Builder accepts integers up to 2^30 - 1 for each part of a version
+_PATCH_HEX_DIGITS = 7
+
+Content = str | bytes | Mapping | Sequence | int | float | bool | None
+
+
+def content_hash(content: Content) -> str:
+    """SHA-256 hex digest of given content.
+
+    Text is hashed with normalized line endings, so checkouts with CRLF line
+    endings hash the same. Other values are hashed as canonical JSON.
+    """
+    if isinstance(content, str):
+        data = content.replace("\r\n", "\n").encode()
+    elif isinstance(content, bytes):
+        data = content.replace(b"\r\n", b"\n")
+    else:
+        data = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_version(content: Content, *, major: int = 1, minor: int = 0) -> str:
+    """Semantic version `<major>.<minor>.<patch>` with patch derived from content."""
+    patch = int(content_hash(content)[:_PATCH_HEX_DIGITS], 16)
+    return f"{major}.{minor}.{patch}"
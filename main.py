@@ -1,15 +1,132 @@
+from contextlib import asynccontextmanager
 from typing import Union
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
-app = FastAPI()
+from src import (
+    compression,
+    conditional,
+    drain,
+    health,
+    json_response,
+    metrics,
+    response_cache,
+    streaming,
+    threadpool,
+)
 
+# Largest number of items looked up by a single batch request
+MAX_BATCH_SIZE = 100
+
+# Largest range of items exported by a single stream request
+MAX_STREAM_RANGE = 10_000_000
+
+# Latency, status codes and in-flight requests of this worker, see `/metrics`
+request_metrics = metrics.Metrics()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync routes, if any, run in a threadpool sized by `APP_THREADPOOL_TOKENS`
+    async with threadpool.lifespan(app), metrics.publish_emf(request_metrics):
+        yield
+
+
+api = FastAPI(
+    default_response_class=json_response.FastJSONResponse,
+    lifespan=lifespan,
+)
+api.add_middleware(compression.CompressionMiddleware)
+# Outermost, so that latencies include compression
+api.add_middleware(metrics.MetricsMiddleware, metrics=request_metrics)
+
+# Shared by all workers of the application on the host, see `APP_CACHE_DIR`
+item_cache = response_cache.SharedCache(response_cache.default_path("items"))
+
+# Clients polling items revalidate with `If-None-Match` and get empty 304s
+items = APIRouter(route_class=conditional.ConditionalRoute)
+
+
+class Greeting(BaseModel):
+    Hello: str
+
+
+class Item(BaseModel):
+    item_id: int
+    q: Union[str, None] = None
+
+
+class ItemList(BaseModel):
+    items: list[Item]
+
+
+class ItemLookup(BaseModel):
+    item_id: int
+    q: Union[str, None] = None
 
-@app.get("/")
-def read_root():
-    return {"Hello": "World"}
 
+class ItemBatch(BaseModel):
+    items: list[ItemLookup] = Field(max_length=MAX_BATCH_SIZE)
 
-@app.get("/items/{item_id}")
-def read_item(item_id: int, q: Union[str, None] = None):
+
+def get_item(item_id: int, q: Union[str, None] = None) -> dict:
     return {"item_id": item_id, "q": q}
+
+
+# Routes doing no blocking work are async, so they run on the event loop rather
+# than waiting for a thread of the threadpool; cached routes only wait for one
+# when the cache entry is locked by another worker
+@api.get("/", response_model=Greeting)
+async def read_root():
+    return {"Hello": "World"}
+
+
+@items.get("/items/{item_id}", response_model=Item)
+@conditional.cache_control("no-cache")
+@response_cache.cached(item_cache, ttl=60, version=response_cache.app_version())
+async def read_item(item_id: int, q: Union[str, None] = None):
+    return get_item(item_id, q)
+
+
+# Not served through the public load balancer, see `infra/alb.py`
+@api.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    return PlainTextResponse(
+        request_metrics.prometheus(),
+        media_type=metrics.PROMETHEUS_MEDIA_TYPE,
+    )
+
+
+# Looks up many items in one round trip, without a threadpool dispatch per item
+@api.post("/items:batch", response_model=ItemList)
+async def read_items(batch: ItemBatch):
+    return {"items": [get_item(item.item_id, item.q) for item in batch.items]}
+
+
+# Exports a range of items as NDJSON in bounded memory, however large the range;
+# declared before `/items/{item_id}` so that it takes precedence
+@api.get("/items/stream")
+async def stream_items(
+    start: int = Query(ge=0),
+    end: int = Query(gt=0),
+    q: Union[str, None] = None,
+):
+    if not 0 < end - start <= MAX_STREAM_RANGE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Range must hold 1 to {MAX_STREAM_RANGE} items",
+        )
+
+    return StreamingResponse(
+        streaming.ndjson_chunks(get_item(i, q) for i in range(start, end)),
+        media_type=streaming.NDJSON_MEDIA_TYPE,
+    )
+
+
+api.include_router(items)
+
+# Health probes are answered before any routing or middleware of the API, and
+# fail readiness while the workers drain before a stop
+app = drain.Drain.from_environ(health.HealthProbes(api))
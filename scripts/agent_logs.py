@@ -0,0 +1,294 @@
+"""Time the lifecycle hooks of deployments from CodeDeploy agent logs.
+
+Reads log files, or directories of them, as collected from the instances, e.g.
+`C:\\ProgramData\\Amazon\\CodeDeploy\\log` and `...\\deployment-logs`, and prints the
+duration of every hook per deployment, then percentiles across deployments:
+
+    python -m scripts.agent_logs logs/ [--json]
+
+Two kinds of logs are understood, and timed apart:
+
+- `agent`: the agent log, `codedeploy-agent-log.txt`, with every command run by
+  the agent, from the command received to its completion reported, including
+  `DownloadBundle` and `Install`. A deployment runs commands of distinct names,
+  so a command already run starts the next deployment. Its ID is the first one
+  logged while running the commands after `ApplicationStop`, which logs the
+  previous revision.
+- `scripts`: the deployments log, `codedeploy-agent-deployments.log`, with the
+  output of the hook scripts, from the start of a hook to its last output line.
+
+Files are read line by line, gzip-compressed ones included, holding only the
+commands of the deployment being read, so memory does not grow with log sizes.
+"""
+
+import argparse
+import datetime
+import gzip
+import itertools
+import json
+import math
+import re
+import sys
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+AGENT = "agent"
+SCRIPTS = "scripts"
+
+# Lifecycle hooks of an in-place deployment, in order, for table columns
+HOOKS = (
+    "ApplicationStop",
+    "DownloadBundle",
+    "BeforeInstall",
+    "Install",
+    "AfterInstall",
+    "ApplicationStart",
+    "ValidateService",
+)
+
+PERCENTILES = (50, 90, 99)
+
+_AGENT_LINE = re.compile(
+    r"(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d)\S*\s+\w+\s+\[codedeploy-agent\(\d+\)\]: (.*)"
+)
+_COMMAND_STARTED = re.compile(r'(?:Received command: |:command_name=>")(\w+)')
+_COMMAND_COMPLETED = re.compile(
+    r'(?:PutHostCommandComplete: |put_host_command_complete\(command_status:)"([^"]+)"'
+)
+_SCRIPTS_LINE = re.compile(r"\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\] \[(d-\w+)\](.*)")
+_LIFECYCLE_EVENT = re.compile(r"LifecycleEvent - (\w+)")
+_DEPLOYMENT_ID = re.compile(r"\bd-[A-Z0-9]{9}\b")
+
+
+@dataclass(frozen=True)
+class HookRun:
+    """Lifecycle hook of a deployment run on an instance."""
+
+    source: str
+    deployment: str
+    hook: str
+    seconds: float
+    status: str | None = None
+
+
+@dataclass
+class _Command:
+    hook: str
+    start: datetime.datetime
+
+
+@dataclass
+class _AgentParser:
+    """Commands of the deployment being read from an agent log."""
+
+    runs: list[HookRun] = field(default_factory=list)
+    hooks: set[str] = field(default_factory=set)
+    command: _Command | None = None
+    deployment: str | None = None
+    # Numbers of deployments without an ID, shared by the files read
+    unknown: Iterator[int] = field(default_factory=lambda: itertools.count(1))
+
+    def feed(self, time: datetime.datetime, message: str) -> Iterator[HookRun]:
+        if (started := _COMMAND_STARTED.search(message)) is not None:
+            hook = started[1]
+            if self.command is None or self.command.hook != hook:
+                if hook in self.hooks:
+                    yield from self.flush()
+
+                self.hooks.add(hook)
+                self.command = _Command(hook, time)
+
+        command = self.command
+        if command is None:
+            return
+
+        if (
+            self.deployment is None
+            and command.hook != "ApplicationStop"
+            and (found := _DEPLOYMENT_ID.search(message)) is not None
+        ):
+            self.deployment = found[0]
+
+        if (completed := _COMMAND_COMPLETED.search(message)) is not None:
+            seconds = (time - command.start).total_seconds()
+            self.runs.append(HookRun(AGENT, "", command.hook, seconds, completed[1]))
+            self.command = None
+
+    def flush(self) -> Iterator[HookRun]:
+        if self.runs:
+            deployment = self.deployment or f"unknown-{next(self.unknown)}"
+            for run in self.runs:
+                yield HookRun(run.source, deployment, run.hook, run.seconds, run.status)
+
+        self.runs, self.hooks, self.command, self.deployment = [], set(), None, None
+
+
+def parse(
+    lines: Iterable[str], *, unknown: Iterator[int] | None = None
+) -> Iterator[HookRun]:
+    """Hook runs logged in lines of an agent log or deployments log.
+
+    Deployments whose ID isn't logged are named `unknown-<n>`, numbered by
+    `unknown`, to be shared across files so that they are not merged.
+    """
+    agent = _AgentParser() if unknown is None else _AgentParser(unknown=unknown)
+    # * Hook running, its start and last output, by deployment
+    scripts: dict[str, tuple[str, datetime.datetime, datetime.datetime]] = {}
+    for line in lines:
+        if (matched := _SCRIPTS_LINE.match(line)) is not None:
+            time = datetime.datetime.fromisoformat(matched[1])
+            deployment, message = matched[2], matched[3]
+            if (event := _LIFECYCLE_EVENT.match(message)) is not None:
+                if (running := scripts.pop(deployment, None)) is not None:
+                    yield _script_run(deployment, running)
+
+                scripts[deployment] = (event[1], time, time)
+            elif deployment in scripts:
+                hook, start, _ = scripts[deployment]
+                scripts[deployment] = (hook, start, time)
+        elif (matched := _AGENT_LINE.match(line)) is not None:
+            time = datetime.datetime.fromisoformat(matched[1])
+            yield from agent.feed(time, matched[2])
+
+    for deployment, running in scripts.items():
+        yield _script_run(deployment, running)
+
+    yield from agent.flush()
+
+
+def _script_run(
+    deployment: str,
+    running: tuple[str, datetime.datetime, datetime.datetime],
+) -> HookRun:
+    hook, start, end = running
+    return HookRun(SCRIPTS, deployment, hook, (end - start).total_seconds())
+
+
+def log_files(paths: Iterable[Path]) -> Iterator[Path]:
+    """Files at the paths, and in directories at the paths, in path order."""
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(file for file in path.rglob("*") if file.is_file())
+        else:
+            yield path
+
+
+def read_lines(path: Path) -> Iterator[str]:
+    """Lines of a log file, decompressed if gzip-compressed."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as file:
+        yield from file
+
+
+@dataclass
+class Timings:
+    """Durations of hooks, per deployment and across deployments, in seconds.
+
+    A deployment to several instances takes the longest of their durations.
+    """
+
+    deployments: dict[str, dict[str, float]] = field(default_factory=dict)
+    durations: dict[str, list[float]] = field(default_factory=dict)
+
+    def add(self, run: HookRun) -> None:
+        """Record a hook run."""
+        hooks = self.deployments.setdefault(run.deployment, {})
+        hooks[run.hook] = max(hooks.get(run.hook, 0.0), run.seconds)
+        self.durations.setdefault(run.hook, []).append(run.seconds)
+
+    @property
+    def hooks(self) -> list[str]:
+        """Hooks timed, in lifecycle order."""
+        return sorted(
+            self.durations,
+            key=lambda hook: (HOOKS.index(hook) if hook in HOOKS else len(HOOKS), hook),
+        )
+
+    def percentiles(self) -> dict[str, dict[str, float]]:
+        """Count, percentiles and maximum of the durations of every hook."""
+        stats = {}
+        for hook in self.hooks:
+            durations = sorted(self.durations[hook])
+            stats[hook] = {
+                "count": len(durations),
+                **{
+                    f"p{percent}": durations[
+                        max(0, math.ceil(percent / 100 * len(durations)) - 1)
+                    ]
+                    for percent in PERCENTILES
+                },
+                "max": durations[-1],
+            }
+
+        return stats
+
+
+def time_hooks(paths: Iterable[Path]) -> dict[str, Timings]:
+    """Timings of the hooks logged in the files at the paths, by kind of log."""
+    timings: dict[str, Timings] = {}
+    unknown = itertools.count(1)
+    for path in log_files(paths):
+        for run in parse(read_lines(path), unknown=unknown):
+            timings.setdefault(run.source, Timings()).add(run)
+
+    return {source: timings[source] for source in (AGENT, SCRIPTS) if source in timings}
+
+
+def format_timings(source: str, timings: Timings) -> str:
+    """Timings as tables, of deployments then percentiles."""
+    hooks = timings.hooks
+    width = max(len(hook) for hook in hooks) + 1
+    lines = [f"{source:<24}" + "".join(f"{hook:>{width}}" for hook in hooks)]
+    for deployment, durations in timings.deployments.items():
+        cells = (
+            f"{durations[hook]:>{width}.1f}" if hook in durations else f"{'-':>{width}}"
+            for hook in hooks
+        )
+        lines.append(f"{deployment:<24}" + "".join(cells))
+
+    columns = ("count", *(f"p{percent}" for percent in PERCENTILES), "max")
+    lines += ["", f"{'seconds':<24}" + "".join(f"{column:>8}" for column in columns)]
+    for hook, stats in timings.percentiles().items():
+        count, *values = (stats[column] for column in columns)
+        lines.append(
+            f"{hook:<24}{count:>8}" + "".join(f"{value:>8.1f}" for value in values)
+        )
+
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Time deployment lifecycle hooks.")
+    parser.add_argument("paths", nargs="+", type=Path, metavar="path")
+    parser.add_argument("--json", action="store_true", help="Print timings as JSON.")
+    args = parser.parse_args(argv)
+
+    timings = time_hooks(args.paths)
+    if args.json:
+        document = {
+            source: {
+                "deployments": source_timings.deployments,
+                "percentiles": source_timings.percentiles(),
+            }
+            for source, source_timings in timings.items()
+        }
+        print(json.dumps(document, indent=2))
+    else:
+        print(
+            "\n\n".join(
+                format_timings(source, source_timings)
+                for source, source_timings in timings.items()
+            )
+        )
+
+    if not timings:
+        print("No hooks found", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,9 @@
 
 : '
 Script to create archive and upload the application (build artifacts) to S3.
+
+The archive is uploaded under a key derived from its contents, skipping the
+upload if it already exists. The S3 location is printed as JSON to stdout.
 '
 
 set -o nounset
@@ -9,15 +12,23 @@ set -o errexit
 set -o pipefail
 
 bucket="$1"
-bucket_key="$2"
-echo "Uploading build artifacts to S3 bucket: ${bucket}, key: ${bucket_key}"
+bucket_key_prefix="${2:-}"
+echo "Uploading build artifacts to S3 bucket: ${bucket}, key prefix: ${bucket_key_prefix}" >&2
 
 commit_sha="$(git rev-parse --short HEAD)"
 filename="app-${commit_sha}.zip"
-echo "Commit SHA: ${commit_sha}"
+echo "Commit SHA: ${commit_sha}" >&2
+
+# Bundle dependency wheels for offline installation on the instances
+uv run --frozen python -m scripts.build_wheelhouse --output wheelhouse >&2
 
-git archive --format zip --output "$filename" "$commit_sha" .
-echo "Created archive: ${filename}"
+uv run --frozen --group deploy python -m scripts.build_bundle \
+    --output "$filename" \
+    --add wheelhouse \
+    > bundle-report.json
+echo "Created archive: ${filename}" >&2
 
-aws s3 cp "$filename" "s3://${bucket}/${bucket_key}"
-echo "Uploaded ${filename} to s3://${bucket}/${bucket_key}"
+uv run --frozen --group deploy python -m scripts.upload_bundle \
+    "$bucket" \
+    "$filename" \
+    --prefix "$bucket_key_prefix"
@@ -0,0 +1,202 @@
+"""Build a slim, byte-reproducible CodeDeploy bundle.
+
+Files are selected from the tracked files by the `[tool.bundle]` manifest in
+`pyproject.toml`; the AppSpec file and its hook scripts are always included.
+Entries are written in path order with fixed timestamps and permissions, so the
+same inputs produce the same bytes:
+
+    python -m scripts.build_bundle --output app.zip --add wheelhouse
+
+Already compressed files (e.g. wheels) are stored as-is rather than compressed
+again. A report of the bundle size and file count is printed as JSON.
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import tomllib
+import zipfile
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath, PureWindowsPath
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+APPSPEC_FILE = "appspec.yml"
+
+# Earliest timestamp representable in a zip file
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Regular file, `rw-r--r--`
+FILE_ATTRIBUTES = 0o100644 << 16
+
+STORED_SUFFIXES = frozenset(
+    {".whl", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".png", ".jpg", ".jpeg"},
+)
+
+
+@dataclass(frozen=True)
+class Manifest:
+    """Rules selecting the files of a bundle."""
+
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+
+    @classmethod
+    def from_pyproject(cls, path: Path) -> "Manifest":
+        """Read the manifest from the `[tool.bundle]` table of `pyproject.toml`."""
+        table = tomllib.loads(path.read_text()).get("tool", {}).get("bundle", {})
+        return cls(include=table.get("include", ()), exclude=table.get("exclude", ()))
+
+    def matches(self, path: str) -> bool:
+        """Whether the path, relative to the project root, is to be bundled."""
+        pure = PurePosixPath(path)
+        return any(pure.full_match(p) for p in self.include) and not any(
+            pure.full_match(p) for p in self.exclude
+        )
+
+
+@dataclass
+class BundleReport:
+    """Size and file count of a bundle."""
+
+    files: int = 0
+    size: int = 0
+    compressed_size: int = 0
+    bundle_size: int = 0
+    largest: list[tuple[str, int]] = field(default_factory=list)
+
+
+class BundleError(Exception):
+    """The bundle would not be deployable."""
+
+
+def appspec_hook_scripts(appspec: Path) -> list[str]:
+    """Paths of the hook scripts referenced by an AppSpec file."""
+    document = yaml.safe_load(appspec.read_text())
+    return sorted(
+        PureWindowsPath(script["location"]).as_posix()
+        for scripts in (document.get("hooks") or {}).values()
+        for script in scripts
+    )
+
+
+def tracked_files(root: Path) -> list[str]:
+    """Files tracked by git, relative to the root."""
+    output = subprocess.run(
+        ["git", "ls-files", "-z"],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return [path for path in output.split("\0") if path]
+
+
+def select_files(root: Path, files: Iterable[str], manifest: Manifest) -> list[str]:
+    """Files of the bundle, in path order.
+
+    Raises:
+        BundleError: If a hook script of the AppSpec file is missing.
+
+    """
+    required = [APPSPEC_FILE, *appspec_hook_scripts(root / APPSPEC_FILE)]
+    selected = {path for path in files if manifest.matches(path)}
+    for path in required:
+        if not (root / path).is_file():
+            msg = f"File {path!r} required by {APPSPEC_FILE} does not exist"
+            raise BundleError(msg)
+
+        selected.add(path)
+
+    return sorted(selected)
+
+
+def write_bundle(
+    output: Path,
+    entries: Iterable[tuple[str, Path]],
+    *,
+    compresslevel: int = 9,
+) -> BundleReport:
+    """Write a reproducible zip of given `(archive name, source path)` entries."""
+    report = BundleReport()
+    sizes: list[tuple[str, int]] = []
+    with zipfile.ZipFile(output, "w") as bundle:
+        for name, source in sorted(entries):
+            info = zipfile.ZipInfo(name, date_time=FIXED_DATE_TIME)
+            info.create_system = 3  # Unix, for consistent attributes
+            info.external_attr = FILE_ATTRIBUTES
+            if source.suffix.lower() in STORED_SUFFIXES:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            bundle.writestr(info, source.read_bytes(), compresslevel=compresslevel)
+            report.files += 1
+            report.size += info.file_size
+            report.compressed_size += info.compress_size
+            sizes.append((name, info.compress_size))
+
+    report.bundle_size = output.stat().st_size
+    report.largest = sorted(sizes, key=lambda item: (-item[1], item[0]))[:10]
+    return report
+
+
+def build_bundle(
+    output: Path,
+    *,
+    root: Path = ROOT_DIR,
+    manifest: Manifest | None = None,
+    files: Iterable[str] | None = None,
+    extra_dirs: Iterable[Path] = (),
+) -> BundleReport:
+    """Build the bundle of the project at `root`.
+
+    Files are selected from `files`, tracked files by default, while all files
+    in `extra_dirs` (e.g. a wheelhouse) are added as-is.
+    """
+    manifest = manifest or Manifest.from_pyproject(root / "pyproject.toml")
+    files = tracked_files(root) if files is None else files
+    entries = [(path, root / path) for path in select_files(root, files, manifest)]
+    for directory in map(Path.resolve, extra_dirs):
+        entries.extend(
+            (path.relative_to(directory.parent).as_posix(), path)
+            for path in directory.rglob("*")
+            if path.is_file()
+        )
+
+    return write_bundle(output, entries)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Build a CodeDeploy bundle.")
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument(
+        "--add",
+        type=Path,
+        action="append",
+        default=[],
+        help="Directory to add to the bundle, e.g. a wheelhouse.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    report = build_bundle(args.output, extra_dirs=args.add)
+    logger.info(
+        "Built %s: %d files, %d bytes (%d bytes uncompressed)",
+        args.output,
+        report.files,
+        report.bundle_size,
+        report.size,
+    )
+    print(json.dumps(asdict(report)))
+
+
+if __name__ == "__main__":
+    main()
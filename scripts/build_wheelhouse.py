@@ -0,0 +1,254 @@
+"""Build an offline wheelhouse of the application dependencies for Windows hosts.
+
+Resolves `uv.lock` for the deployment target, downloads the matching wheels and
+verifies them against the locked hashes. The wheelhouse ships in the CodeDeploy
+bundle, so instances install dependencies without network access:
+
+    python -m scripts.build_wheelhouse --output wheelhouse
+
+Wheels are fetched from the URLs in the lockfile, or by file name from a flat
+`--mirror` (e.g. `file:///srv/wheels` or `http://localhost:8080`) when PyPI is
+slow or unreachable.
+"""
+
+import argparse
+import hashlib
+import logging
+import shutil
+import tomllib
+import urllib.request
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from packaging.tags import Tag, compatible_tags, cpython_tags
+from packaging.utils import parse_wheel_filename
+
+from .uv_lock import LockError, locked_packages
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+REQUIREMENTS_FILE = "requirements.txt"
+
+
+@dataclass(frozen=True)
+class Target:
+    """Platform the wheelhouse is built for."""
+
+    python_version: tuple[int, int]
+    platform: str = "win_amd64"
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """Environment marker values of the target, Windows Server 2022.
+
+        Every key is set, as `packaging` fills missing ones from the build host.
+        """
+        python_version = ".".join(map(str, self.python_version))
+        return {
+            "implementation_name": "cpython",
+            "implementation_version": f"{python_version}.0",
+            "os_name": "nt",
+            "platform_machine": "AMD64",
+            "platform_python_implementation": "CPython",
+            "platform_release": "2022Server",
+            "platform_system": "Windows",
+            "platform_version": "10.0.20348",
+            "python_full_version": f"{python_version}.0",
+            "python_version": python_version,
+            "sys_platform": "win32",
+        }
+
+    @property
+    def tags(self) -> list[Tag]:
+        """Supported wheel tags of the target, most preferred first."""
+        return [
+            *cpython_tags(self.python_version, platforms=[self.platform]),
+            *compatible_tags(
+                self.python_version,
+                interpreter=f"cp{self.python_version[0]}{self.python_version[1]}",
+                platforms=[self.platform],
+            ),
+        ]
+
+
+@dataclass(frozen=True)
+class Wheel:
+    """Locked wheel of a package."""
+
+    name: str
+    version: str
+    url: str
+    hash: str
+
+    @property
+    def filename(self) -> str:
+        """File name of the wheel."""
+        return self.url.rsplit("/", 1)[-1]
+
+
+class WheelhouseError(Exception):
+    """Locked dependencies can't be installed offline on the target."""
+
+
+def resolve_wheels(
+    lock: Mapping[str, Any],
+    target: Target,
+    *,
+    groups: Sequence[str] = (),
+) -> list[Wheel]:
+    """Best matching wheel of every package required on the target.
+
+    Walks the dependencies of the project in a parsed `uv.lock`, skipping those
+    whose markers don't apply to the target.
+
+    Raises:
+        WheelhouseError: If a required package has no locked version or wheel for
+            the target.
+
+    """
+    try:
+        packages = locked_packages(lock, groups=groups, environment=target.environment)
+    except LockError as error:
+        raise WheelhouseError(str(error)) from error
+
+    return [_select_wheel(package, target) for package, _ in packages]
+
+
+def _select_wheel(package: Mapping[str, Any], target: Target) -> Wheel:
+    priorities = {tag: priority for priority, tag in enumerate(target.tags)}
+    best: tuple[int, Mapping[str, Any]] | None = None
+    for wheel in package.get("wheels", []):
+        _, _, _, tags = parse_wheel_filename(wheel["url"].rsplit("/", 1)[-1])
+        priority = min(
+            (priorities[tag] for tag in tags if tag in priorities),
+            default=None,
+        )
+        if priority is not None and (best is None or priority < best[0]):
+            best = (priority, wheel)
+
+    if best is None:
+        msg = (
+            f"No wheel of {package['name']}=={package['version']}"
+            f" for {target.platform} (Python {target.environment['python_version']})"
+        )
+        raise WheelhouseError(msg)
+
+    return Wheel(
+        name=package["name"],
+        version=package["version"],
+        url=best[1]["url"],
+        hash=best[1]["hash"],
+    )
+
+
+def download_wheels(
+    wheels: Iterable[Wheel],
+    output: Path,
+    *,
+    mirror: str | None = None,
+    max_workers: int = 8,
+) -> list[Path]:
+    """Download wheels into given directory, verifying their locked hashes.
+
+    Wheels already in the directory with a matching hash are not downloaded
+    again.
+    """
+    output.mkdir(parents=True, exist_ok=True)
+
+    def download(wheel: Wheel) -> Path:
+        path = output / wheel.filename
+        if path.exists() and _file_hash(path, wheel.hash) == wheel.hash:
+            logger.debug("Using existing %s", path)
+            return path
+
+        url = f"{mirror.rstrip('/')}/{wheel.filename}" if mirror else wheel.url
+        logger.info("Downloading %s", url)
+        partial = path.with_name(f"{path.name}.part")
+        with urllib.request.urlopen(url) as response, partial.open("wb") as f:
+            shutil.copyfileobj(response, f)
+
+        if (digest := _file_hash(partial, wheel.hash)) != wheel.hash:
+            partial.unlink()
+            msg = f"Hash mismatch for {wheel.filename}: {digest} != {wheel.hash}"
+            raise WheelhouseError(msg)
+
+        return partial.replace(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(download, wheels))
+
+
+def _file_hash(path: Path, expected: str) -> str:
+    algorithm = expected.split(":", 1)[0]
+    with path.open("rb") as f:
+        return f"{algorithm}:{hashlib.file_digest(f, algorithm).hexdigest()}"
+
+
+def write_requirements(wheels: Iterable[Wheel], output: Path) -> Path:
+    """Write hash-pinned requirements of the wheelhouse, for `--require-hashes`."""
+    path = output / REQUIREMENTS_FILE
+    path.write_text(
+        "".join(
+            f"{wheel.name}=={wheel.version} --hash={wheel.hash}\n" for wheel in wheels
+        ),
+    )
+    return path
+
+
+def default_target(platform: str = "win_amd64") -> Target:
+    """Target of the Python version pinned in `.python-version`."""
+    major, minor = (ROOT_DIR / ".python-version").read_text().strip().split(".")[:2]
+    return Target(python_version=(int(major), int(minor)), platform=platform)
+
+
+def build_wheelhouse(
+    output: Path,
+    *,
+    lockfile: Path = ROOT_DIR / "uv.lock",
+    target: Target | None = None,
+    mirror: str | None = None,
+) -> list[Wheel]:
+    """Resolve, download and pin the application dependencies into `output`."""
+    target = target or default_target()
+    lock = tomllib.loads(lockfile.read_text())
+    wheels = resolve_wheels(lock, target)
+    download_wheels(wheels, output, mirror=mirror)
+    write_requirements(wheels, output)
+
+    # Remove stale wheels of previous builds
+    filenames = {wheel.filename for wheel in wheels}
+    for path in output.glob("*.whl"):
+        if path.name not in filenames:
+            path.unlink()
+
+    return wheels
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(
+        description="Build an offline wheelhouse for Windows hosts."
+    )
+    parser.add_argument("--output", type=Path, default=Path("wheelhouse"))
+    parser.add_argument("--lockfile", type=Path, default=ROOT_DIR / "uv.lock")
+    parser.add_argument("--platform", default="win_amd64")
+    parser.add_argument("--mirror", help="Flat wheel mirror to download from.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    wheels = build_wheelhouse(
+        args.output,
+        lockfile=args.lockfile,
+        target=default_target(args.platform),
+        mirror=args.mirror,
+    )
+    logger.info("Built wheelhouse of %d wheels in %s", len(wheels), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Deploy a bundle uploaded to S3 to CodeDeploy deployment groups.
+
+Deployments to all groups are started at once, then tracked together, logging
+every lifecycle hook of every instance as it completes, with its duration:
+
+    python -m scripts.deploy <application> <group> [<group> ...] \
+        --bucket <bucket> --key app/<digest>.zip --etag <etag>
+
+Polling starts every second and backs off while nothing changes, up to every
+15 seconds. On the first failed hook, or failed deployment, the deployments
+still running are stopped. A summary of the deployments is printed as JSON.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+DEPLOYMENT_CONFIG = "CodeDeployDefault.AllAtOnce"
+
+SUCCEEDED = "Succeeded"
+FAILED = "Failed"
+FINISHED_DEPLOYMENT = frozenset({SUCCEEDED, FAILED, "Stopped"})
+FINISHED_HOOK = frozenset({SUCCEEDED, FAILED, "Skipped"})
+
+# Most targets described per request
+TARGETS_PER_BATCH = 25
+
+
+@dataclass(frozen=True)
+class Polling:
+    """Intervals between polls, in seconds, backing off while nothing changes."""
+
+    initial: float = 1.0
+    factor: float = 1.5
+    maximum: float = 15.0
+
+
+@dataclass(frozen=True)
+class Hook:
+    """Lifecycle hook run on an instance."""
+
+    status: str
+    seconds: float | None
+    diagnostics: str | None = None
+
+
+@dataclass
+class Deployment:
+    """Deployment to a group, with the hooks completed on its instances."""
+
+    group: str
+    deployment_id: str
+    status: str = "Created"
+    hooks: dict[str, dict[str, Hook]] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the deployment has completed, successfully or not."""
+        return self.status in FINISHED_DEPLOYMENT
+
+    @property
+    def failed(self) -> bool:
+        """Whether the deployment, or a hook of one of its instances, failed."""
+        return self.status in FINISHED_DEPLOYMENT - {SUCCEEDED} or any(
+            hook.status == FAILED
+            for hooks in self.hooks.values()
+            for hook in hooks.values()
+        )
+
+
+def start_deployments(
+    codedeploy: Any,
+    application: str,
+    groups: Sequence[str],
+    *,
+    bucket: str,
+    key: str,
+    etag: str | None = None,
+    config: str = DEPLOYMENT_CONFIG,
+) -> list[Deployment]:
+    """Start a deployment of the bundle to every group."""
+    location = {"bucket": bucket, "key": key, "bundleType": "zip"}
+    if etag:
+        location["eTag"] = etag
+
+    deployments = []
+    for group in groups:
+        response = codedeploy.create_deployment(
+            applicationName=application,
+            deploymentGroupName=group,
+            deploymentConfigName=config,
+            revision={"revisionType": "S3", "s3Location": location},
+            ignoreApplicationStopFailures=True,
+        )
+        deployment = Deployment(group, response["deploymentId"])
+        logger.info("[%s] Started deployment %s", group, deployment.deployment_id)
+        deployments.append(deployment)
+
+    return deployments
+
+
+def track(
+    codedeploy: Any,
+    deployments: Sequence[Deployment],
+    *,
+    polling: Polling = Polling(),
+    sleep: Callable[[float], object] = time.sleep,
+) -> bool:
+    """Track the deployments until all complete, or one fails; true if all succeed.
+
+    Deployments still running once one fails are stopped.
+    """
+    interval = polling.initial
+    while True:
+        changed = False
+        for deployment in deployments:
+            if not deployment.finished:
+                changed |= _poll(codedeploy, deployment)
+
+        if any(deployment.failed for deployment in deployments):
+            for deployment in deployments:
+                if not deployment.finished:
+                    logger.warning(
+                        "[%s] Stopping deployment %s",
+                        deployment.group,
+                        deployment.deployment_id,
+                    )
+                    codedeploy.stop_deployment(deploymentId=deployment.deployment_id)
+
+            return False
+
+        if all(deployment.finished for deployment in deployments):
+            return True
+
+        # * Changes come in bursts, e.g. hooks of all instances completing
+        interval = (
+            polling.initial
+            if changed
+            else min(interval * polling.factor, polling.maximum)
+        )
+        sleep(interval)
+
+
+def _poll(codedeploy: Any, deployment: Deployment) -> bool:
+    """Update the deployment and its hooks; true if anything changed."""
+    info = codedeploy.get_deployment(deploymentId=deployment.deployment_id)
+    status = info["deploymentInfo"]["status"]
+    changed = status != deployment.status
+    if changed:
+        logger.info("[%s] Deployment %s", deployment.group, status)
+        deployment.status = status
+
+    target_ids = list(_target_ids(codedeploy, deployment.deployment_id))
+    for start in range(0, len(target_ids), TARGETS_PER_BATCH):
+        response = codedeploy.batch_get_deployment_targets(
+            deploymentId=deployment.deployment_id,
+            targetIds=target_ids[start : start + TARGETS_PER_BATCH],
+        )
+        for target in response["deploymentTargets"]:
+            if (instance := target.get("instanceTarget")) is None:
+                continue
+
+            hooks = deployment.hooks.setdefault(instance["targetId"], {})
+            for event in instance.get("lifecycleEvents", []):
+                name = event["lifecycleEventName"]
+                if name in hooks or event.get("status") not in FINISHED_HOOK:
+                    continue
+
+                hooks[name] = hook = _hook(event)
+                changed = True
+                _log_hook(deployment.group, instance["targetId"], name, hook)
+
+    return changed
+
+
+def _target_ids(codedeploy: Any, deployment_id: str) -> Iterator[str]:
+    kwargs = {"deploymentId": deployment_id}
+    while True:
+        response = codedeploy.list_deployment_targets(**kwargs)
+        yield from response.get("targetIds", [])
+        if not (token := response.get("nextToken")):
+            return
+
+        kwargs["nextToken"] = token
+
+
+def _hook(event: dict[str, Any]) -> Hook:
+    seconds = None
+    if "startTime" in event and "endTime" in event:
+        seconds = (event["endTime"] - event["startTime"]).total_seconds()
+
+    diagnostics = None
+    if event["status"] == FAILED and (details := event.get("diagnostics")):
+        diagnostics = (
+            f"{details.get('scriptName', '')} {details.get('errorCode', '')}:"
+            f" {details.get('message', '')}\n{details.get('logTail', '')}"
+        ).strip()
+
+    return Hook(event["status"], seconds, diagnostics)
+
+
+def _log_hook(group: str, target: str, name: str, hook: Hook) -> None:
+    duration = "" if hook.seconds is None else f" in {hook.seconds:.1f}s"
+    if hook.status == FAILED:
+        logger.error("[%s] %s %s failed%s", group, target, name, duration)
+        if hook.diagnostics:
+            logger.error("%s", hook.diagnostics)
+    else:
+        logger.info("[%s] %s %s %s%s", group, target, name, hook.status, duration)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Deploy a bundle with CodeDeploy.")
+    parser.add_argument("application")
+    parser.add_argument("groups", nargs="+", metavar="group")
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--key", required=True)
+    parser.add_argument("--etag", help="Of the uploaded bundle, to deploy that one.")
+    parser.add_argument("--config", default=DEPLOYMENT_CONFIG)
+    parser.add_argument("--no-wait", dest="wait", action="store_false")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    codedeploy = boto3.client("codedeploy")
+    deployments = start_deployments(
+        codedeploy,
+        args.application,
+        args.groups,
+        bucket=args.bucket,
+        key=args.key,
+        etag=args.etag,
+        config=args.config,
+    )
+    succeeded = not args.wait or track(codedeploy, deployments)
+    print(json.dumps([asdict(deployment) for deployment in deployments]))
+    return 0 if succeeded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
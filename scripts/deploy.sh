@@ -2,6 +2,9 @@
 
 : '
 Script to deploy the application (uploaded to S3) using AWS CodeDeploy.
+
+Deployment groups are comma-separated, deployed to concurrently; see
+`scripts/deploy.py` for the tracking of the deployments.
 '
 
 set -o nounset
@@ -9,31 +12,29 @@ set -o errexit
 set -o pipefail
 
 application_name="$1"
-deployment_group_name="$2"
-echo "Deploying application: ${application_name}, deployment group: ${deployment_group_name}"
+IFS=',' read -r -a deployment_group_names <<< "$2"
+echo "Deploying application: ${application_name}, deployment groups: ${deployment_group_names[*]}" >&2
 
 bucket="$3"
 bucket_key="$4"
-echo "Using S3 bucket: ${bucket}, key: ${bucket_key}"
+echo "Using S3 bucket: ${bucket}, key: ${bucket_key}" >&2
 
 wait="${5:-"1"}"
-echo "Wait for deployment to complete: ${wait}"
-
-deployment_id="$(
-    aws deploy create-deployment \
-        --application-name "$application_name" \
-        --deployment-group-name "$deployment_group_name" \
-        --deployment-config-name CodeDeployDefault.AllAtOnce \
-        --s3-location "bucket=${bucket},bundleType=zip,key=${bucket_key}" \
-        --ignore-application-stop-failures \
-    | jq -r '.deploymentId'
-)"
-echo "Deployment started with ID: ${deployment_id}"
-
-# Wait for the deployment to succeed
-if [ -n "$wait" ]; then
-    echo "Waiting for deployment to complete..."
-    aws deploy wait deployment-successful --deployment-id "$deployment_id"
-else
-    echo "Skipping wait for deployment completion."
+echo "Wait for deployment to complete: ${wait}" >&2
+
+options=(--bucket "$bucket" --key "$bucket_key")
+
+# Optional, to make sure the deployed bundle is the uploaded one
+etag="${6:-}"
+if [ -n "$etag" ]; then
+    options+=(--etag "$etag")
 fi
+
+if [ -z "$wait" ]; then
+    options+=(--no-wait)
+fi
+
+uv run --frozen --group deploy python -m scripts.deploy \
+    "$application_name" \
+    "${deployment_group_names[@]}" \
+    "${options[@]}"
@@ -0,0 +1,337 @@
+"""Run the lifecycle of an AppSpec file locally, timing every stage.
+
+Deploys a bundle, a zip file or a directory, into a sandbox as the CodeDeploy
+agent would on an instance, then reports the wall time of every stage and the
+hooks that came close to their timeout:
+
+    python -m scripts.run_appspec --bundle app.zip --sandbox /tmp/sandbox \
+        --stand-ins tests/stand-ins
+
+The sandbox holds the bundle extracted to `deployment-archive`, and the
+destinations of the `files` section, e.g. `C:\\app` at `C/app`. Stages run in
+the order of an in-place deployment, ApplicationStop from the revision
+previously deployed to the sandbox, if any, as it would on an instance. Every
+hook script runs with its declared timeout, from the archive directory, with the
+`LIFECYCLE_EVENT`, `DEPLOYMENT_ID` and `SANDBOX` environment variables set.
+
+PowerShell scripts run with `pwsh`, unless a stand-in exists: a script at the
+same location under the stand-ins directory, with a `.sh` or `.py` suffix, run
+with `bash` or Python. Unlike the agent, files of the previous revision are not
+removed on install, and existing files are overwritten.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+import zipfile
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PureWindowsPath
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+APPSPEC_FILE = "appspec.yml"
+ARCHIVE_DIR = "deployment-archive"
+
+# Stages of an in-place deployment, in order, DownloadBundle and Install run by
+# the agent itself
+STAGES = (
+    "ApplicationStop",
+    "DownloadBundle",
+    "BeforeInstall",
+    "Install",
+    "AfterInstall",
+    "ApplicationStart",
+    "ValidateService",
+)
+
+# Timeout of a hook script not declaring one, in seconds
+DEFAULT_TIMEOUT = 3600
+
+# Fraction of its timeout over which a hook script is reported
+DEFAULT_WARN_RATIO = 0.8
+
+DEPLOYMENT_ID = "d-LOCAL0000"
+
+SUCCEEDED = "Succeeded"
+FAILED = "Failed"
+TIMED_OUT = "TimedOut"
+SKIPPED = "Skipped"
+
+
+class AppSpecError(Exception):
+    """The AppSpec file or its scripts cannot be run."""
+
+
+@dataclass(frozen=True)
+class Script:
+    """Hook script of an AppSpec file."""
+
+    location: str
+    timeout: float = DEFAULT_TIMEOUT
+
+
+@dataclass(frozen=True)
+class AppSpec:
+    """Files and hooks of an AppSpec file."""
+
+    files: list[tuple[str, str]] = field(default_factory=list)
+    hooks: dict[str, list[Script]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "AppSpec":
+        """Read an AppSpec file."""
+        document = yaml.safe_load(path.read_text()) or {}
+        return cls(
+            files=[
+                (entry["source"], entry["destination"])
+                for entry in document.get("files") or []
+            ],
+            hooks={
+                hook: [
+                    Script(script["location"], script.get("timeout", DEFAULT_TIMEOUT))
+                    for script in scripts or []
+                ]
+                for hook, scripts in (document.get("hooks") or {}).items()
+            },
+        )
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    """Wall time of a stage, or of a hook script, in seconds."""
+
+    stage: str
+    seconds: float
+    status: str = SUCCEEDED
+    script: str | None = None
+    timeout: float | None = None
+
+    def near_timeout(self, ratio: float = DEFAULT_WARN_RATIO) -> bool:
+        """Whether the script ran for over `ratio` of its timeout."""
+        return self.timeout is not None and self.seconds >= ratio * self.timeout
+
+
+def sandbox_path(sandbox: Path, destination: str) -> Path:
+    """Path in the sandbox of a destination of the instance, e.g. `C:\\app`."""
+    pure = PureWindowsPath(destination)
+    drive = pure.drive.rstrip(":")
+    return sandbox.joinpath(drive, *pure.parts[1:])
+
+
+def _command(archive: Path, location: str, stand_ins: Path | None) -> list[str]:
+    relative = PureWindowsPath(location).as_posix()
+    if stand_ins is not None:
+        for suffix, interpreter in ((".sh", "bash"), (".py", sys.executable)):
+            if (stand_in := (stand_ins / relative).with_suffix(suffix)).is_file():
+                return [interpreter, str(stand_in)]
+
+    script = archive / relative
+    if script.suffix.lower() == ".ps1":
+        if (pwsh := shutil.which("pwsh")) is None:
+            msg = f"No pwsh to run {location}, nor stand-in for it"
+            raise AppSpecError(msg)
+
+        return [pwsh, "-NoProfile", "-NonInteractive", "-File", str(script)]
+
+    return [str(script)]
+
+
+def _run_script(
+    hook: str,
+    script: Script,
+    *,
+    archive: Path,
+    sandbox: Path,
+    stand_ins: Path | None,
+) -> StageTiming:
+    command = _command(archive, script.location, stand_ins)
+    env = {
+        **os.environ,
+        "LIFECYCLE_EVENT": hook,
+        "DEPLOYMENT_ID": DEPLOYMENT_ID,
+        "SANDBOX": str(sandbox),
+    }
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(command, cwd=archive, env=env, timeout=script.timeout)
+    except subprocess.TimeoutExpired:
+        status = TIMED_OUT
+    else:
+        status = SUCCEEDED if process.returncode == 0 else FAILED
+
+    return StageTiming(
+        hook,
+        time.perf_counter() - start,
+        status,
+        script=script.location,
+        timeout=script.timeout,
+    )
+
+
+def _timed(stage: str, func: Callable[[], object]) -> StageTiming:
+    start = time.perf_counter()
+    func()
+    return StageTiming(stage, time.perf_counter() - start)
+
+
+def _download(bundle: Path, archive: Path) -> None:
+    shutil.rmtree(archive, ignore_errors=True)
+    if bundle.is_dir():
+        shutil.copytree(bundle, archive, ignore=shutil.ignore_patterns(".git"))
+    else:
+        with zipfile.ZipFile(bundle) as file:
+            file.extractall(archive)
+
+
+def _install(appspec: AppSpec, archive: Path, sandbox: Path) -> None:
+    for source, destination in appspec.files:
+        path = archive / PureWindowsPath(source).as_posix().lstrip("/")
+        target = sandbox_path(sandbox, destination)
+        if path.is_dir():
+            shutil.copytree(path, target, dirs_exist_ok=True)
+        else:
+            target.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path, target / path.name)
+
+
+def _run_hook(
+    stage: str,
+    appspec: AppSpec,
+    *,
+    archive: Path,
+    sandbox: Path,
+    stand_ins: Path | None,
+) -> list[StageTiming]:
+    timings = []
+    for script in appspec.hooks.get(stage, []):
+        timing = _run_script(
+            stage, script, archive=archive, sandbox=sandbox, stand_ins=stand_ins
+        )
+        timings.append(timing)
+        logger.info(
+            "%s %s %s in %.2fs", stage, script.location, timing.status, timing.seconds
+        )
+        if timing.status != SUCCEEDED:
+            break
+
+    return timings
+
+
+def run(
+    bundle: Path,
+    sandbox: Path,
+    *,
+    stand_ins: Path | None = None,
+) -> list[StageTiming]:
+    """Deploy the bundle to the sandbox, stopping at the first failed script."""
+    archive = sandbox / ARCHIVE_DIR
+    # * The previous revision stops the application, from its own archive
+    previous = sandbox / f"{ARCHIVE_DIR}-previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if archive.is_dir():
+        archive.rename(previous)
+
+    timings = []
+    for stage in STAGES:
+        if stage == "ApplicationStop":
+            if not previous.is_dir():
+                timings.append(StageTiming(stage, 0.0, SKIPPED))
+                continue
+
+            appspec, directory = AppSpec.load(previous / APPSPEC_FILE), previous
+        elif stage == "DownloadBundle":
+            timings.append(_timed(stage, lambda: _download(bundle, archive)))
+            continue
+        else:
+            appspec, directory = AppSpec.load(archive / APPSPEC_FILE), archive
+
+        if stage == "Install":
+            timings.append(_timed(stage, lambda: _install(appspec, archive, sandbox)))
+            continue
+
+        hook_timings = _run_hook(
+            stage, appspec, archive=directory, sandbox=sandbox, stand_ins=stand_ins
+        )
+        timings += hook_timings
+        if any(timing.status != SUCCEEDED for timing in hook_timings):
+            break
+
+    return timings
+
+
+def format_timings(
+    timings: Sequence[StageTiming],
+    *,
+    warn_ratio: float = DEFAULT_WARN_RATIO,
+) -> str:
+    """Timings as a table, marking scripts near their timeout."""
+    lines = [
+        f"{'stage':<18} {'script':<32} {'status':<10} {'seconds':>8} {'timeout':>8}"
+    ]
+    for timing in timings:
+        timeout = "" if timing.timeout is None else f"{timing.timeout:>8g}"
+        mark = "  near timeout" if timing.near_timeout(warn_ratio) else ""
+        lines.append(
+            f"{timing.stage:<18} {timing.script or '':<32} {timing.status:<10}"
+            f" {timing.seconds:>8.2f} {timeout:>8}{mark}"
+        )
+
+    lines.append(f"{'total':<62} {sum(t.seconds for t in timings):>8.2f}")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Run an AppSpec lifecycle locally.")
+    parser.add_argument(
+        "--bundle",
+        type=Path,
+        required=True,
+        help="Zip file, e.g. built by `scripts.build_bundle`, or directory.",
+    )
+    parser.add_argument("--sandbox", type=Path, required=True)
+    parser.add_argument("--stand-ins", type=Path, help="Scripts run instead.")
+    parser.add_argument("--warn-ratio", type=float, default=DEFAULT_WARN_RATIO)
+    parser.add_argument("--json", action="store_true", help="Print timings as JSON.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    timings = run(args.bundle, args.sandbox, stand_ins=args.stand_ins)
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {
+                        **asdict(timing),
+                        "near_timeout": timing.near_timeout(args.warn_ratio),
+                    }
+                    for timing in timings
+                ]
+            )
+        )
+    else:
+        print(format_timings(timings, warn_ratio=args.warn_ratio))
+
+    for timing in timings:
+        if timing.near_timeout(args.warn_ratio):
+            logger.warning(
+                "%s %s took %.1fs of its %gs timeout",
+                timing.stage,
+                timing.script,
+                timing.seconds,
+                timing.timeout,
+            )
+
+    return 0 if all(t.status in {SUCCEEDED, SKIPPED} for t in timings) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
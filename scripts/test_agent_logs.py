@@ -0,0 +1,185 @@
+import gzip
+import itertools
+import json
+import shutil
+import tracemalloc
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from .agent_logs import main, parse, read_lines, time_hooks
+
+LOGS_DIR = Path(__file__).parent / "testdata" / "agent_logs"
+
+
+def _runs(path: Path) -> list[tuple[str, str, float, str | None]]:
+    return [
+        (run.deployment, run.hook, run.seconds, run.status)
+        for run in parse(read_lines(path))
+    ]
+
+
+@pytest.mark.unit
+def test_parse_agent_log() -> None:
+    runs = _runs(LOGS_DIR / "host-1" / "log" / "codedeploy-agent-log.txt")
+
+    assert runs == [
+        # The previous revision, logged by ApplicationStop, is not the deployment
+        ("d-7XK2M4Q9A", "ApplicationStop", 3, "Succeeded"),
+        ("d-7XK2M4Q9A", "DownloadBundle", 8, "Succeeded"),
+        ("d-7XK2M4Q9A", "Install", 4, "Succeeded"),
+        ("d-7XK2M4Q9A", "AfterInstall", 45, "Succeeded"),
+        ("d-7XK2M4Q9A", "ApplicationStart", 9, "Succeeded"),
+        ("d-7XK2M4Q9A", "ValidateService", 3, "Succeeded"),
+        ("d-B3N8V1R5C", "ApplicationStop", 40, "Succeeded"),
+        ("d-B3N8V1R5C", "DownloadBundle", 6, "Succeeded"),
+        ("d-B3N8V1R5C", "Install", 3, "Succeeded"),
+        ("d-B3N8V1R5C", "AfterInstall", 30, "Succeeded"),
+        ("d-B3N8V1R5C", "ApplicationStart", 60, "Code Error"),
+    ]
+
+
+@pytest.mark.unit
+def test_parse_agent_log_client_calls() -> None:
+    runs = _runs(LOGS_DIR / "host-2" / "log" / "codedeploy-agent-log.txt")
+
+    assert runs == [
+        ("d-7XK2M4Q9A", "ApplicationStop", 1, "Succeeded"),
+        ("d-7XK2M4Q9A", "DownloadBundle", 12, "Succeeded"),
+        ("d-7XK2M4Q9A", "AfterInstall", 52, "Succeeded"),
+    ]
+
+
+@pytest.mark.unit
+def test_parse_deployments_log() -> None:
+    path = LOGS_DIR / "host-1" / "deployment-logs" / "codedeploy-agent-deployments.log"
+
+    runs = list(parse(read_lines(path)))
+
+    assert {run.source for run in runs} == {"scripts"}
+    assert [(run.hook, run.seconds) for run in runs] == [
+        # Up to the last output of the hook
+        ("AfterInstall", pytest.approx(44.68)),
+        ("ApplicationStart", pytest.approx(8.89)),
+        ("ValidateService", pytest.approx(2.75)),
+    ]
+
+
+@pytest.mark.unit
+def test_time_hooks(tmp_path: Path) -> None:
+    shutil.copytree(LOGS_DIR, tmp_path, dirs_exist_ok=True)
+    # Rotated logs are compressed
+    path = tmp_path / "host-2" / "log" / "codedeploy-agent-log.txt"
+    with gzip.open(path.with_suffix(".txt.gz"), "wb") as file:
+        file.write(path.read_bytes())
+
+    path.unlink()
+
+    timings = time_hooks([tmp_path])
+
+    assert list(timings) == ["agent", "scripts"]
+    agent = timings["agent"]
+    # The slowest instance of the deployment
+    assert agent.deployments["d-7XK2M4Q9A"]["AfterInstall"] == 52
+    assert agent.hooks == [
+        "ApplicationStop",
+        "DownloadBundle",
+        "Install",
+        "AfterInstall",
+        "ApplicationStart",
+        "ValidateService",
+    ]
+    assert agent.percentiles()["AfterInstall"] == {
+        "count": 3,
+        "p50": 45,
+        "p90": 52,
+        "p99": 52,
+        "max": 52,
+    }
+
+
+@pytest.mark.unit
+def test_time_hooks_unknown_deployments(tmp_path: Path) -> None:
+    # Deployments whose ID isn't logged, on two hosts
+    for host, seconds in (("host-1", 5), ("host-2", 7)):
+        path = tmp_path / host / "codedeploy-agent-log.txt"
+        path.parent.mkdir()
+        path.write_text(
+            "2025-03-04T02:10:00 INFO  [codedeploy-agent(1)]: "
+            "Received command: DownloadBundle\n"
+            f"2025-03-04T02:10:0{seconds} INFO  [codedeploy-agent(1)]: "
+            'Calling PutHostCommandComplete: "Succeeded"\n'
+        )
+
+    timings = time_hooks([tmp_path])
+
+    assert timings["agent"].deployments == {
+        "unknown-1": {"DownloadBundle": 5},
+        "unknown-2": {"DownloadBundle": 7},
+    }
+
+
+@pytest.mark.unit
+def test_parse_constant_memory() -> None:
+    def lines() -> Iterator[str]:
+        for number in itertools.count():
+            yield from (
+                f"2025-03-04T02:10:0{second} INFO  [codedeploy-agent(1)]: {message}\n"
+                for second, message in enumerate(
+                    [
+                        "Received command: DownloadBundle",
+                        f"Downloading to C:/CodeDeploy/d-{number:09d}/bundle.tar",
+                        'Calling PutHostCommandComplete: "Succeeded"',
+                        "x" * 200,
+                    ]
+                )
+            )
+
+    def peak(deployments: int) -> int:
+        tracemalloc.start()
+        try:
+            for _ in parse(itertools.islice(lines(), deployments * 4)):
+                pass
+
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(20_000) < peak(1_000) * 1.5
+
+
+@pytest.mark.unit
+def test_main(capsys: pytest.CaptureFixture[str]) -> None:
+    assert main([str(LOGS_DIR / "host-1" / "log"), "--json"]) == 0
+
+    document = json.loads(capsys.readouterr().out)
+    assert document["agent"]["deployments"]["d-B3N8V1R5C"]["ApplicationStart"] == 60
+
+    assert main([str(LOGS_DIR)]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == [
+        "agent",
+        "ApplicationStop",
+        "DownloadBundle",
+        "Install",
+        "AfterInstall",
+        "ApplicationStart",
+        "ValidateService",
+    ]
+    assert lines[2].split() == [
+        "d-B3N8V1R5C",
+        "40.0",
+        "6.0",
+        "3.0",
+        "30.0",
+        "60.0",
+        "-",
+    ]
+    assert "scripts" in lines[12]
+
+
+@pytest.mark.unit
+def test_main_nothing_found(tmp_path: Path) -> None:
+    assert main([str(tmp_path)]) == 1
@@ -0,0 +1,152 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from .build_bundle import (
+    FIXED_DATE_TIME,
+    ROOT_DIR,
+    BundleError,
+    Manifest,
+    build_bundle,
+    select_files,
+)
+
+APPSPEC = """\
+version: 0.0
+os: windows
+files:
+  - source: \\
+    destination: C:\\app
+hooks:
+  AfterInstall:
+    - location: deploy\\AfterInstall.ps1
+      timeout: 300
+"""
+MANIFEST = Manifest(include=["main.py", "src/**/*.py"], exclude=["**/test_*.py"])
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    root = tmp_path / "project"
+    files = {
+        "appspec.yml": APPSPEC,
+        "deploy/AfterInstall.ps1": "uv sync\r\n",
+        "main.py": "app = None\n",
+        "src/__init__.py": "",
+        "src/api.py": "def api(): ...\n" * 100,
+        "src/test_api.py": "def test_api(): ...\n",
+        "infra/__main__.py": "import pulumi\n",
+        "README.md": "# Project\n",
+    }
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content, newline="")
+
+    wheelhouse = root / "wheelhouse"
+    wheelhouse.mkdir()
+    (wheelhouse / "app-1.0.0-py3-none-any.whl").write_bytes(b"PK\x03\x04wheel")
+    (wheelhouse / "requirements.txt").write_text("app==1.0.0\n")
+    return root
+
+
+def _build(project: Path, output: Path) -> Path:
+    build_bundle(
+        output,
+        root=project,
+        manifest=MANIFEST,
+        files=[
+            str(path.relative_to(project))
+            for path in project.rglob("*")
+            if path.is_file() and path.parent.name != "wheelhouse"
+        ],
+        extra_dirs=[project / "wheelhouse"],
+    )
+    return output
+
+
+@pytest.mark.unit
+def test_build_bundle_selects_files(project: Path, tmp_path: Path) -> None:
+    bundle = _build(project, tmp_path / "app.zip")
+
+    with zipfile.ZipFile(bundle) as archive:
+        assert archive.namelist() == [
+            "appspec.yml",
+            "deploy/AfterInstall.ps1",
+            "main.py",
+            "src/__init__.py",
+            "src/api.py",
+            "wheelhouse/app-1.0.0-py3-none-any.whl",
+            "wheelhouse/requirements.txt",
+        ]
+        infos = {info.filename: info for info in archive.infolist()}
+        # Line endings are kept for Windows hosts
+        assert archive.read("deploy/AfterInstall.ps1") == b"uv sync\r\n"
+
+    assert {info.date_time for info in infos.values()} == {FIXED_DATE_TIME}
+    wheel = infos["wheelhouse/app-1.0.0-py3-none-any.whl"]
+    assert wheel.compress_type == zipfile.ZIP_STORED
+    source = infos["src/api.py"]
+    assert source.compress_type == zipfile.ZIP_DEFLATED
+    assert source.compress_size < source.file_size
+
+
+@pytest.mark.unit
+def test_build_bundle_reproducible(project: Path, tmp_path: Path) -> None:
+    first = _build(project, tmp_path / "first.zip")
+    # Modification times and creation order of the sources do not matter
+    (project / "main.py").touch()
+    (project / "src/api.py").write_text((project / "src/api.py").read_text())
+    second = _build(project, tmp_path / "second.zip")
+
+    assert first.read_bytes() == second.read_bytes()
+
+
+@pytest.mark.unit
+def test_build_bundle_report(project: Path, tmp_path: Path) -> None:
+    report = build_bundle(
+        tmp_path / "app.zip",
+        root=project,
+        manifest=MANIFEST,
+        files=["main.py", "src/api.py"],
+    )
+
+    assert report.files == 4
+    assert report.size == sum(
+        (project / path).stat().st_size
+        for path in ("appspec.yml", "deploy/AfterInstall.ps1", "main.py", "src/api.py")
+    )
+    assert report.bundle_size == (tmp_path / "app.zip").stat().st_size
+    assert report.largest[0][0] == "appspec.yml"
+
+
+@pytest.mark.unit
+def test_select_files_missing_hook_script(project: Path) -> None:
+    (project / "deploy/AfterInstall.ps1").unlink()
+
+    with pytest.raises(BundleError, match=r"'deploy/AfterInstall\.ps1' required"):
+        select_files(project, ["main.py"], MANIFEST)
+
+
+@pytest.mark.unit
+def test_project_manifest() -> None:
+    manifest = Manifest.from_pyproject(ROOT_DIR / "pyproject.toml")
+
+    files = select_files(
+        ROOT_DIR,
+        [
+            "main.py",
+            "src/nothing.py",
+            "src/test_nothing.py",
+            "src/loadtest.py",
+            "infra/vpc.py",
+        ],
+        manifest,
+    )
+
+    assert "main.py" in files
+    assert "src/nothing.py" in files
+    assert "deploy/ApplicationStart.ps1" in files
+    assert "src/test_nothing.py" not in files
+    assert "src/loadtest.py" not in files
+    assert "infra/vpc.py" not in files
@@ -0,0 +1,250 @@
+import hashlib
+import tomllib
+from pathlib import Path
+
+import pytest
+from packaging.markers import Marker, default_environment
+
+from .build_wheelhouse import (
+    ROOT_DIR,
+    Target,
+    WheelhouseError,
+    build_wheelhouse,
+    default_target,
+    resolve_wheels,
+)
+
+TARGET = Target(python_version=(3, 13))
+PYPI = "https://files.pythonhosted.org/packages"
+
+
+def _lock(*packages: dict) -> dict:
+    return {
+        "package": [
+            {
+                "name": "app",
+                "version": "0.1.0",
+                "source": {"virtual": "."},
+                "dependencies": [
+                    {"name": "web", "extra": ["standard"]},
+                    {"name": "colors", "marker": "sys_platform == 'win32'"},
+                ],
+            },
+            *packages,
+        ],
+    }
+
+
+def _package(name: str, version: str, *filenames: str, **extra: object) -> dict:
+    return {
+        "name": name,
+        "version": version,
+        "wheels": [
+            {"url": f"{PYPI}/{filename}", "hash": f"sha256:{filename}"}
+            for filename in filenames
+        ],
+        **extra,
+    }
+
+
+@pytest.mark.unit
+def test_resolve_wheels_for_windows() -> None:
+    lock = _lock(
+        _package(
+            "web",
+            "1.0.0",
+            "web-1.0.0-py3-none-any.whl",
+            dependencies=[{"name": "core"}],
+            **{
+                "optional-dependencies": {
+                    "standard": [{"name": "loop", "marker": "sys_platform != 'win32'"}],
+                },
+            },
+        ),
+        _package(
+            "core",
+            "2.0.0",
+            "core-2.0.0-cp313-cp313-manylinux_2_17_x86_64.whl",
+            "core-2.0.0-cp313-cp313-win_amd64.whl",
+            "core-2.0.0-cp313-cp313-win32.whl",
+        ),
+        _package("loop", "3.0.0", "loop-3.0.0-cp313-cp313-manylinux_2_17_x86_64.whl"),
+        _package(
+            "colors",
+            "4.0.0",
+            "colors-4.0.0-py2.py3-none-any.whl",
+            "colors-4.0.0-cp313-abi3-win_amd64.whl",
+        ),
+    )
+
+    wheels = resolve_wheels(lock, TARGET)
+
+    assert [wheel.filename for wheel in wheels] == [
+        "colors-4.0.0-cp313-abi3-win_amd64.whl",
+        "core-2.0.0-cp313-cp313-win_amd64.whl",
+        "web-1.0.0-py3-none-any.whl",
+    ]
+
+
+@pytest.mark.unit
+def test_resolve_wheels_forked_resolution() -> None:
+    lock = _lock(
+        _package("web", "1.0.0", "web-1.0.0-py3-none-any.whl"),
+        _package(
+            "colors",
+            "4.0.0",
+            "colors-4.0.0-py3-none-any.whl",
+            **{"resolution-markers": ["python_full_version >= '3.14'"]},
+        ),
+        _package(
+            "colors",
+            "3.0.0",
+            "colors-3.0.0-py3-none-any.whl",
+            **{"resolution-markers": ["python_full_version < '3.14'"]},
+        ),
+    )
+
+    wheels = resolve_wheels(lock, TARGET)
+
+    assert {wheel.name: wheel.version for wheel in wheels} == {
+        "colors": "3.0.0",
+        "web": "1.0.0",
+    }
+
+
+@pytest.mark.unit
+def test_resolve_wheels_no_matching_fork() -> None:
+    lock = _lock(
+        _package("web", "1.0.0", "web-1.0.0-py3-none-any.whl"),
+        _package(
+            "colors",
+            "4.0.0",
+            "colors-4.0.0-py3-none-any.whl",
+            **{"resolution-markers": ["python_full_version >= '3.14'"]},
+        ),
+        _package(
+            "colors",
+            "3.0.0",
+            "colors-3.0.0-py3-none-any.whl",
+            **{"resolution-markers": ["python_full_version < '3.12'"]},
+        ),
+    )
+
+    with pytest.raises(WheelhouseError, match="No locked package of colors"):
+        resolve_wheels(lock, TARGET)
+
+
+@pytest.mark.unit
+def test_target_environment_independent_of_host() -> None:
+    environment = TARGET.environment
+
+    assert set(environment) == set(default_environment())
+    assert Marker("platform_release == '2022Server'").evaluate(environment)
+    assert not Marker("'linux' in platform_version").evaluate(environment)
+
+
+@pytest.mark.unit
+def test_resolve_wheels_sdist_only() -> None:
+    lock = _lock(
+        _package("web", "1.0.0", "web-1.0.0-cp313-cp313-manylinux_2_17_x86_64.whl"),
+        _package("colors", "4.0.0", "colors-4.0.0-py3-none-any.whl"),
+    )
+
+    with pytest.raises(WheelhouseError, match=r"No wheel of web==1\.0\.0"):
+        resolve_wheels(lock, TARGET)
+
+
+@pytest.mark.unit
+def test_resolve_wheels_project_lock() -> None:
+    lock = tomllib.loads((ROOT_DIR / "uv.lock").read_text())
+
+    wheels = {wheel.name: wheel for wheel in resolve_wheels(lock, default_target())}
+
+    assert "fastapi" in wheels
+    assert wheels["pydantic-core"].filename.endswith("-win_amd64.whl")
+    # Not supported on Windows
+    assert "uvloop" not in wheels
+    # Dependency groups are not deployed
+    assert "pytest" not in wheels
+
+
+def _mirror(tmp_path: Path, contents: dict[str, bytes]) -> Path:
+    """Lockfile of the wheels with given contents, served from a local mirror."""
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    lock = [
+        "[[package]]",
+        'name = "app"',
+        'version = "0.1.0"',
+        'source = { virtual = "." }',
+        'dependencies = [{ name = "web" }, { name = "colors" }]',
+    ]
+    for filename, content in contents.items():
+        (mirror / filename).write_bytes(content)
+        name, version = filename.split("-")[:2]
+        digest = hashlib.sha256(content).hexdigest()
+        lock += [
+            "[[package]]",
+            f'name = "{name}"',
+            f'version = "{version}"',
+            f'wheels = [{{ url = "{PYPI}/{filename}", hash = "sha256:{digest}" }}]',
+        ]
+
+    lockfile = tmp_path / "uv.lock"
+    lockfile.write_text("\n".join(lock))
+    return lockfile
+
+
+@pytest.mark.unit
+def test_build_wheelhouse_from_mirror(tmp_path: Path) -> None:
+    lockfile = _mirror(
+        tmp_path,
+        {
+            "web-1.0.0-py3-none-any.whl": b"web",
+            "colors-4.0.0-py3-none-any.whl": b"colors",
+        },
+    )
+    output = tmp_path / "wheelhouse"
+    output.mkdir()
+    (output / "stale-0.1.0-py3-none-any.whl").write_bytes(b"stale")
+
+    build_wheelhouse(
+        output,
+        lockfile=lockfile,
+        target=TARGET,
+        mirror=(tmp_path / "mirror").as_uri(),
+    )
+
+    assert sorted(path.name for path in output.iterdir()) == [
+        "colors-4.0.0-py3-none-any.whl",
+        "requirements.txt",
+        "web-1.0.0-py3-none-any.whl",
+    ]
+    assert (output / "requirements.txt").read_text() == (
+        f"colors==4.0.0 --hash=sha256:{hashlib.sha256(b'colors').hexdigest()}\n"
+        f"web==1.0.0 --hash=sha256:{hashlib.sha256(b'web').hexdigest()}\n"
+    )
+
+
+@pytest.mark.unit
+def test_build_wheelhouse_hash_mismatch(tmp_path: Path) -> None:
+    lockfile = _mirror(
+        tmp_path,
+        {
+            "web-1.0.0-py3-none-any.whl": b"web",
+            "colors-4.0.0-py3-none-any.whl": b"colors",
+        },
+    )
+    (tmp_path / "mirror" / "web-1.0.0-py3-none-any.whl").write_bytes(b"tampered")
+    output = tmp_path / "wheelhouse"
+
+    with pytest.raises(WheelhouseError, match="Hash mismatch for web-1.0.0"):
+        build_wheelhouse(
+            output,
+            lockfile=lockfile,
+            target=TARGET,
+            mirror=(tmp_path / "mirror").as_uri(),
+        )
+
+    assert not (output / "web-1.0.0-py3-none-any.whl").exists()
+    assert not (output / "web-1.0.0-py3-none-any.whl.part").exists()
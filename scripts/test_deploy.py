@@ -0,0 +1,228 @@
+import datetime
+import logging
+from collections.abc import Iterator
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from .deploy import Hook, Polling, start_deployments, track
+
+APPLICATION = "app"
+START = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+
+
+@pytest.fixture
+def codedeploy() -> Iterator[tuple[object, Stubber]]:
+    client = boto3.Session(
+        region_name="ap-northeast-2",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    ).client("codedeploy")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def _event(name: str, status: str, seconds: float | None = None) -> dict:
+    event: dict = {"lifecycleEventName": name, "status": status}
+    if seconds is not None:
+        event |= {
+            "startTime": START,
+            "endTime": START + datetime.timedelta(seconds=seconds),
+        }
+
+    return event
+
+
+def _poll(
+    stubber: Stubber,
+    deployment_id: str,
+    status: str,
+    events: dict[str, list[dict]],
+) -> None:
+    stubber.add_response(
+        "get_deployment",
+        {"deploymentInfo": {"deploymentId": deployment_id, "status": status}},
+        {"deploymentId": deployment_id},
+    )
+    stubber.add_response(
+        "list_deployment_targets",
+        {"targetIds": list(events)},
+        {"deploymentId": deployment_id},
+    )
+    if events:
+        stubber.add_response(
+            "batch_get_deployment_targets",
+            {
+                "deploymentTargets": [
+                    {
+                        "deploymentTargetType": "InstanceTarget",
+                        "instanceTarget": {
+                            "targetId": target,
+                            "lifecycleEvents": target_events,
+                        },
+                    }
+                    for target, target_events in events.items()
+                ]
+            },
+            {"deploymentId": deployment_id, "targetIds": list(events)},
+        )
+
+
+@pytest.mark.unit
+def test_start_deployments(codedeploy: tuple[object, Stubber]) -> None:
+    client, stubber = codedeploy
+    for group, deployment_id in [("blue", "d-1"), ("green", "d-2")]:
+        stubber.add_response(
+            "create_deployment",
+            {"deploymentId": deployment_id},
+            {
+                "applicationName": APPLICATION,
+                "deploymentGroupName": group,
+                "deploymentConfigName": "CodeDeployDefault.AllAtOnce",
+                "revision": {
+                    "revisionType": "S3",
+                    "s3Location": {
+                        "bucket": "artifacts",
+                        "key": "app/abc.zip",
+                        "bundleType": "zip",
+                        "eTag": "etag",
+                    },
+                },
+                "ignoreApplicationStopFailures": True,
+            },
+        )
+
+    deployments = start_deployments(
+        client,
+        APPLICATION,
+        ["blue", "green"],
+        bucket="artifacts",
+        key="app/abc.zip",
+        etag="etag",
+    )
+
+    assert [(d.group, d.deployment_id) for d in deployments] == [
+        ("blue", "d-1"),
+        ("green", "d-2"),
+    ]
+
+
+@pytest.mark.unit
+def test_track(
+    codedeploy: tuple[object, Stubber],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    client, stubber = codedeploy
+    [blue, green] = _deployments(client, stubber)
+    pending = _event("AfterInstall", "Pending")
+    # Started, then nothing happens for two polls, then hooks complete
+    for _ in range(3):
+        _poll(stubber, "d-1", "InProgress", {"i-1": [pending]})
+        _poll(stubber, "d-2", "InProgress", {})
+    _poll(
+        stubber,
+        "d-1",
+        "InProgress",
+        {"i-1": [_event("ApplicationStop", "Succeeded", 2.5), pending]},
+    )
+    _poll(stubber, "d-2", "InProgress", {"i-2": [pending]})
+    _poll(
+        stubber,
+        "d-1",
+        "Succeeded",
+        {
+            "i-1": [
+                _event("ApplicationStop", "Succeeded", 2.5),
+                _event("AfterInstall", "Succeeded", 40),
+            ]
+        },
+    )
+    _poll(stubber, "d-2", "Succeeded", {"i-2": [_event("AfterInstall", "Skipped")]})
+    intervals: list[float] = []
+
+    with caplog.at_level(logging.INFO):
+        succeeded = track(
+            client,
+            [blue, green],
+            polling=Polling(initial=1, factor=2, maximum=3),
+            sleep=intervals.append,
+        )
+
+    assert succeeded
+    # Backing off while nothing changes, polling fast again once it does
+    assert intervals == [1, 2, 3, 1]
+    assert blue.hooks == {
+        "i-1": {
+            "ApplicationStop": Hook("Succeeded", 2.5),
+            "AfterInstall": Hook("Succeeded", 40),
+        }
+    }
+    assert green.hooks == {"i-2": {"AfterInstall": Hook("Skipped", None)}}
+    assert "[blue] i-1 ApplicationStop Succeeded in 2.5s" in caplog.messages
+    assert "[green] Deployment Succeeded" in caplog.messages
+
+
+@pytest.mark.unit
+def test_track_fails_fast(
+    codedeploy: tuple[object, Stubber],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    client, stubber = codedeploy
+    [blue, green] = _deployments(client, stubber)
+    failed = _event("ApplicationStart", "Failed", 60)
+    failed["diagnostics"] = {
+        "errorCode": "ScriptFailed",
+        "scriptName": "deploy\\ApplicationStart.ps1",
+        "message": "Script at specified location failed",
+        "logTail": "SERVICE_PAUSED",
+    }
+    _poll(stubber, "d-1", "InProgress", {"i-1": [failed]})
+    _poll(
+        stubber, "d-2", "InProgress", {"i-2": [_event("ApplicationStart", "Pending")]}
+    )
+    # Both still running, the failed one until its other instances complete
+    for deployment_id in ("d-1", "d-2"):
+        stubber.add_response(
+            "stop_deployment",
+            {"status": "Pending"},
+            {"deploymentId": deployment_id},
+        )
+
+    succeeded = track(client, [blue, green], sleep=_no_sleep)
+
+    assert not succeeded
+    assert blue.failed
+    assert not green.failed
+    hook = blue.hooks["i-1"]["ApplicationStart"]
+    assert hook.seconds == 60
+    assert hook.diagnostics == (
+        "deploy\\ApplicationStart.ps1 ScriptFailed:"
+        " Script at specified location failed\nSERVICE_PAUSED"
+    )
+    assert "[blue] i-1 ApplicationStart failed in 60.0s" in caplog.messages
+
+
+@pytest.mark.unit
+def test_track_failed_deployment(codedeploy: tuple[object, Stubber]) -> None:
+    client, stubber = codedeploy
+    [blue, green] = _deployments(client, stubber)
+    # Failed before any instance was deployed to
+    _poll(stubber, "d-1", "Failed", {})
+    _poll(stubber, "d-2", "Succeeded", {})
+
+    assert not track(client, [blue, green], sleep=_no_sleep)
+
+
+def _no_sleep(seconds: float) -> None:
+    pytest.fail(f"Polled again after {seconds} seconds")
+
+
+def _deployments(client: object, stubber: Stubber) -> list:
+    for deployment_id in ("d-1", "d-2"):
+        stubber.add_response("create_deployment", {"deploymentId": deployment_id})
+
+    return start_deployments(
+        client, APPLICATION, ["blue", "green"], bucket="artifacts", key="app/abc.zip"
+    )
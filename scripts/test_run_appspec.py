@@ -0,0 +1,196 @@
+import json
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from .run_appspec import (
+    AppSpec,
+    AppSpecError,
+    Script,
+    StageTiming,
+    main,
+    run,
+    sandbox_path,
+)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+APPSPEC = """\
+version: 0.0
+os: windows
+files:
+  - source: \\
+    destination: C:\\app
+hooks:
+  ApplicationStop:
+    - location: deploy\\ApplicationStop.ps1
+      timeout: 30
+  AfterInstall:
+    - location: deploy\\AfterInstall.ps1
+      timeout: {after_install_timeout}
+  ApplicationStart:
+    - location: deploy\\ApplicationStart.ps1
+      timeout: 1
+  ValidateService:
+    - location: deploy\\ValidateService.ps1
+"""
+
+STAND_INS = {
+    "deploy/ApplicationStop.sh": 'echo "$LIFECYCLE_EVENT" >> "$SANDBOX/events"\n',
+    # Files are installed before
+    "deploy/AfterInstall.sh": (
+        'test -f "$SANDBOX/C/app/main.py"\necho "$LIFECYCLE_EVENT" >> "$SANDBOX/events"\n'
+    ),
+    "deploy/ApplicationStart.sh": (
+        'sleep 0.6\necho "$LIFECYCLE_EVENT" >> "$SANDBOX/events"\n'
+    ),
+    "deploy/ValidateService.py": (
+        "import os\n"
+        "with open(os.path.join(os.environ['SANDBOX'], 'events'), 'a') as file:\n"
+        "    file.write(os.environ['LIFECYCLE_EVENT'] + '\\n')\n"
+    ),
+}
+
+
+def _bundle(path: Path, *, after_install_timeout: int = 30) -> Path:
+    with zipfile.ZipFile(path, "w") as bundle:
+        bundle.writestr(
+            "appspec.yml", APPSPEC.format(after_install_timeout=after_install_timeout)
+        )
+        for stand_in in STAND_INS:
+            bundle.writestr(str(Path(stand_in).with_suffix(".ps1")), "exit 1\r\n")
+
+        bundle.writestr("main.py", "app = None\n")
+
+    return path
+
+
+@pytest.fixture
+def stand_ins(tmp_path: Path) -> Path:
+    root = tmp_path / "stand-ins"
+    for path, content in STAND_INS.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+
+    return root
+
+
+def _events(sandbox: Path) -> list[str]:
+    return (sandbox / "events").read_text().split()
+
+
+@pytest.mark.unit
+def test_load_project_appspec() -> None:
+    appspec = AppSpec.load(ROOT_DIR / "appspec.yml")
+
+    assert appspec.files == [("\\", "C:\\app")]
+    assert appspec.hooks["ApplicationStop"] == [
+        Script("deploy\\ApplicationStop.ps1", 120)
+    ]
+    assert list(appspec.hooks) == [
+        "ApplicationStop",
+        "AfterInstall",
+        "ApplicationStart",
+        "ValidateService",
+    ]
+
+
+@pytest.mark.unit
+def test_sandbox_path(tmp_path: Path) -> None:
+    assert sandbox_path(tmp_path, "C:\\app") == tmp_path / "C" / "app"
+    assert sandbox_path(tmp_path, "D:\\data\\logs") == tmp_path / "D" / "data" / "logs"
+
+
+@pytest.mark.unit
+def test_run(tmp_path: Path, stand_ins: Path) -> None:
+    bundle = _bundle(tmp_path / "app.zip")
+    sandbox = tmp_path / "sandbox"
+
+    timings = run(bundle, sandbox, stand_ins=stand_ins)
+
+    assert [(t.stage, t.status) for t in timings] == [
+        # Nothing deployed before
+        ("ApplicationStop", "Skipped"),
+        ("DownloadBundle", "Succeeded"),
+        ("Install", "Succeeded"),
+        ("AfterInstall", "Succeeded"),
+        ("ApplicationStart", "Succeeded"),
+        ("ValidateService", "Succeeded"),
+    ]
+    assert _events(sandbox) == ["AfterInstall", "ApplicationStart", "ValidateService"]
+    assert (sandbox / "C" / "app" / "main.py").read_text() == "app = None\n"
+    start = timings[4]
+    assert (start.script, start.timeout) == ("deploy\\ApplicationStart.ps1", 1)
+    assert 0.6 <= start.seconds < 1
+    assert [t.stage for t in timings if t.near_timeout(0.5)] == ["ApplicationStart"]
+
+    # The revision deployed before stops the application
+    (sandbox / "events").unlink()
+    timings = run(bundle, sandbox, stand_ins=stand_ins)
+
+    assert timings[0] == StageTiming(
+        "ApplicationStop",
+        timings[0].seconds,
+        script="deploy\\ApplicationStop.ps1",
+        timeout=30,
+    )
+    assert _events(sandbox)[0] == "ApplicationStop"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("script", "status"),
+    [("exit 3\n", "Failed"), ("sleep 5\n", "TimedOut")],
+)
+def test_run_stops_on_failure(
+    tmp_path: Path,
+    stand_ins: Path,
+    script: str,
+    status: str,
+) -> None:
+    (stand_ins / "deploy" / "AfterInstall.sh").write_text(script)
+    bundle = _bundle(tmp_path / "app.zip", after_install_timeout=1)
+
+    timings = run(bundle, tmp_path / "sandbox", stand_ins=stand_ins)
+
+    assert [(t.stage, t.status) for t in timings][-2:] == [
+        ("Install", "Succeeded"),
+        ("AfterInstall", status),
+    ]
+    assert timings[-1].seconds < 2
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(shutil.which("pwsh") is not None, reason="pwsh is installed")
+def test_run_without_pwsh(tmp_path: Path) -> None:
+    bundle = _bundle(tmp_path / "app.zip")
+
+    with pytest.raises(AppSpecError, match="No pwsh"):
+        run(bundle, tmp_path / "sandbox")
+
+
+@pytest.mark.unit
+def test_main(
+    tmp_path: Path,
+    stand_ins: Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    bundle = tmp_path / "bundle"
+    with zipfile.ZipFile(_bundle(tmp_path / "app.zip")) as file:
+        file.extractall(bundle)
+
+    status = main(
+        [
+            f"--bundle={bundle}",
+            f"--sandbox={tmp_path / 'sandbox'}",
+            f"--stand-ins={stand_ins}",
+            "--warn-ratio=0.5",
+            "--json",
+        ]
+    )
+
+    timings = json.loads(capsys.readouterr().out)
+    assert status == 0
+    assert [t["stage"] for t in timings if t["near_timeout"]] == ["ApplicationStart"]
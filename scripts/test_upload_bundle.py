@@ -0,0 +1,146 @@
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import boto3
+import pytest
+from boto3.s3.transfer import TransferConfig
+from botocore.stub import ANY, Stubber
+
+from .upload_bundle import DIGEST_METADATA_KEY, bundle_digest, upload_bundle
+
+BUCKET = "artifacts"
+
+
+def _bundle(path: Path, files: dict[str, bytes], *, date_time: tuple) -> Path:
+    with zipfile.ZipFile(path, "w") as bundle:
+        for name, data in files.items():
+            bundle.writestr(zipfile.ZipInfo(name, date_time=date_time), data)
+
+    return path
+
+
+@pytest.fixture
+def s3() -> Iterator[tuple[object, Stubber]]:
+    client = boto3.Session(
+        region_name="ap-northeast-2",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    ).client("s3")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.mark.unit
+def test_bundle_digest_ignores_timestamps_and_order(tmp_path: Path) -> None:
+    files = {"main.py": b"app", "deploy/AfterInstall.ps1": b"install"}
+    first = _bundle(tmp_path / "a.zip", files, date_time=(2025, 1, 1, 0, 0, 0))
+    second = _bundle(
+        tmp_path / "b.zip",
+        dict(reversed(files.items())),
+        date_time=(2025, 6, 1, 12, 30, 0),
+    )
+    changed = _bundle(
+        tmp_path / "c.zip",
+        {**files, "main.py": b"app v2"},
+        date_time=(2025, 1, 1, 0, 0, 0),
+    )
+
+    assert first.read_bytes() != second.read_bytes()
+    assert bundle_digest(first) == bundle_digest(second)
+    assert bundle_digest(first) != bundle_digest(changed)
+
+
+@pytest.mark.unit
+def test_upload_bundle_skips_existing(
+    tmp_path: Path,
+    s3: tuple[object, Stubber],
+) -> None:
+    client, stubber = s3
+    path = _bundle(
+        tmp_path / "app.zip", {"main.py": b"app"}, date_time=(2025, 1, 1, 0, 0, 0)
+    )
+    digest = bundle_digest(path)
+    stubber.add_response(
+        "head_object",
+        {"ETag": '"abc"', "Metadata": {DIGEST_METADATA_KEY: digest}},
+        {"Bucket": BUCKET, "Key": f"app/{digest}.zip"},
+    )
+
+    result = upload_bundle(client, path, BUCKET, prefix="app/")
+
+    assert result.key == f"app/{digest}.zip"
+    assert result.etag == "abc"
+    assert result.uploaded is False
+
+
+@pytest.mark.unit
+def test_upload_bundle_multipart(tmp_path: Path, s3: tuple[object, Stubber]) -> None:
+    client, stubber = s3
+    path = _bundle(
+        tmp_path / "app.zip",
+        {"wheelhouse/big.whl": bytes(range(256)) * 60_000},
+        date_time=(2025, 1, 1, 0, 0, 0),
+    )
+    digest = bundle_digest(path)
+    key = f"{digest}.zip"
+    part_size = 5 * 1024 * 1024
+    parts = -(-path.stat().st_size // part_size)
+    assert parts > 1
+
+    stubber.add_client_error(
+        "head_object",
+        service_error_code="404",
+        http_status_code=404,
+        expected_params={"Bucket": BUCKET, "Key": key},
+    )
+    stubber.add_response(
+        "create_multipart_upload",
+        {"UploadId": "upload-1"},
+        {
+            "Bucket": BUCKET,
+            "Key": key,
+            "ContentType": "application/zip",
+            "Metadata": {DIGEST_METADATA_KEY: digest},
+            "ChecksumAlgorithm": ANY,
+        },
+    )
+    for number in range(1, parts + 1):
+        stubber.add_response(
+            "upload_part",
+            {"ETag": f'"part-{number}"'},
+            {
+                "Bucket": BUCKET,
+                "Key": key,
+                "UploadId": "upload-1",
+                "PartNumber": number,
+                "Body": ANY,
+                "ChecksumAlgorithm": ANY,
+            },
+        )
+    stubber.add_response(
+        "complete_multipart_upload",
+        {},
+        {"Bucket": BUCKET, "Key": key, "UploadId": "upload-1", "MultipartUpload": ANY},
+    )
+    stubber.add_response(
+        "head_object",
+        {"ETag": f'"multipart-{parts}"'},
+        {"Bucket": BUCKET, "Key": key},
+    )
+
+    result = upload_bundle(
+        client,
+        path,
+        BUCKET,
+        config=TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            use_threads=False,
+        ),
+    )
+
+    assert result.key == key
+    assert result.etag == f"multipart-{parts}"
+    assert result.uploaded is True
@@ -0,0 +1,83 @@
+import pytest
+
+from .uv_lock import LockError, locked_packages, root_package
+
+WINDOWS = {"python_version": "3.13", "sys_platform": "win32"}
+
+
+def _lock() -> dict:
+    return {
+        "package": [
+            {
+                "name": "app",
+                "version": "0.1.0",
+                "source": {"virtual": "."},
+                "dependencies": [
+                    {"name": "web"},
+                    {"name": "loop", "marker": "sys_platform != 'win32'"},
+                ],
+                "dev-dependencies": {"dev": [{"name": "tester"}]},
+            },
+            {
+                "name": "web",
+                "version": "1.0.0",
+                "dependencies": [
+                    {
+                        "name": "core",
+                        "version": "1.0.0",
+                        "marker": "sys_platform == 'win32'",
+                    },
+                    {
+                        "name": "core",
+                        "version": "2.0.0",
+                        "marker": "sys_platform != 'win32'",
+                    },
+                ],
+            },
+            {"name": "core", "version": "1.0.0"},
+            {"name": "core", "version": "2.0.0"},
+            {"name": "loop", "version": "3.0.0"},
+            {"name": "tester", "version": "5.0.0"},
+        ],
+    }
+
+
+def _versions(packages: list) -> list[tuple[str, str]]:
+    return [(package["name"], package["version"]) for package, _ in packages]
+
+
+@pytest.mark.unit
+def test_root_package() -> None:
+    assert root_package(_lock())["name"] == "app"
+
+
+@pytest.mark.unit
+def test_locked_packages_markers() -> None:
+    packages = locked_packages(_lock())
+
+    assert [(p["name"], p["version"], markers) for p, markers in packages] == [
+        ("core", "1.0.0", {"sys_platform == 'win32'"}),
+        ("core", "2.0.0", {"sys_platform != 'win32'"}),
+        ("loop", "3.0.0", {"sys_platform != 'win32'"}),
+        ("web", "1.0.0", {None}),
+    ]
+
+
+@pytest.mark.unit
+def test_locked_packages_environment() -> None:
+    packages = locked_packages(_lock(), groups=["dev"], environment=WINDOWS)
+
+    assert _versions(packages) == [
+        ("core", "1.0.0"),
+        ("tester", "5.0.0"),
+        ("web", "1.0.0"),
+    ]
+
+
+@pytest.mark.unit
+def test_locked_packages_unknown_version() -> None:
+    lock = _lock()
+    lock["package"][1]["dependencies"][0]["version"] = "9.0.0"
+
+    with pytest.raises(LockError, match="No locked package of core matches the target"):
+        locked_packages(lock, environment=WINDOWS)
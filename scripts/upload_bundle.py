@@ -0,0 +1,141 @@
+"""Upload a CodeDeploy bundle to S3, addressed by its content.
+
+The object key is derived from a digest of the bundle contents, so re-running a
+build of an unchanged tree (e.g. after retagging) reuses the existing object
+instead of uploading it again:
+
+    python -m scripts.upload_bundle <bucket> app.zip --prefix app/
+
+The S3 location is printed as JSON, e.g. `{"bucket": ..., "key": ...,
+"etag": ..., "uploaded": true}`, for `scripts/deploy.sh`.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import zipfile
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+MiB = 1024 * 1024
+
+# Bundles larger than the threshold are uploaded in parts, in parallel
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * MiB,
+    multipart_chunksize=16 * MiB,
+    max_concurrency=16,
+)
+
+# Object metadata holding the digest of the bundle contents
+DIGEST_METADATA_KEY = "content-sha256"
+
+
+@dataclass(frozen=True)
+class UploadResult:
+    """S3 location of an uploaded bundle."""
+
+    bucket: str
+    key: str
+    etag: str
+    uploaded: bool
+
+
+def bundle_digest(path: Path) -> str:
+    """SHA-256 hex digest of the contents of a zip bundle.
+
+    Only entry names and data are hashed, in name order, so the digest does not
+    change with timestamps or ordering of the archive, e.g. `git archive` of
+    different commits with the same tree.
+    """
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(path) as bundle:
+        for info in sorted(bundle.infolist(), key=lambda info: info.filename):
+            if info.is_dir():
+                continue
+
+            name = info.filename.encode()
+            digest.update(len(name).to_bytes(8, "big") + name)
+            digest.update(info.file_size.to_bytes(8, "big"))
+            with bundle.open(info) as f:
+                while chunk := f.read(MiB):
+                    digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def upload_bundle(
+    s3: Any,
+    path: Path,
+    bucket: str,
+    *,
+    prefix: str = "",
+    config: TransferConfig = TRANSFER_CONFIG,
+) -> UploadResult:
+    """Upload the bundle at `<prefix><digest>.zip`, unless it already exists."""
+    digest = bundle_digest(path)
+    key = f"{prefix}{digest}.zip"
+
+    if (etag := _existing_etag(s3, bucket, key, digest)) is not None:
+        logger.info("Bundle s3://%s/%s already exists, skipping upload", bucket, key)
+        return UploadResult(bucket=bucket, key=key, etag=etag, uploaded=False)
+
+    logger.info("Uploading %s to s3://%s/%s", path, bucket, key)
+    s3.upload_file(
+        str(path),
+        bucket,
+        key,
+        ExtraArgs={
+            "ContentType": "application/zip",
+            "Metadata": {DIGEST_METADATA_KEY: digest},
+        },
+        Config=config,
+    )
+    etag = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+    return UploadResult(bucket=bucket, key=key, etag=etag, uploaded=True)
+
+
+def _existing_etag(s3: Any, bucket: str, key: str, digest: str) -> str | None:
+    try:
+        response = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in {"404", "NoSuchKey"}:
+            return None
+
+        raise
+
+    # Objects from interrupted or foreign uploads are overwritten
+    if response.get("Metadata", {}).get(DIGEST_METADATA_KEY) != digest:
+        return None
+
+    return response["ETag"].strip('"')
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Upload a CodeDeploy bundle to S3.")
+    parser.add_argument("bucket")
+    parser.add_argument("bundle", type=Path)
+    parser.add_argument("--prefix", default="", help="Key prefix, e.g. `app/`.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = upload_bundle(
+        boto3.client("s3"),
+        args.bundle,
+        args.bucket,
+        prefix=args.prefix,
+    )
+    print(json.dumps(asdict(result)))
+
+
+if __name__ == "__main__":
+    main()
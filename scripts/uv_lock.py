@@ -0,0 +1,149 @@
+"""Walk the dependency graph of a parsed `uv.lock`.
+
+Shared by the wheelhouse of the deployment bundle (`scripts/build_wheelhouse.py`)
+and the runtime stack baked into the AMI (`infra/runtime_stack.py`).
+"""
+
+from collections import deque
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from packaging.markers import Marker
+
+
+class LockError(Exception):
+    """Locked dependencies can't be resolved."""
+
+
+def root_package(lock: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Package of the project itself."""
+    return next(
+        package
+        for package in lock["package"]
+        if package.get("source", {}).get("virtual") == "."
+    )
+
+
+def locked_packages(
+    lock: Mapping[str, Any],
+    *,
+    project: str | None = None,
+    groups: Sequence[str] = (),
+    environment: Mapping[str, str] | None = None,
+) -> list[tuple[Mapping[str, Any], set[str | None]]]:
+    """Packages required by a project, with the markers of every path to them.
+
+    Walks the dependencies (and requested extras) of the project, by default the
+    root of the lock, and given dependency groups. Markers of a path are those
+    of its edges and, for forked resolutions, the resolution markers of the
+    package; `None` if the package is required unconditionally.
+
+    With an `environment`, paths whose markers don't apply to it are skipped, so
+    only a single package of a forked resolution is required.
+
+    Raises:
+        LockError: If a dependency matches no locked package, or several without
+            resolution markers to tell them apart.
+
+    """
+    packages: dict[str, list[Mapping[str, Any]]] = {}
+    for package in lock["package"]:
+        packages.setdefault(package["name"], []).append(package)
+
+    root = root_package(lock) if project is None else packages[project][0]
+    edges = [
+        *root.get("dependencies", []),
+        *(
+            edge
+            for group in groups
+            for edge in root.get("dev-dependencies", {}).get(group, [])
+        ),
+    ]
+
+    markers: dict[tuple[str, str], set[str | None]] = {}
+    queue = deque((edge, None) for edge in edges)
+    seen: set[tuple[str, str, tuple[str, ...], str | None]] = set()
+    while queue:
+        edge, parent_marker = queue.popleft()
+        marker = _and_markers(parent_marker, edge.get("marker"))
+        if not _applies(marker, environment):
+            continue
+
+        extras = tuple(edge.get("extra", ()))
+        for package, package_marker in _candidates(packages, edge, marker, environment):
+            key = (package["name"], package["version"])
+            if (*key, extras, package_marker) in seen:
+                continue
+
+            seen.add((*key, extras, package_marker))
+            markers.setdefault(key, set()).add(package_marker)
+            queue.extend(
+                (child, package_marker) for child in package.get("dependencies", [])
+            )
+            for extra in extras:
+                queue.extend(
+                    (child, package_marker)
+                    for child in package.get("optional-dependencies", {}).get(extra, [])
+                )
+
+    index = {(p["name"], p["version"]): p for p in lock["package"]}
+    return [(index[key], markers[key]) for key in sorted(markers)]
+
+
+def _candidates(
+    packages: Mapping[str, list[Mapping[str, Any]]],
+    edge: Mapping[str, Any],
+    marker: str | None,
+    environment: Mapping[str, str] | None,
+) -> list[tuple[Mapping[str, Any], str | None]]:
+    """Packages an edge may resolve to, with the markers of the path to each."""
+    candidates = packages.get(edge["name"], [])
+    if "version" in edge:
+        candidates = [c for c in candidates if c["version"] == edge["version"]]
+
+    if len(candidates) == 1:
+        return [(candidates[0], marker)]
+
+    # Forked resolutions hold a package per set of resolution markers
+    matches = []
+    for candidate in candidates:
+        if resolution := candidate.get("resolution-markers"):
+            candidate_marker = _and_markers(marker, _or_markers(resolution))
+            if _applies(candidate_marker, environment):
+                matches.append((candidate, candidate_marker))
+        elif environment is None:
+            msg = f"Forked resolution of {edge['name']!r} has no resolution markers"
+            raise LockError(msg)
+
+    if not matches:
+        msg = f"No locked package of {edge['name']} matches"
+        if environment is not None:
+            msg += (
+                f" the target (Python {environment['python_version']}"
+                f" on {environment['sys_platform']})"
+            )
+        raise LockError(msg)
+
+    return matches
+
+
+def _applies(marker: str | None, environment: Mapping[str, str] | None) -> bool:
+    return (
+        environment is None
+        or marker is None
+        or Marker(marker).evaluate(dict(environment))
+    )
+
+
+def _and_markers(left: str | None, right: str | None) -> str | None:
+    if left and right and left != right:
+        return f"({left}) and ({right})"
+
+    return left or right
+
+
+def _or_markers(markers: Sequence[str]) -> str:
+    if len(markers) == 1:
+        return markers[0]
+
+    return " or ".join(f"({marker})" for marker in markers)
@@ -0,0 +1,152 @@
+"""Helpers for in-process benchmarks of the application.
+
+Requests are driven through the ASGI interface directly, without sockets, so
+that benchmarks measure the cost of the application rather than the network.
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class Response:
+    """Response collected from an ASGI application."""
+
+    status: int = 0
+    headers: list[tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+
+    def header(self, name: str) -> str | None:
+        """Value of the first header with given name, if any."""
+        key = name.lower().encode()
+        return next((v.decode() for k, v in self.headers if k == key), None)
+
+
+async def asgi_request(
+    app: Callable[..., Awaitable[None]],
+    path: str,
+    *,
+    method: str = "GET",
+    query_string: bytes = b"",
+    headers: Sequence[tuple[bytes, bytes]] = (),
+    body: bytes = b"",
+    on_body: Callable[[bytes], Awaitable[None]] | None = None,
+) -> Response:
+    """Send a single HTTP request to an ASGI application.
+
+    Response body chunks are collected into the response, or passed to
+    `on_body` as they are sent, e.g. to consume a stream without buffering it.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"host", b"testserver"), *headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    response = Response()
+    messages = iter([{"type": "http.request", "body": body, "more_body": False}])
+    # * The client stays connected until the whole response is received
+    complete = asyncio.Event()
+
+    async def receive() -> dict[str, Any]:
+        if (message := next(messages, None)) is not None:
+            return message
+
+        await complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+            response.headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            if on_body is None:
+                response.body += message.get("body", b"")
+            else:
+                await on_body(message.get("body", b""))
+
+            if not message.get("more_body", False):
+                complete.set()
+
+    await app(scope, receive, send)
+    return response
+
+
+def per_call(
+    func: Callable[[], Awaitable[object]],
+    *,
+    number: int = 1000,
+    repeat: int = 5,
+) -> float:
+    """Best time per call of an async function, in seconds, over `repeat` runs."""
+
+    async def run() -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                await func()
+
+            timings.append((time.perf_counter() - start) / number)
+
+        return min(timings)
+
+    return asyncio.run(run())
+
+
+async def run_concurrently(
+    func: Callable[[], Awaitable[object]],
+    *,
+    concurrency: int,
+    total: int,
+) -> list[float]:
+    """Latency of `total` calls of an async function, in seconds.
+
+    Calls are made by `concurrency` concurrent tasks, each making its next call
+    as soon as the previous one returns, to keep the load constant.
+    """
+    latencies: list[float] = []
+
+    async def client(calls: Iterator[int]) -> None:
+        for _ in calls:
+            start = time.perf_counter()
+            await func()
+            latencies.append(time.perf_counter() - start)
+
+    calls = iter(range(total))
+    async with asyncio.TaskGroup() as group:
+        for _ in range(concurrency):
+            group.create_task(client(calls))
+
+    return latencies
+
+
+def concurrent_latencies(
+    func: Callable[[], Awaitable[object]],
+    *,
+    concurrency: int,
+    total: int,
+) -> list[float]:
+    """Latency of `total` calls of an async function made concurrently, in seconds.
+
+    See `run_concurrently`.
+    """
+    return asyncio.run(run_concurrently(func, concurrency=concurrency, total=total))
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of the values."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
@@ -0,0 +1,227 @@
+"""Response compression negotiated with `Accept-Encoding`.
+
+Responses of a compressible media type are compressed with brotli, if the
+`brotli` package is installed, or gzip, whichever the client prefers. Bodies
+smaller than `minimum_size` are sent as-is, as they fit in a TCP segment anyway.
+
+Complete bodies are compressed at once, through a small LRU cache keyed by the
+body itself: hot, stable responses, such as cached items, are compressed once
+per worker rather than on every request. Streamed bodies are compressed chunk
+by chunk, each chunk flushed so that clients receive records as they are sent.
+"""
+
+import functools
+import zlib
+from collections.abc import Sequence
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # ty: ignore[unresolved-import]
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MEDIA_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+class _Stream(Protocol):
+    def compress(self, data: bytes, *, flush: bool = True) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        # * 16 + window bits writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, *, flush: bool = True) -> bytes:
+        compressed = self._compressor.compress(data)
+        if flush:
+            compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        return compressed
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)  # ty: ignore[possibly-unbound-attribute]
+
+    def compress(self, data: bytes, *, flush: bool = True) -> bytes:
+        compressed = self._compressor.process(data)
+        if flush:
+            compressed += self._compressor.flush()
+
+        return compressed
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Content codings supported, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    """Encoding of `encodings` preferred by an `Accept-Encoding` header, if any.
+
+    Ties between quality values are broken by the order of `encodings`.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses.
+
+    Compressed bodies of at most `cache_max_body` bytes are cached, up to
+    `cache_size` of them.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache_size: int = 256,
+        cache_max_body: int = 64 * 1024,
+        encodings: Sequence[str] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_max_body = cache_max_body
+        self.encodings = tuple(encodings or available_encodings())
+        self.cached_compress = functools.lru_cache(maxsize=cache_size)(self.compress)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        responder = _Responder(self, encoding, send)
+        return await self.app(scope, receive, responder.send)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compress a complete body."""
+        stream = self.stream(encoding)
+        return stream.compress(body, flush=False) + stream.finish()
+
+    def stream(self, encoding: str) -> _Stream:
+        """Compressor of a streamed body."""
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+
+        return _GzipStream(self.gzip_level)
+
+
+class _Responder:
+    """Compresses the response of a single request."""
+
+    def __init__(  # noqa: D107
+        self,
+        middleware: CompressionMiddleware,
+        encoding: str,
+        send: Send,
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start: Message = {}
+        self.stream: _Stream | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # * Held until the first body chunk tells how to encode it
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            return await self._send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is not None:
+            data = self.stream.compress(body)
+            if not more_body:
+                data += self.stream.finish()
+
+            return await self._send({**message, "body": data})
+
+        headers = MutableHeaders(scope=self.start)
+        if not _compressible(headers) or (
+            not more_body and len(body) < self.middleware.minimum_size
+        ):
+            self.passthrough = True
+            await self._send(self.start)
+            return await self._send(message)
+
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("accept-encoding")
+        # * The compressed body is not byte-for-byte the tagged one
+        if (tag := headers.get("etag")) and not tag.startswith("W/"):
+            headers["etag"] = f"W/{tag}"
+
+        if more_body:
+            del headers["content-length"]
+            self.stream = self.middleware.stream(self.encoding)
+            body = self.stream.compress(body)
+        else:
+            if len(body) <= self.middleware.cache_max_body:
+                body = self.middleware.cached_compress(body, self.encoding)
+            else:
+                body = self.middleware.compress(body, self.encoding)
+
+            headers["content-length"] = str(len(body))
+
+        await self._send(self.start)
+        return await self._send({**message, "body": body})
+
+
+def _compressible(headers: Headers) -> bool:
+    return (
+        "content-encoding" not in headers
+        and "content-range" not in headers
+        and "no-transform" not in headers.get("cache-control", "")
+        and headers.get("content-type", "").startswith(COMPRESSIBLE_MEDIA_TYPES)
+    )
@@ -0,0 +1,97 @@
+"""Conditional GET for API routes.
+
+Routes of a router with `route_class=ConditionalRoute` get a strong ETag,
+derived from their serialized response, and answer `If-None-Match` requests
+for an unchanged response with an empty `304 Not Modified`:
+
+    router = APIRouter(route_class=ConditionalRoute)
+
+    @router.get("/items/{item_id}")
+    @cache_control("no-cache")
+    def read_item(item_id: int): ...
+
+The `Cache-Control` header is set per route with the `cache_control` decorator.
+"""
+
+import hashlib
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.responses import StreamingResponse
+
+_CACHE_CONTROL_ATTRIBUTE = "__cache_control__"
+
+# Headers kept on `304 Not Modified` responses
+_NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "etag", "expires", "vary")
+
+
+def etag(body: bytes) -> str:
+    """Strong entity tag of a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def none_match(if_none_match: str | None, tag: str) -> bool:
+    """Whether an `If-None-Match` header value does not match the entity tag.
+
+    Tags are compared weakly, as specified for `If-None-Match`.
+    """
+    if not if_none_match:
+        return True
+
+    if if_none_match.strip() == "*":
+        return False
+
+    opaque = tag.removeprefix("W/")
+    return all(
+        candidate.strip().removeprefix("W/") != opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_control[F: Callable[..., Any]](value: str) -> Callable[[F], F]:
+    """Set the `Cache-Control` header of a conditional route."""
+
+    def decorator(func: F) -> F:
+        setattr(func, _CACHE_CONTROL_ATTRIBUTE, value)
+        return func
+
+    return decorator
+
+
+class ConditionalRoute(APIRoute):
+    """Route answering conditional GET requests."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        """Wrap the handler to tag responses and answer `If-None-Match`."""
+        handler = super().get_route_handler()
+        cache_control = getattr(self.endpoint, _CACHE_CONTROL_ATTRIBUTE, None)
+
+        async def conditional_handler(request: Request) -> Response:
+            response = await handler(request)
+            if (
+                request.method != "GET"
+                or response.status_code != 200
+                or isinstance(response, StreamingResponse)
+            ):
+                return response
+
+            tag = response.headers.get("etag") or etag(bytes(response.body))
+            response.headers["etag"] = tag
+            if cache_control is not None:
+                response.headers["cache-control"] = cache_control
+
+            if none_match(request.headers.get("if-none-match"), tag):
+                return response
+
+            return Response(
+                status_code=304,
+                headers={
+                    name: value
+                    for name, value in response.headers.items()
+                    if name in _NOT_MODIFIED_HEADERS
+                },
+            )
+
+        return conditional_handler
@@ -0,0 +1,167 @@
+"""Graceful draining of the workers before the application stops.
+
+A deployment stops the application on a host while the load balancer still
+routes requests to it. To stop without dropping any, the stop hook first asks
+the workers to drain by creating a `drain` file in the directory named by
+`APP_DRAIN_DIR`. Every worker watches for it, then:
+
+1. fails readiness, so that the load balancer stops routing requests to it,
+   and asks clients to close their connections with `Connection: close`,
+   while serving the requests still routed to it for `delay` seconds;
+2. waits up to `timeout` seconds for the requests in flight to complete.
+
+Each worker reports its state, `serving`, `draining` or `drained`, in a
+`worker-<pid>` file of the directory, so that the hook can wait for all of
+them before stopping the service.
+"""
+
+import asyncio
+import contextlib
+import os
+from collections.abc import AsyncIterator, Mapping
+from pathlib import Path
+
+from .health import (
+    LIVENESS_PATH,
+    READINESS_PATH,
+    HealthProbes,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+
+DIR_VARIABLE = "APP_DRAIN_DIR"
+DRAIN_FILE = "drain"
+
+# Time for the load balancer to notice failing readiness, 2 checks 5 seconds apart
+DELAY = 15
+
+# Longest time waited for requests in flight
+TIMEOUT = 30
+
+POLL_INTERVAL = 1
+
+_PROBE_PATHS = (LIVENESS_PATH, READINESS_PATH)
+
+
+class Drain:
+    """ASGI wrapper draining requests of the application on demand.
+
+    Wraps the health probes of the application, to fail its readiness.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        app: HealthProbes,
+        *,
+        directory: Path | None = None,
+        delay: float = DELAY,
+        timeout: float = TIMEOUT,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.app = app
+        self.directory = directory
+        self.delay = delay
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.draining = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @classmethod
+    def from_environ(
+        cls,
+        app: HealthProbes,
+        environ: Mapping[str, str] = os.environ,
+    ) -> "Drain":
+        """Drain watching the directory named by `APP_DRAIN_DIR`, if set."""
+        directory = environ.get(DIR_VARIABLE)
+        return cls(app, directory=Path(directory) if directory else None)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            async with self._watching():
+                return await self.app(scope, receive, send)
+
+        if scope["type"] != "http" or scope["path"] in _PROBE_PATHS:
+            return await self.app(scope, receive, send)
+
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            await self.app(scope, receive, self._closing(send))
+        finally:
+            self.in_flight -= 1
+            if not self.in_flight:
+                self._idle.set()
+
+    def _closing(self, send: Send) -> Send:
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.draining:
+                message["headers"] = [
+                    *(
+                        (name, value)
+                        for name, value in message.get("headers", [])
+                        if name.lower() != b"connection"
+                    ),
+                    (b"connection", b"close"),
+                ]
+
+            await send(message)
+
+        return wrapped
+
+    async def drain(self) -> bool:
+        """Drain the requests; false if some are still in flight after `timeout`."""
+        self.draining = True
+        self.app.ready = False
+        self._report("draining")
+        await asyncio.sleep(self.delay)
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.timeout)
+        except TimeoutError:
+            return False
+        finally:
+            self._report("drained")
+
+        return True
+
+    @property
+    def _status_file(self) -> Path | None:
+        if self.directory is None:
+            return None
+
+        return self.directory / f"worker-{os.getpid()}"
+
+    def _report(self, state: str) -> None:
+        if (path := self._status_file) is not None:
+            path.write_text(state)
+
+    @contextlib.asynccontextmanager
+    async def _watching(self) -> AsyncIterator[None]:
+        if self.directory is None:
+            yield
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._report("serving")
+
+        async def watch(flag: Path) -> None:
+            # * Readiness is only failed once the application has started
+            while not (self.app.ready and flag.exists()):
+                await asyncio.sleep(self.poll_interval)
+
+            await self.drain()
+
+        task = asyncio.create_task(watch(self.directory / DRAIN_FILE))
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+            if (path := self._status_file) is not None:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,97 @@
+"""Health probes answered ahead of the application.
+
+Load balancer and deployment probes hit every target at a fixed interval, so
+they are answered by a plain ASGI wrapper with pre-serialized responses, never
+reaching the routing, validation or middleware of the application.
+
+- `/healthz`: liveness, the process is serving requests.
+- `/readyz`: readiness, the application has started and is not shutting down.
+"""
+
+from collections.abc import Awaitable, Callable, MutableMapping
+from typing import Any
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+LIVENESS_PATH = "/healthz"
+READINESS_PATH = "/readyz"
+
+
+def _response(status: int, body: bytes) -> tuple[Message, Message]:
+    start = {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"cache-control", b"no-store"),
+        ],
+    }
+    return start, {"type": "http.response.body", "body": body}
+
+
+_OK = _response(200, b'{"status":"ok"}')
+_UNAVAILABLE = _response(503, b'{"status":"unavailable"}')
+_EMPTY_BODY: Message = {"type": "http.response.body", "body": b""}
+
+
+class HealthProbes:
+    """ASGI wrapper answering health probes of the wrapped application.
+
+    The application is ready once its lifespan startup completes, until its
+    shutdown begins or `ready` is set to false, e.g. to drain connections.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:  # noqa: D107
+        self.app = app
+        self.ready = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            path = scope["path"]
+            if path == LIVENESS_PATH:
+                return await self._respond(scope, send, _OK)
+
+            if path == READINESS_PATH:
+                response = _OK if self.ready else _UNAVAILABLE
+                return await self._respond(scope, send, response)
+
+        elif scope["type"] == "lifespan":
+            return await self.app(
+                scope, self._watch_receive(receive), self._watch_send(send)
+            )
+
+        return await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _respond(
+        scope: Scope,
+        send: Send,
+        response: tuple[Message, Message],
+    ) -> None:
+        start, body = response
+        await send(start)
+        await send(_EMPTY_BODY if scope["method"] == "HEAD" else body)
+
+    def _watch_receive(self, receive: Receive) -> Receive:
+        async def wrapped() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.shutdown":
+                self.ready = False
+
+            return message
+
+        return wrapped
+
+    def _watch_send(self, send: Send) -> Send:
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "lifespan.startup.complete":
+                self.ready = True
+
+            await send(message)
+
+        return wrapped
@@ -0,0 +1,153 @@
+"""Launch the application with uvicorn workers sized to the instance.
+
+The fleet runs on instances of 2-4 vCPUs and 4-8 GiB of memory, so the worker
+count is derived from the CPUs and memory available at start:
+
+    python -m src.launcher
+
+Sized settings can be overridden with options, or `APP_*` environment variables
+(e.g. `APP_WORKERS=2`), which take precedence in that order. The threadpool of
+each worker is sized by `--threadpool-tokens`, or `APP_THREADPOOL_TOKENS`.
+"""
+
+import argparse
+import ctypes
+import logging
+import os
+import sys
+from collections.abc import Mapping, Sequence
+from dataclasses import asdict, dataclass, replace
+
+import uvicorn
+
+from . import threadpool
+
+logger = logging.getLogger(__name__)
+
+MiB = 1024 * 1024
+
+# Resident memory of a worker under load, with headroom
+WORKER_MEMORY = 256 * MiB
+
+# Memory left for Windows and the agents running next to the application
+RESERVED_MEMORY = 2048 * MiB
+
+BACKLOG_PER_WORKER = 1024
+LIMIT_CONCURRENCY_PER_WORKER = 1024
+
+# Longer than the idle timeout of the load balancer (300 seconds), so that it
+# never reuses a connection the application has already closed
+TIMEOUT_KEEP_ALIVE = 305
+
+ENV_PREFIX = "APP_"
+
+
+@dataclass(frozen=True)
+class Resources:
+    """Compute resources available to the application."""
+
+    cpus: int
+    memory: int
+
+
+@dataclass(frozen=True)
+class LaunchSettings:
+    """Settings of the uvicorn server."""
+
+    workers: int
+    backlog: int
+    limit_concurrency: int
+    timeout_keep_alive: int
+
+
+def detect_resources() -> Resources:
+    """Detect CPUs usable by this process and the physical memory."""
+    cpus = os.process_cpu_count() or 1
+    if sys.platform == "win32":
+        memory = _windows_physical_memory()
+    else:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    return Resources(cpus=cpus, memory=memory)
+
+
+def _windows_physical_memory() -> int:
+    class MemoryStatusEx(ctypes.Structure):
+        _fields_ = [
+            ("dwLength", ctypes.c_ulong),
+            ("dwMemoryLoad", ctypes.c_ulong),
+            ("ullTotalPhys", ctypes.c_ulonglong),
+            ("ullAvailPhys", ctypes.c_ulonglong),
+            ("ullTotalPageFile", ctypes.c_ulonglong),
+            ("ullAvailPageFile", ctypes.c_ulonglong),
+            ("ullTotalVirtual", ctypes.c_ulonglong),
+            ("ullAvailVirtual", ctypes.c_ulonglong),
+            ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+        ]
+
+    status = MemoryStatusEx()
+    status.dwLength = ctypes.sizeof(MemoryStatusEx)
+    ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))  # ty: ignore[unresolved-attribute]
+    return status.ullTotalPhys
+
+
+def size_settings(
+    resources: Resources,
+    *,
+    worker_memory: int = WORKER_MEMORY,
+    reserved_memory: int = RESERVED_MEMORY,
+) -> LaunchSettings:
+    """Settings for given resources: a worker per CPU, as memory allows."""
+    workers = max(
+        1,
+        min(resources.cpus, (resources.memory - reserved_memory) // worker_memory),
+    )
+    return LaunchSettings(
+        workers=workers,
+        backlog=BACKLOG_PER_WORKER * workers,
+        limit_concurrency=LIMIT_CONCURRENCY_PER_WORKER,
+        timeout_keep_alive=TIMEOUT_KEEP_ALIVE,
+    )
+
+
+def apply_overrides(
+    settings: LaunchSettings,
+    environ: Mapping[str, str],
+    options: Mapping[str, int | None],
+) -> LaunchSettings:
+    """Override settings with `APP_*` environment variables, then options."""
+    overrides: dict[str, int] = {}
+    for name in asdict(settings):
+        if (value := environ.get(f"{ENV_PREFIX}{name.upper()}")) is not None:
+            overrides[name] = int(value)
+
+        if (value := options.get(name)) is not None:
+            overrides[name] = value
+
+    return replace(settings, **overrides)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Launch the application.")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    for name in LaunchSettings.__dataclass_fields__:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int)
+
+    parser.add_argument("--threadpool-tokens", type=int)
+    args = parser.parse_args(argv)
+    if args.threadpool_tokens is not None:
+        # * Read by each worker at startup
+        os.environ[threadpool.ENV_VARIABLE] = str(args.threadpool_tokens)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    resources = detect_resources()
+    settings = apply_overrides(size_settings(resources), os.environ, vars(args))
+    logger.info("Launching %s on %s with %s", args.app, resources, settings)
+    uvicorn.run(args.app, host=args.host, port=args.port, **asdict(settings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+"""Load tests of the application, in-process and over HTTP.
+
+Every route of the scenario is driven by concurrent clients, either through the
+ASGI interface, without sockets, or over HTTP against a local uvicorn server in
+a subprocess, and its throughput and latency percentiles are reported. Results
+are compared with a stored baseline, failing on errors and latency regressions:
+
+    python -m src.loadtest
+    python -m src.loadtest --mode asgi --update-baseline
+
+Latencies depend on the machine, so baselines are recorded per runner class,
+named by the `LOADTEST_RUNNER` environment variable (e.g. the CI runner image),
+else by the machine itself. Latencies are compared only with the baseline of
+the same runner class; without one, runs gate on errors only. CI records the
+baseline of its runner from the base branch before every run, see
+`.github/workflows/ci.yaml`.
+
+Every run also loads a reference, a bare ASGI application, under the same load,
+showing the cost of the application over the server and client.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from uvicorn.importer import import_from_string
+
+from .benchmark import asgi_request, percentile, run_concurrently
+
+MODES = ("asgi", "http")
+
+BASELINE_PATH = Path(__file__).parent / "testdata" / "loadtest_baseline.json"
+
+RUNNER_VARIABLE = "LOADTEST_RUNNER"
+
+# Latency allowed over the baseline, as a ratio
+DEFAULT_THRESHOLD = 1.0
+
+REFERENCE = "reference"
+REFERENCE_APP = "src.loadtest:reference_app"
+
+ROOT_DIR = Path(__file__).parent.parent
+
+PERCENTILES = ("p50", "p95", "p99")
+
+
+@dataclass(frozen=True)
+class Route:
+    """Request sent to a route under load."""
+
+    name: str
+    path: str
+    method: str = "GET"
+    query_string: str = ""
+    headers: tuple[tuple[str, str], ...] = (("accept-encoding", "gzip"),)
+    body: bytes = b""
+
+
+ROUTES = (
+    Route("GET /healthz", "/healthz"),
+    Route("GET /", "/"),
+    Route("GET /items/{item_id}", "/items/5", query_string="q=x"),
+    Route(
+        "POST /items:batch",
+        "/items:batch",
+        method="POST",
+        headers=(("accept-encoding", "gzip"), ("content-type", "application/json")),
+        body=json.dumps({"items": [{"item_id": i} for i in range(100)]}).encode(),
+    ),
+    Route("GET /items/stream", "/items/stream", query_string="start=0&end=1000"),
+)
+
+
+@dataclass(frozen=True)
+class LoadResult:
+    """Throughput and latency of a route under load, in seconds."""
+
+    requests: int
+    errors: int
+    seconds: float
+    p50: float
+    p95: float
+    p99: float
+
+    @property
+    def rps(self) -> float:
+        """Requests per second."""
+        return self.requests / self.seconds
+
+
+@dataclass(frozen=True)
+class Regression:
+    """Errors, or latency percentile, of a route over the allowed ones."""
+
+    route: str
+    metric: str
+    value: float
+    allowed: float
+
+    def __str__(self) -> str:
+        if self.metric == "errors":
+            return f"{self.route} {self.value:g} errors > {self.allowed:g}"
+
+        return (
+            f"{self.route} {self.metric}"
+            f" {self.value * 1e3:.3f} ms > {self.allowed * 1e3:.3f} ms"
+        )
+
+
+@dataclass
+class Settings:
+    """Load applied to every route."""
+
+    concurrency: int = 16
+    requests: int = 500
+
+
+def machine() -> str:
+    """Machine latencies are measured on."""
+    return (
+        f"{platform.node()} {platform.system()} {platform.machine()}"
+        f" {os.cpu_count()} CPUs Python {platform.python_version()}"
+    )
+
+
+def runner(environ: Mapping[str, str] = os.environ) -> str:
+    """Runner class latencies are measured on, keying the baselines."""
+    return environ.get(RUNNER_VARIABLE) or machine()
+
+
+async def reference_app(scope: Any, receive: Any, send: Any) -> None:
+    """Bare ASGI application loaded as a reference."""
+    if scope["type"] != "http":
+        return
+
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+Send = Callable[[Route], Awaitable[int]]
+
+
+def asgi_sender(app: Callable[..., Awaitable[None]]) -> Send:
+    """Send requests to an ASGI application in-process, returning the status."""
+
+    async def send(route: Route) -> int:
+        response = await asgi_request(
+            app,
+            route.path,
+            method=route.method,
+            query_string=route.query_string.encode(),
+            headers=[(k.encode(), v.encode()) for k, v in route.headers],
+            body=route.body,
+        )
+        return response.status
+
+    return send
+
+
+@asynccontextmanager
+async def http_sender(url: str) -> AsyncIterator[Send]:
+    """Send requests over HTTP/1.1 keep-alive connections, returning the status.
+
+    A lean client rather than a full-featured one, so that the load measures
+    the server: every concurrent request takes an idle connection, or opens one.
+    """
+    parts = urllib.parse.urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+    connections: list[asyncio.StreamWriter] = []
+
+    async def send(route: Route) -> int:
+        if idle:
+            reader, writer = idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+            connections.append(writer)
+
+        target = (
+            f"{route.path}?{route.query_string}" if route.query_string else route.path
+        )
+        head = [
+            f"{route.method} {target} HTTP/1.1",
+            f"host: {host}:{port}",
+            f"content-length: {len(route.body)}",
+            *(f"{name}: {value}" for name, value in route.headers),
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + route.body)
+        status, keep_alive = await _read_response(reader)
+        if keep_alive:
+            idle.append((reader, writer))
+
+        return status
+
+    try:
+        yield send
+    finally:
+        for writer in connections:
+            writer.close()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+    """Read a response, returning its status and whether the connection is kept."""
+    status_line, *lines = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    headers = {}
+    for line in lines:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+
+        await reader.readline()
+
+    return int(status_line.split()[1]), headers.get("connection") != "close"
+
+
+async def load(
+    send: Send,
+    route: Route,
+    *,
+    concurrency: int,
+    requests: int,
+) -> LoadResult:
+    """Send a route `requests` times, `concurrency` at a time."""
+    statuses: list[int] = []
+
+    async def call() -> None:
+        statuses.append(await send(route))
+
+    # * Warm up caches and connections before measuring
+    await run_concurrently(call, concurrency=concurrency, total=concurrency)
+    statuses.clear()
+
+    start = time.perf_counter()
+    latencies = await run_concurrently(call, concurrency=concurrency, total=requests)
+    seconds = time.perf_counter() - start
+    return LoadResult(
+        requests=requests,
+        errors=sum(status >= 400 for status in statuses),
+        seconds=seconds,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+    )
+
+
+@contextmanager
+def serve(app: str, *, timeout: float = 30) -> Iterator[str]:
+    """Serve an application with uvicorn in a subprocess, yielding its base URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            app,
+            f"--host={host}",
+            f"--port={port}",
+            "--log-level=warning",
+            "--no-access-log",
+        ],
+        cwd=ROOT_DIR,
+    )
+    try:
+        # * Uvicorn listens once the application has started
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                msg = f"Server of {app} exited with {process.returncode}"
+                raise RuntimeError(msg)
+
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+
+                time.sleep(0.05)
+
+        yield f"http://{host}:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=timeout)
+
+
+def run(
+    app: str,
+    mode: str,
+    *,
+    routes: Sequence[Route] = ROUTES,
+    settings: Settings | None = None,
+) -> dict[str, LoadResult]:
+    """Load every route of an application, and the reference, by route name.
+
+    The application is given as an import string, e.g. `main:app`.
+    """
+    settings = settings or Settings()
+    scenario = [Route(REFERENCE, "/"), *routes]
+
+    async def load_all(senders: Sequence[Send]) -> dict[str, LoadResult]:
+        return {
+            route.name: await load(
+                send,
+                route,
+                concurrency=settings.concurrency,
+                requests=settings.requests,
+            )
+            for send, route in zip(senders, scenario, strict=True)
+        }
+
+    if mode == "asgi":
+        senders = [asgi_sender(reference_app)]
+        senders += [asgi_sender(import_from_string(app))] * len(routes)
+        return asyncio.run(load_all(senders))
+
+    with serve(REFERENCE_APP) as reference_url, serve(app) as url:
+
+        async def load_http() -> dict[str, LoadResult]:
+            async with (
+                http_sender(reference_url) as reference,
+                http_sender(url) as send,
+            ):
+                return await load_all([reference] + [send] * len(routes))
+
+        return asyncio.run(load_http())
+
+
+def compare(
+    results: Mapping[str, LoadResult],
+    baseline: Mapping[str, LoadResult],
+    *,
+    threshold: float = DEFAULT_THRESHOLD,
+    latency: bool = True,
+) -> list[Regression]:
+    """Errors, and unless `latency` is false latency percentiles, over the baseline.
+
+    Routes missing from the baseline must not fail any request.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        allowed_errors = expected.errors if expected is not None else 0
+        if result.errors > allowed_errors:
+            regressions.append(
+                Regression(name, "errors", result.errors, allowed_errors)
+            )
+
+        if not latency or name == REFERENCE or expected is None:
+            continue
+
+        for key in PERCENTILES:
+            allowed = getattr(expected, key) * (1 + threshold)
+            if (value := getattr(result, key)) > allowed:
+                regressions.append(Regression(name, key, value, allowed))
+
+    return regressions
+
+
+@dataclass
+class Baseline:
+    """Load test results by runner class and mode, with the load applied."""
+
+    settings: Settings
+    runners: dict[str, dict[str, dict[str, LoadResult]]]
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Baseline:
+    """Stored baseline."""
+    data: dict[str, Any] = json.loads(path.read_text())
+    return Baseline(
+        settings=Settings(concurrency=data["concurrency"], requests=data["requests"]),
+        runners={
+            runner_class: {
+                mode: {
+                    name: _load_result(result) for name, result in mode_results.items()
+                }
+                for mode, mode_results in results.items()
+            }
+            for runner_class, results in data["runners"].items()
+        },
+    )
+
+
+def _load_result(data: dict[str, Any]) -> LoadResult:
+    return LoadResult(
+        requests=data["requests"],
+        errors=data["errors"],
+        seconds=data["seconds"],
+        p50=data["p50"],
+        p95=data["p95"],
+        p99=data["p99"],
+    )
+
+
+def save_baseline(baseline: Baseline, path: Path = BASELINE_PATH) -> None:
+    """Store the baseline."""
+    data = {
+        "concurrency": baseline.settings.concurrency,
+        "requests": baseline.settings.requests,
+        "runners": {
+            runner_class: {
+                mode: {
+                    name: {
+                        key: round(value, 9) for key, value in asdict(result).items()
+                    }
+                    for name, result in mode_results.items()
+                }
+                for mode, mode_results in results.items()
+            }
+            for runner_class, results in sorted(baseline.runners.items())
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def format_results(mode: str, results: Mapping[str, LoadResult]) -> str:
+    """Results as a table."""
+    lines = [
+        f"{mode:<24} {'requests':>8} {'errors':>6} {'rps':>8}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    ]
+    lines.extend(
+        f"{name:<24} {result.requests:>8} {result.errors:>6} {result.rps:>8.0f}"
+        f" {result.p50 * 1e3:>8.2f} {result.p95 * 1e3:>8.2f} {result.p99 * 1e3:>8.2f}"
+        for name, result in results.items()
+    )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Load test the application.")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline = Baseline(Settings(), {})
+    if args.baseline.exists():
+        baseline = load_baseline(args.baseline)
+
+    runner_class = runner()
+    expected = baseline.runners.get(runner_class)
+    if expected is None and not args.update_baseline:
+        print(
+            f"No baseline recorded on runner {runner_class!r}, comparing errors"
+            " only; record one with --update-baseline",
+            file=sys.stderr,
+        )
+
+    results = {}
+    regressions = []
+    for mode in args.mode or MODES:
+        results[mode] = run(args.app, mode, settings=baseline.settings)
+        print(format_results(mode, results[mode]), end="\n\n")
+        if not args.update_baseline:
+            regressions += compare(
+                results[mode],
+                (expected or {}).get(mode, {}),
+                threshold=args.threshold,
+                latency=expected is not None,
+            )
+
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+
+    if args.update_baseline:
+        # * Modes not run keep their baseline
+        baseline.runners[runner_class] = {**(expected or {}), **results}
+        save_baseline(baseline, args.baseline)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""Request metrics of the application.
+
+`MetricsMiddleware` records a latency histogram and response counts by status
+code per route and method, and the number of requests in flight. Recording a
+request costs two clock reads, a bisection and a few dict updates.
+
+Metrics are those of the worker process. They are exposed:
+
+- in the Prometheus text format, by `Metrics.prometheus`, labelled with the
+  worker process so that the series of every worker stay apart;
+- as CloudWatch embedded metric format (EMF) records, by `Metrics.emf`, written
+  every minute by `publish_emf` to a file per worker in the directory named by
+  `APP_METRICS_EMF_DIR`, for the CloudWatch agent to ship (see
+  `infra/Bootstrap.userdata.jinja`). Files are rotated by size, and those of
+  workers gone for an hour are removed.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import json
+import os
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+EMF_DIR_VARIABLE = "APP_METRICS_EMF_DIR"
+EMF_NAMESPACE = "App"
+EMF_INTERVAL = 60
+
+# Size over which an EMF file is rotated, keeping a single previous file
+EMF_MAX_BYTES = 10 * 1024 * 1024
+
+# Age, in seconds, of the last write after which files of other workers, e.g.
+# from a previous deployment, are removed; workers write every `EMF_INTERVAL`
+EMF_STALE_AFTER = 60 * 60
+
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Values reported to CloudWatch for the buckets, the last one for slower requests
+EMF_BUCKET_VALUES = (*BUCKETS, 10.0)
+
+# Labels of requests not matching a route, or with an unusual method, so that
+# clients cannot create series at will
+UNMATCHED_ROUTE = "unmatched"
+OTHER_METHOD = "OTHER"
+_METHODS = frozenset({"DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT"})
+
+
+@dataclass
+class RouteMetrics:
+    """Metrics of a route and method.
+
+    Latencies are counted in buckets, the last one counting slower requests.
+    """
+
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    latency_sum: float = 0.0
+    statuses: Counter[int] = field(default_factory=Counter)
+
+    def observe(self, status: int, seconds: float) -> None:
+        """Record a completed request."""
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.statuses[status] += 1
+
+    def copy(self) -> "RouteMetrics":
+        """Snapshot of the metrics."""
+        return RouteMetrics(list(self.buckets), self.latency_sum, self.statuses.copy())
+
+
+class Metrics:
+    """Request metrics of a worker process."""
+
+    def __init__(self) -> None:  # noqa: D107
+        self.in_flight = 0
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        # * Snapshots of the routes as of the last EMF records
+        self._emitted: dict[tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        """Record a completed request."""
+        if (metrics := self.routes.get((method, route))) is None:
+            metrics = self.routes[method, route] = RouteMetrics()
+
+        metrics.observe(status, seconds)
+
+    def prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        worker = f'worker="{os.getpid()}"'
+        routes = sorted(self.routes.items())
+        lines = [
+            "# HELP http_requests_in_flight Requests being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight{{{worker}}} {self.in_flight}",
+            "# HELP http_responses_total Responses sent, by status code.",
+            "# TYPE http_responses_total counter",
+        ]
+        for (method, route), metrics in routes:
+            labels = f'{worker},method="{method}",route="{route}"'
+            lines.extend(
+                f'http_responses_total{{{labels},status="{status}"}} {count}'
+                for status, count in sorted(metrics.statuses.items())
+            )
+
+        lines += [
+            "# HELP http_request_duration_seconds Latency of requests.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in routes:
+            labels = f'{worker},method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), metrics.buckets, strict=True):
+                cumulative += count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}}'
+                    f" {cumulative}"
+                )
+
+            lines += [
+                f"http_request_duration_seconds_sum{{{labels}}} {metrics.latency_sum}",
+                f"http_request_duration_seconds_count{{{labels}}} {cumulative}",
+            ]
+
+        return "\n".join(lines) + "\n"
+
+    def emf(
+        self,
+        *,
+        namespace: str = EMF_NAMESPACE,
+        timestamp: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """EMF records of the requests completed since the previous call.
+
+        Latencies are reported in milliseconds, as the upper bound of their
+        bucket, and responses as counts by status class (`2xx`, `5xx`, ...).
+        """
+        timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+        records = [
+            _emf_record(
+                namespace, timestamp, {}, {"InFlight": ("Count", self.in_flight)}
+            )
+        ]
+        for key, metrics in sorted(self.routes.items()):
+            emitted = self._emitted.get(key) or RouteMetrics()
+            self._emitted[key] = metrics.copy()
+            buckets = [
+                count - previous
+                for count, previous in zip(
+                    metrics.buckets, emitted.buckets, strict=True
+                )
+            ]
+            if not any(buckets):
+                continue
+
+            classes = Counter[str]()
+            for status, count in (metrics.statuses - emitted.statuses).items():
+                classes[f"{status // 100}xx"] += count
+
+            latency = {
+                "Values": [
+                    bound * 1000
+                    for bound, count in zip(EMF_BUCKET_VALUES, buckets, strict=True)
+                    if count
+                ],
+                "Counts": [count for count in buckets if count],
+            }
+            values = {
+                "Latency": ("Milliseconds", latency),
+                "Requests": ("Count", sum(buckets)),
+                **{name: ("Count", count) for name, count in sorted(classes.items())},
+            }
+            method, route = key
+            dimensions = {"Method": method, "Route": route}
+            records.append(_emf_record(namespace, timestamp, dimensions, values))
+
+        return records
+
+
+def _emf_record(
+    namespace: str,
+    timestamp: int,
+    dimensions: Mapping[str, str],
+    values: Mapping[str, tuple[str, Any]],
+) -> dict[str, Any]:
+    return {
+        "_aws": {
+            "Timestamp": timestamp,
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [
+                        {"Name": name, "Unit": unit}
+                        for name, (unit, _) in values.items()
+                    ],
+                }
+            ],
+        },
+        **dimensions,
+        **{name: value for name, (_, value) in values.items()},
+    }
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics."""
+
+    def __init__(self, app: ASGIApp, *, metrics: Metrics) -> None:  # noqa: D107
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # * Status of the response, if started
+        status = [500]
+
+        async def send_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            seconds = time.perf_counter() - start
+            metrics.in_flight -= 1
+            method = scope["method"]
+            # * Set by the router on the scope once matched
+            route = scope.get("route")
+            metrics.observe(
+                method if method in _METHODS else OTHER_METHOD,
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status[0],
+                seconds,
+            )
+
+
+def write_emf(
+    metrics: Metrics,
+    path: Path,
+    *,
+    namespace: str = EMF_NAMESPACE,
+    max_bytes: int = EMF_MAX_BYTES,
+) -> None:
+    """Append the EMF records of the metrics to a file, one per line.
+
+    A file over `max_bytes` is first rotated to `<name>.1`, replacing the
+    previous one.
+    """
+    records = metrics.emf(namespace=namespace)
+    with contextlib.suppress(FileNotFoundError):
+        if path.stat().st_size >= max_bytes:
+            path.replace(path.with_name(f"{path.name}.1"))
+
+    with path.open("a") as file:
+        file.writelines(
+            json.dumps(record, separators=(",", ":")) + "\n" for record in records
+        )
+
+
+def remove_stale_emf(directory: Path, *, stale_after: float = EMF_STALE_AFTER) -> None:
+    """Remove EMF files, rotated or not, not written to for `stale_after` seconds."""
+    cutoff = time.time() - stale_after
+    for path in directory.glob("emf-*.log*"):
+        with contextlib.suppress(FileNotFoundError):
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+
+
+@contextlib.asynccontextmanager
+async def publish_emf(
+    metrics: Metrics,
+    environ: Mapping[str, str] = os.environ,
+    *,
+    interval: float = EMF_INTERVAL,
+) -> AsyncIterator[None]:
+    """Write EMF records every `interval` seconds while running, and when done.
+
+    Records are written to `emf-<pid>.log` in the directory named by
+    `APP_METRICS_EMF_DIR`, if set, so that workers never write to the same file.
+    Files left over by workers gone for `EMF_STALE_AFTER` are removed on start.
+    """
+    if not (directory := environ.get(EMF_DIR_VARIABLE)):
+        yield
+        return
+
+    path = Path(directory) / f"emf-{os.getpid()}.log"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    remove_stale_emf(path.parent)
+
+    async def publish() -> None:
+        while True:
+            await asyncio.sleep(interval)
+            write_emf(metrics, path)
+
+    task = asyncio.create_task(publish())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+        write_emf(metrics, path)
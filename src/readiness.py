@@ -0,0 +1,252 @@
+"""Readiness probe of the application, run by the ValidateService hook.
+
+Probes endpoints of a starting application until all of them answer 200 within
+their latency budget, and writes a JSON report of the attempts:
+
+    python -m src.readiness --pid 1234 --report readiness.json
+
+Endpoints are probed in parallel, in rounds starting a few tens of milliseconds
+apart and backing off exponentially, so that a healthy application is seen
+ready as soon as it is, without hammering a slow one. The probe gives up after
+`--timeout` seconds, or as soon as the process of the application, if given,
+has exited.
+"""
+
+import argparse
+import asyncio
+import ctypes
+import functools
+import json
+import os
+import sys
+import time
+import urllib.parse
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+DEFAULT_URL = "http://127.0.0.1:8000"
+
+# Shorter than the timeout of the ValidateService hook (120 seconds)
+DEFAULT_TIMEOUT = 100
+
+READY = "ready"
+TIMEOUT = "timeout"
+EXITED = "exited"
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """Endpoint probed, answering 200 within `budget` seconds once ready."""
+
+    path: str
+    budget: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Endpoint":
+        """Endpoint from `<path>=<budget>`."""
+        path, _, budget = value.rpartition("=")
+        return cls(path, float(budget))
+
+
+ENDPOINTS = (
+    Endpoint("/healthz", 0.5),
+    Endpoint("/readyz", 0.5),
+    # * Through the routing and middleware of the application
+    Endpoint("/", 1.0),
+)
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Intervals between probe rounds, in seconds."""
+
+    initial: float = 0.05
+    factor: float = 2.0
+    maximum: float = 2.0
+
+    def intervals(self) -> Iterator[float]:
+        """Intervals growing from `initial` up to `maximum`."""
+        interval = self.initial
+        while True:
+            yield interval
+            interval = min(interval * self.factor, self.maximum)
+
+
+@dataclass(frozen=True)
+class Attempt:
+    """Request to an endpoint, `elapsed` seconds after the probe started."""
+
+    path: str
+    elapsed: float
+    latency: float
+    status: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class Report:
+    """Outcome of the probe, with the time to readiness of every endpoint."""
+
+    outcome: str = TIMEOUT
+    seconds: float = 0.0
+    ready: dict[str, float] = field(default_factory=dict)
+    attempts: list[Attempt] = field(default_factory=list)
+
+
+def process_alive(pid: int) -> bool:
+    """Whether the process is running, reaping it if a child that has exited."""
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32  # ty: ignore[unresolved-attribute]
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            # STILL_ACTIVE
+            return code.value == 259
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        # * Exited children are zombies until reaped, still signalable
+        if os.waitpid(pid, os.WNOHANG)[0]:
+            return False
+    except ChildProcessError:
+        pass
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+async def _get(host: str, port: int, path: str) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        request = f"GET {path} HTTP/1.1\r\nhost: {host}:{port}\r\nconnection: close\r\n"
+        writer.write((request + "\r\n").encode())
+        status_line = await reader.readline()
+        # * Up to the end of the response, closed by the server
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def _attempt(host: str, port: int, endpoint: Endpoint, start: float) -> Attempt:
+    sent = time.monotonic()
+    status = error = None
+    try:
+        status = await asyncio.wait_for(
+            _get(host, port, endpoint.path), endpoint.budget
+        )
+    except TimeoutError:
+        error = f"no response within {endpoint.budget} seconds"
+    except (OSError, ValueError, IndexError) as exception:
+        error = repr(exception)
+
+    return Attempt(
+        endpoint.path,
+        elapsed=round(sent - start, 6),
+        latency=round(time.monotonic() - sent, 6),
+        status=status,
+        error=error,
+    )
+
+
+async def probe(
+    url: str = DEFAULT_URL,
+    endpoints: Sequence[Endpoint] = ENDPOINTS,
+    *,
+    timeout: float = DEFAULT_TIMEOUT,
+    backoff: Backoff = Backoff(),
+    alive: Callable[[], bool] | None = None,
+) -> Report:
+    """Probe the endpoints until all of them are ready, or giving up."""
+    parts = urllib.parse.urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    report = Report()
+    pending = list(endpoints)
+    start = time.monotonic()
+    deadline = start + timeout
+    for interval in backoff.intervals():
+        if alive is not None and not alive():
+            report.outcome = EXITED
+            break
+
+        attempts = await asyncio.gather(
+            *(_attempt(host, port, endpoint, start) for endpoint in pending)
+        )
+        report.attempts += attempts
+        for endpoint, attempt in zip(list(pending), attempts, strict=True):
+            if attempt.status == 200:
+                report.ready[endpoint.path] = round(
+                    attempt.elapsed + attempt.latency, 6
+                )
+                pending.remove(endpoint)
+
+        if not pending:
+            report.outcome = READY
+            break
+
+        if (remaining := deadline - time.monotonic()) <= 0:
+            break
+
+        # * A last round at the deadline
+        await asyncio.sleep(min(interval, remaining))
+
+    report.seconds = round(time.monotonic() - start, 6)
+    return report
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(description="Probe the application readiness.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        type=Endpoint.parse,
+        metavar="PATH=BUDGET",
+        help="endpoint and its latency budget in seconds, e.g. /readyz=0.5",
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--pid", type=int, help="process of the application")
+    parser.add_argument("--report", type=Path, help="JSON report, else to stdout")
+    args = parser.parse_args(argv)
+
+    alive = None if args.pid is None else functools.partial(process_alive, args.pid)
+    report = asyncio.run(
+        probe(
+            args.url,
+            args.endpoint or ENDPOINTS,
+            timeout=args.timeout,
+            alive=alive,
+        )
+    )
+    document = json.dumps(asdict(report), indent=2)
+    if args.report is not None:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(document)
+    else:
+        print(document)
+
+    summary = ", ".join(f"{path} {ready:.3f} s" for path, ready in report.ready.items())
+    print(
+        f"Readiness {report.outcome} after {report.seconds:.3f} s"
+        f" and {len(report.attempts)} attempts ({summary or 'none ready'})",
+        file=sys.stderr,
+    )
+    return 0 if report.outcome == READY else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
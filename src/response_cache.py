@@ -0,0 +1,452 @@
+"""Response cache shared by all workers on the host.
+
+Responses are stored in a memory-mapped file, so every uvicorn worker reads and
+fills the same cache instead of keeping a copy of its own. The file is laid out
+as a set-associative table: a key maps to one set of `ways` fixed-size slots,
+and the least recently used slot of the set is evicted when it is full. Entries
+expire after their TTL.
+
+Sets are locked individually, across processes with a byte-range lock on a
+companion `.lock` file and across threads with a lock per set, so workers
+rarely contend with each other.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from anyio import to_thread
+from fastapi.responses import Response
+
+from .json_response import FastJSONResponse
+
+CACHE_DIR_VARIABLE = "APP_CACHE_DIR"
+VERSION_VARIABLE = "APP_VERSION"
+
+# Root directory of the application
+APP_DIR = Path(__file__).parent.parent
+
+_MAGIC = b"RESPCACHE1"
+
+# Magic, sets, ways, slot size
+_HEADER = struct.Struct("<10sIII")
+_HEADER_SIZE = 64
+
+# Hits, misses
+_SET_HEADER = struct.Struct("<QQ")
+
+# Key hash (0 if empty), expires at, last used, key length, value length
+_SLOT_HEADER = struct.Struct("<QdQII")
+
+# Byte of the lock file guarding the initialization of the cache file; sets are
+# locked with the bytes following it
+_INIT_LOCK_OFFSET = 0
+
+if sys.platform == "win32":
+    import msvcrt
+
+    # Delays between attempts to lock a byte held by another process, in seconds
+    _LOCK_RETRY_INITIAL = 0.001
+    _LOCK_RETRY_MAXIMUM = 0.05
+
+    # * Locks apply at the file position, shared by all threads of the process
+    _position_lock = threading.Lock()
+
+    def _lock_byte(fd: int, offset: int, *, blocking: bool = True) -> bool:
+        delay = _LOCK_RETRY_INITIAL
+        while True:
+            with _position_lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    return True
+                except OSError:
+                    if not blocking:
+                        return False
+
+            # * Waits without the position lock, so other bytes can be unlocked
+            time.sleep(delay)
+            delay = min(delay * 2, _LOCK_RETRY_MAXIMUM)
+
+    def _unlock_byte(fd: int, offset: int) -> None:
+        with _position_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_byte(fd: int, offset: int, *, blocking: bool = True) -> bool:
+        try:
+            fcntl.lockf(
+                fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB), 1, offset
+            )
+        except (BlockingIOError, PermissionError):
+            # * Held by another process, reported as either error
+            if blocking:
+                raise
+            return False
+
+        return True
+
+    def _unlock_byte(fd: int, offset: int) -> None:
+        fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset)
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Hit and miss counters of a cache, summed over all workers."""
+
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SharedCache:
+    """Cache of byte strings in a file-backed memory map shared by processes.
+
+    Every process opening the same `path` with the same layout shares the
+    entries. A file with another layout is reinitialized.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        path: Path,
+        *,
+        sets: int = 512,
+        ways: int = 8,
+        slot_size: int = 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.sets = sets
+        self.ways = ways
+        self.slot_size = slot_size
+        self.clock = clock
+        self._set_size = _SET_HEADER.size + ways * slot_size
+        self._size = _HEADER_SIZE + sets * self._set_size
+        self._thread_locks = [threading.Lock() for _ in range(sets)]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = os.open(
+            path.with_name(f"{path.name}.lock"),
+            os.O_RDWR | os.O_CREAT,
+            0o600,
+        )
+        _lock_byte(self._lock_fd, _INIT_LOCK_OFFSET)
+        try:
+            self._fd = self._open()
+        finally:
+            _unlock_byte(self._lock_fd, _INIT_LOCK_OFFSET)
+
+        self._map = mmap.mmap(self._fd, self._size)
+
+    def _open(self) -> int:
+        flags = os.O_RDWR | getattr(os, "O_BINARY", 0)
+        try:
+            fd = os.open(self.path, flags | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            fd = os.open(self.path, flags)
+            header = os.read(fd, _HEADER.size)
+            if header == self._header and os.fstat(fd).st_size == self._size:
+                return fd
+
+            # * Other processes may still map the file of another layout, so it
+            # * is replaced rather than resized
+            os.close(fd)
+            partial = self.path.with_name(f"{self.path.name}.{os.getpid()}.part")
+            fd = os.open(partial, flags | os.O_CREAT | os.O_TRUNC, 0o600)
+            self._initialize(fd)
+            os.close(fd)
+            os.replace(partial, self.path)
+            return os.open(self.path, flags)
+
+        self._initialize(fd)
+        return fd
+
+    def _initialize(self, fd: int) -> None:
+        """Size a new cache file and write its header."""
+        os.ftruncate(fd, self._size)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, self._header)
+
+    @property
+    def _header(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.sets, self.ways, self.slot_size)
+
+    @property
+    def capacity(self) -> int:
+        """Bytes available for the key and value of an entry."""
+        return self.slot_size - _SLOT_HEADER.size
+
+    def close(self) -> None:
+        """Unmap the cache file."""
+        self._map.close()
+        os.close(self._fd)
+        os.close(self._lock_fd)
+
+    @contextmanager
+    def _locked(self, index: int, *, blocking: bool = True) -> Iterator[int]:
+        """Lock the set at `index`, yielding its offset in the file.
+
+        Raises:
+            BlockingIOError: If not `blocking` and the set is locked by another
+                thread or process.
+
+        """
+        thread_lock = self._thread_locks[index]
+        byte = _INIT_LOCK_OFFSET + 1 + index
+        if not thread_lock.acquire(blocking=blocking):
+            raise BlockingIOError
+
+        try:
+            if not _lock_byte(self._lock_fd, byte, blocking=blocking):
+                raise BlockingIOError
+
+            try:
+                yield _HEADER_SIZE + index * self._set_size
+            finally:
+                _unlock_byte(self._lock_fd, byte)
+        finally:
+            thread_lock.release()
+
+    def _slots(self, offset: int) -> range:
+        start = offset + _SET_HEADER.size
+        return range(start, start + self.ways * self.slot_size, self.slot_size)
+
+    def _count(self, offset: int, *, hit: bool) -> None:
+        hits, misses = _SET_HEADER.unpack_from(self._map, offset)
+        _SET_HEADER.pack_into(
+            self._map,
+            offset,
+            hits + hit,
+            misses + (not hit),
+        )
+
+    def get(self, key: bytes, *, blocking: bool = True) -> bytes | None:
+        """Value of the key, if cached and not expired.
+
+        Raises:
+            BlockingIOError: If not `blocking` and the set of the key is locked.
+
+        """
+        key_hash = _hash(key)
+        now = self.clock()
+        with self._locked(key_hash % self.sets, blocking=blocking) as offset:
+            for slot in self._slots(offset):
+                slot_hash, expires_at, _, key_len, value_len = _SLOT_HEADER.unpack_from(
+                    self._map, slot
+                )
+                if slot_hash != key_hash or expires_at <= now:
+                    continue
+
+                data = slot + _SLOT_HEADER.size
+                if self._map[data : data + key_len] != key:
+                    continue
+
+                _SLOT_HEADER.pack_into(
+                    self._map,
+                    slot,
+                    slot_hash,
+                    expires_at,
+                    time.monotonic_ns(),
+                    key_len,
+                    value_len,
+                )
+                self._count(offset, hit=True)
+                return self._map[data + key_len : data + key_len + value_len]
+
+            self._count(offset, hit=False)
+            return None
+
+    def set(
+        self,
+        key: bytes,
+        value: bytes,
+        *,
+        ttl: float,
+        blocking: bool = True,
+    ) -> bool:
+        """Cache the value for `ttl` seconds; false if it does not fit a slot.
+
+        Raises:
+            BlockingIOError: If not `blocking` and the set of the key is locked.
+
+        """
+        if len(key) + len(value) > self.capacity:
+            return False
+
+        key_hash = _hash(key)
+        now = self.clock()
+        with self._locked(key_hash % self.sets, blocking=blocking) as offset:
+            # * Replace the same key, else an empty or expired slot, else the
+            # * least recently used one
+            victim, victim_rank = 0, None
+            for slot in self._slots(offset):
+                slot_hash, expires_at, last_used, key_len, _ = _SLOT_HEADER.unpack_from(
+                    self._map, slot
+                )
+                data = slot + _SLOT_HEADER.size
+                if slot_hash == key_hash and self._map[data : data + key_len] == key:
+                    victim = slot
+                    break
+
+                rank = (slot_hash != 0 and expires_at > now, last_used)
+                if victim_rank is None or rank < victim_rank:
+                    victim, victim_rank = slot, rank
+
+            data = victim + _SLOT_HEADER.size
+            self._map[data : data + len(key) + len(value)] = key + value
+            _SLOT_HEADER.pack_into(
+                self._map,
+                victim,
+                key_hash,
+                now + ttl,
+                time.monotonic_ns(),
+                len(key),
+                len(value),
+            )
+
+        return True
+
+    def stats(self) -> CacheStats:
+        """Hit and miss counters of all processes sharing the cache."""
+        hits = misses = 0
+        for index in range(self.sets):
+            with self._locked(index) as offset:
+                set_hits, set_misses = _SET_HEADER.unpack_from(self._map, offset)
+                hits += set_hits
+                misses += set_misses
+
+        return CacheStats(hits=hits, misses=misses)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        for index in range(self.sets):
+            with self._locked(index) as offset:
+                self._map[offset : offset + self._set_size] = bytes(self._set_size)
+
+
+def _hash(key: bytes) -> int:
+    # * Zero marks empty slots
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest()) or 1
+
+
+def default_path(name: str, environ: Mapping[str, str] = os.environ) -> Path:
+    """Cache file shared by the workers of the application on this host.
+
+    Kept in the `.cache` directory of the application, unless moved with the
+    `APP_CACHE_DIR` environment variable, e.g. to a run directory.
+    """
+    directory = environ.get(CACHE_DIR_VARIABLE) or APP_DIR / ".cache"
+    return Path(directory) / f"{name}.cache"
+
+
+def app_version(environ: Mapping[str, str] = os.environ) -> str:
+    """Version of the application code, from the `APP_VERSION` variable.
+
+    Part of the cache keys, so that entries of a previous deployment are not
+    served by the next one.
+    """
+    return environ.get(VERSION_VARIABLE, "")
+
+
+def cached(
+    cache: SharedCache,
+    *,
+    ttl: float,
+    version: str = "",
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Cache JSON responses of a route in given cache for `ttl` seconds.
+
+    Entries are keyed by the `version` of the code, the route and its arguments.
+    Cached responses are returned as-is, skipping the route and its
+    serialization; responses too large for a slot are not cached.
+
+    Async routes access the cache on the event loop, unless the set of the key
+    is locked: waiting for it blocks, so it is then accessed from the threadpool.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+        prefix = f"{func.__module__}.{getattr(func, '__qualname__', func)}"
+
+        def key(args: tuple, kwargs: dict) -> bytes:
+            bound = signature.bind(*args, **kwargs)
+            return json.dumps(
+                [version, prefix, bound.arguments],
+                separators=(",", ":"),
+                sort_keys=True,
+                default=str,
+            ).encode()
+
+        def respond(body: bytes) -> Response:
+            return Response(content=body, media_type="application/json")
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                cache_key = key(args, kwargs)
+                try:
+                    body = cache.get(cache_key, blocking=False)
+                except BlockingIOError:
+                    body = await to_thread.run_sync(cache.get, cache_key)
+
+                if body is not None:
+                    return respond(body)
+
+                result = await func(*args, **kwargs)
+                try:
+                    return _store(cache, cache_key, result, ttl, blocking=False)
+                except BlockingIOError:
+                    return await to_thread.run_sync(
+                        _store, cache, cache_key, result, ttl
+                    )
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            cache_key = key(args, kwargs)
+            if (body := cache.get(cache_key)) is not None:
+                return respond(body)
+
+            return _store(cache, cache_key, func(*args, **kwargs), ttl)
+
+        return wrapper
+
+    return decorator
+
+
+def _store(
+    cache: SharedCache,
+    key: bytes,
+    result: Any,
+    ttl: float,
+    *,
+    blocking: bool = True,
+) -> Any:
+    if isinstance(result, Response):
+        return result
+
+    response = FastJSONResponse(content=result)
+    cache.set(key, bytes(response.body), ttl=ttl, blocking=blocking)
+    return response
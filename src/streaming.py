@@ -0,0 +1,35 @@
+"""Streaming responses of many records.
+
+Records are serialized lazily as newline-delimited JSON (NDJSON), a chunk of
+lines at a time. `StreamingResponse` sends a chunk before asking the generator
+for the next one and the server only completes a send once the transport can
+take more, so a slow client slows down serialization instead of growing a
+buffer: memory stays bounded by the chunk size, however many records there are.
+"""
+
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+from .json_response import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Records per chunk; large enough to amortize a send, small enough to stay flat
+CHUNK_RECORDS = 500
+
+
+async def ndjson_chunks(
+    records: Iterable[Any],
+    *,
+    chunk_records: int = CHUNK_RECORDS,
+) -> AsyncIterator[bytes]:
+    """Yield records as NDJSON, `chunk_records` lines per chunk."""
+    lines: list[bytes] = []
+    for record in records:
+        lines.append(dumps(record))
+        if len(lines) == chunk_records:
+            yield b"\n".join(lines) + b"\n"
+            lines.clear()
+
+    if lines:
+        yield b"\n".join(lines) + b"\n"
@@ -0,0 +1,193 @@
+import asyncio
+import gzip
+import json
+import time
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+import main
+
+from . import benchmark
+from .benchmark import asgi_request
+from .compression import CompressionMiddleware, negotiate
+
+ITEMS = [main.get_item(i, "some query") for i in range(200)]
+
+# Rendered once, like responses served from the item cache
+ITEMS_BODY = json.dumps(ITEMS).encode()
+
+GZIP = ((b"accept-encoding", b"gzip, deflate"),)
+
+
+def _api() -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/items")
+    async def read_items() -> Response:
+        return Response(ITEMS_BODY, media_type="application/json")
+
+    @api.get("/small")
+    async def read_small() -> dict:
+        return {"small": True}
+
+    @api.get("/tagged")
+    async def read_tagged() -> Response:
+        return Response(b"x" * 2048, media_type="text/plain", headers={"etag": '"a"'})
+
+    @api.get("/png")
+    async def read_png() -> Response:
+        return Response(bytes(2048), media_type="image/png")
+
+    @api.get("/stream")
+    async def stream() -> StreamingResponse:
+        lines = (b'{"line":%d}\n' % i * 100 for i in range(5))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    return api
+
+
+@pytest.fixture
+def app() -> CompressionMiddleware:
+    return CompressionMiddleware(_api(), encodings=("gzip",))
+
+
+def request(
+    app: CompressionMiddleware,
+    path: str,
+    headers: tuple[tuple[bytes, bytes], ...] = GZIP,
+) -> benchmark.Response:
+    return asyncio.run(asgi_request(app, path, headers=headers))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("accept_encoding", "encoding"),
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("deflate", None),
+        ("", None),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("GZIP;q=invalid, br;Q=0.1", "br"),
+        ("identity", None),
+    ],
+)
+def test_negotiate(accept_encoding: str, encoding: str | None) -> None:
+    assert negotiate(accept_encoding, ("br", "gzip")) == encoding
+
+
+@pytest.mark.unit
+def test_compress(app: CompressionMiddleware) -> None:
+    response = request(app, "/items")
+
+    assert response.status == 200
+    assert response.header("content-encoding") == "gzip"
+    assert response.header("vary") == "accept-encoding"
+    assert response.header("content-length") == str(len(response.body))
+    assert json.loads(gzip.decompress(response.body)) == ITEMS
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("path", "headers"),
+    [
+        # Not accepted by the client
+        ("/items", ()),
+        ("/items", ((b"accept-encoding", b"gzip;q=0"),)),
+        # Too small to be worth it
+        ("/small", GZIP),
+        # Not a compressible media type
+        ("/png", GZIP),
+    ],
+)
+def test_not_compressed(
+    app: CompressionMiddleware,
+    path: str,
+    headers: tuple[tuple[bytes, bytes], ...],
+) -> None:
+    response = request(app, path, headers)
+
+    assert response.status == 200
+    assert response.header("content-encoding") is None
+    assert response.header("content-length") == str(len(response.body))
+
+
+@pytest.mark.unit
+def test_weakens_etag(app: CompressionMiddleware) -> None:
+    response = request(app, "/tagged")
+
+    assert response.header("content-encoding") == "gzip"
+    assert response.header("etag") == 'W/"a"'
+
+
+@pytest.mark.unit
+def test_compress_stream(app: CompressionMiddleware) -> None:
+    chunks: list[bytes] = []
+
+    async def on_body(chunk: bytes) -> None:
+        chunks.append(chunk)
+
+    response = asyncio.run(asgi_request(app, "/stream", headers=GZIP, on_body=on_body))
+
+    assert response.header("content-encoding") == "gzip"
+    assert response.header("content-length") is None
+    # Every chunk can be decompressed as soon as it is received
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    lines = [decompressor.decompress(chunk) for chunk in chunks[:5]]
+    assert lines == [b'{"line":%d}\n' % i * 100 for i in range(5)]
+    assert gzip.decompress(b"".join(chunks)) == b"".join(lines)
+
+
+@pytest.mark.unit
+def test_cache(app: CompressionMiddleware) -> None:
+    first = request(app, "/items")
+    second = request(app, "/items")
+
+    assert first.body == second.body
+    assert app.cached_compress.cache_info().hits == 1
+
+
+@pytest.mark.unit
+def test_brotli() -> None:
+    brotli = pytest.importorskip("brotli")
+    app = CompressionMiddleware(_api())
+
+    response = request(app, "/items", ((b"accept-encoding", b"gzip, br"),))
+
+    assert response.header("content-encoding") == "br"
+    assert json.loads(brotli.decompress(response.body)) == ITEMS
+
+
+@pytest.mark.benchmark
+def test_benchmark_compression() -> None:
+    api = _api()
+    cases = {
+        "identity": (CompressionMiddleware(api), ()),
+        "gzip": (CompressionMiddleware(api, encodings=("gzip",), cache_size=0), GZIP),
+        "gzip cached": (CompressionMiddleware(api, encodings=("gzip",)), GZIP),
+    }
+    number = 200
+
+    results = {}
+    for name, (app, headers) in cases.items():
+        size = len(request(app, "/items", headers).body)
+
+        async def run(
+            app: CompressionMiddleware = app, headers: tuple = headers
+        ) -> None:
+            for _ in range(number):
+                await asgi_request(app, "/items", headers=headers)
+
+        start = time.process_time()
+        asyncio.run(run())
+        results[name] = (size, (time.process_time() - start) / number)
+
+    for name, (size, cpu) in results.items():
+        print(f"{name}: {size} bytes on the wire, {cpu * 1e6:.0f} us CPU per request")
+
+    assert results["gzip"][0] * 5 < results["identity"][0]
+    assert results["gzip cached"][1] < results["gzip"][1]
@@ -0,0 +1,126 @@
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import main
+
+from .conditional import ConditionalRoute, cache_control, etag, none_match
+
+
+@pytest.fixture
+def items() -> dict[int, str]:
+    return {1: "apple"}
+
+
+@pytest.fixture
+def client(items: dict[int, str]) -> TestClient:
+    router = APIRouter(route_class=ConditionalRoute)
+
+    @router.get("/items/{item_id}")
+    @cache_control("private, max-age=5")
+    def read_item(item_id: int) -> dict:
+        if item_id not in items:
+            raise HTTPException(status_code=404)
+
+        return {"item_id": item_id, "name": items[item_id]}
+
+    @router.get("/plain")
+    def read_plain() -> dict:
+        return {"plain": True}
+
+    @router.get("/stream")
+    def stream() -> StreamingResponse:
+        return StreamingResponse(iter([b"a", b"b"]))
+
+    @router.put("/items/{item_id}")
+    def update_item(item_id: int, name: str) -> dict:
+        items[item_id] = name
+        return {"item_id": item_id, "name": name}
+
+    api = FastAPI()
+    api.include_router(router)
+    return TestClient(api)
+
+
+@pytest.mark.unit
+def test_not_modified(client: TestClient) -> None:
+    first = client.get("/items/1")
+    tag = first.headers["etag"]
+
+    second = client.get("/items/1", headers={"If-None-Match": tag})
+
+    assert first.status_code == 200
+    assert tag == etag(first.content)
+    assert first.headers["cache-control"] == "private, max-age=5"
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == tag
+    assert second.headers["cache-control"] == "private, max-age=5"
+    assert "content-type" not in second.headers
+
+
+@pytest.mark.unit
+def test_invalidated_on_change(client: TestClient) -> None:
+    tag = client.get("/items/1").headers["etag"]
+    client.put("/items/1", params={"name": "banana"})
+
+    response = client.get("/items/1", headers={"If-None-Match": tag})
+
+    assert response.status_code == 200
+    assert response.json() == {"item_id": 1, "name": "banana"}
+    assert response.headers["etag"] != tag
+    assert (
+        client.get(
+            "/items/1",
+            headers={"If-None-Match": response.headers["etag"]},
+        ).status_code
+        == 304
+    )
+
+
+@pytest.mark.unit
+def test_no_etag_on_errors_and_streams(client: TestClient) -> None:
+    assert "etag" not in client.get("/items/2").headers
+    assert "etag" not in client.get("/stream").headers
+    assert "etag" not in client.put("/items/1", params={"name": "kiwi"}).headers
+
+    plain = client.get("/plain")
+    assert "etag" in plain.headers
+    assert "cache-control" not in plain.headers
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, True),
+        ("", True),
+        ('"a"', False),
+        ('W/"a"', False),
+        ('"b", "a"', False),
+        ('"b"', True),
+        ("*", False),
+    ],
+)
+def test_none_match(header: str | None, expected: bool) -> None:
+    assert none_match(header, '"a"') is expected
+
+
+@pytest.mark.unit
+def test_read_item_conditional() -> None:
+    client = TestClient(main.app)
+
+    first = client.get("/items/7?q=poll")
+    second = client.get(
+        "/items/7?q=poll",
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    other = client.get(
+        "/items/7?q=other",
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+
+    assert first.headers["cache-control"] == "no-cache"
+    assert second.status_code == 304
+    assert other.status_code == 200
@@ -0,0 +1,170 @@
+import asyncio
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+from .benchmark import asgi_request
+from .drain import Drain
+from .health import HealthProbes
+from .loadtest import Route, http_sender
+
+
+def _api() -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/slow")
+    async def read_slow(seconds: float = 0.05) -> dict:
+        await asyncio.sleep(seconds)
+        return {"slept": seconds}
+
+    return api
+
+
+def _drain(**kwargs: float) -> Drain:
+    drain = Drain(HealthProbes(_api()), **kwargs)
+    drain.app.ready = True
+    return drain
+
+
+@pytest.mark.unit
+def test_drain_waits_for_requests() -> None:
+    drain = _drain(delay=0, timeout=5)
+
+    async def scenario() -> tuple[bool, float, str | None]:
+        request = asyncio.create_task(
+            asgi_request(drain, "/slow", query_string=b"seconds=0.2")
+        )
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        drained = await drain.drain()
+        response = await request
+        return drained, time.monotonic() - start, response.header("connection")
+
+    drained, seconds, connection = asyncio.run(scenario())
+
+    assert drained
+    assert 0.1 < seconds < 1
+    # Requests answered while draining close their connection
+    assert connection == "close"
+    assert drain.in_flight == 0
+
+
+@pytest.mark.unit
+def test_drain_timeout() -> None:
+    drain = _drain(delay=0, timeout=0.05)
+
+    async def scenario() -> bool:
+        request = asyncio.create_task(
+            asgi_request(drain, "/slow", query_string=b"seconds=0.5")
+        )
+        await asyncio.sleep(0.01)
+        drained = await drain.drain()
+        await request
+        return drained
+
+    assert not asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_drain_fails_readiness() -> None:
+    drain = _drain(delay=0, timeout=1)
+
+    async def scenario() -> tuple[int, int, int]:
+        before = await asgi_request(drain, "/readyz")
+        await drain.drain()
+        after = await asgi_request(drain, "/readyz")
+        # Still served, if routed here anyway
+        served = await asgi_request(drain, "/slow", query_string=b"seconds=0")
+        return before.status, after.status, served.status
+
+    assert asyncio.run(scenario()) == (200, 503, 200)
+
+
+@pytest.mark.unit
+def test_from_environ(tmp_path: Path) -> None:
+    probes = HealthProbes(_api())
+
+    assert Drain.from_environ(probes, {}).directory is None
+    assert Drain.from_environ(probes, {"APP_DRAIN_DIR": str(tmp_path)}).directory == (
+        tmp_path
+    )
+
+
+@pytest.mark.unit
+def test_no_requests_dropped_on_stop(tmp_path: Path) -> None:
+    drain = Drain(
+        HealthProbes(_api()),
+        directory=tmp_path,
+        delay=0.3,
+        timeout=5,
+        poll_interval=0.02,
+    )
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            drain, host="127.0.0.1", port=port, ws="none", log_level="warning"
+        )
+    )
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    statuses: list[int] = []
+    errors: list[Exception] = []
+
+    async def load_balancer() -> None:
+        # * Routes requests to the host until its readiness fails
+        routed = asyncio.Event()
+        routed.set()
+        async with http_sender(f"http://127.0.0.1:{port}") as send:
+
+            async def client() -> None:
+                while routed.is_set():
+                    try:
+                        statuses.append(await send(Route("slow", "/slow")))
+                    except (OSError, asyncio.IncompleteReadError) as error:
+                        errors.append(error)
+
+            async def health_check() -> None:
+                while await send(Route("readyz", "/readyz")) == 200:
+                    await asyncio.sleep(0.02)
+
+                routed.clear()
+
+            async with asyncio.TaskGroup() as group:
+                for _ in range(8):
+                    group.create_task(client())
+
+                group.create_task(health_check())
+                await asyncio.sleep(0.2)
+                # The stop hook asks the workers to drain
+                (tmp_path / "drain").touch()
+
+    try:
+        while not server.started:
+            time.sleep(0.01)
+
+        asyncio.run(load_balancer())
+
+        # The stop hook waits for the workers to drain, then stops the service
+        workers = list(tmp_path.glob("worker-*"))
+        deadline = time.monotonic() + 10
+        while any(w.read_text() != "drained" for w in workers):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    assert len(workers) == 1
+    assert errors == []
+    assert len(statuses) > 20
+    assert set(statuses) == {200}
+    # Workers remove their status file when they stop
+    assert not list(tmp_path.glob("worker-*"))
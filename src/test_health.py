@@ -0,0 +1,86 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import main
+
+from .benchmark import asgi_request, per_call
+from .health import HealthProbes
+
+
+@pytest.fixture
+def api() -> FastAPI:
+    api = FastAPI()
+    api.state.middleware_calls = 0
+
+    @api.middleware("http")
+    async def count(request: Request, call_next):
+        api.state.middleware_calls += 1
+        return await call_next(request)
+
+    @api.get("/")
+    def read_root() -> dict:
+        return {"Hello": "World"}
+
+    return api
+
+
+@pytest.mark.unit
+def test_liveness(api: FastAPI) -> None:
+    client = TestClient(HealthProbes(api))
+
+    response = client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+    assert response.headers["cache-control"] == "no-store"
+    assert api.state.middleware_calls == 0
+
+
+@pytest.mark.unit
+def test_readiness_follows_lifespan(api: FastAPI) -> None:
+    app = HealthProbes(api)
+    client = TestClient(app)
+
+    assert client.get("/readyz").status_code == 503
+    with client:
+        response = client.get("/readyz")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+        app.ready = False
+        assert client.get("/readyz").status_code == 503
+        app.ready = True
+
+    assert client.get("/readyz").status_code == 503
+    assert api.state.middleware_calls == 0
+
+
+@pytest.mark.unit
+def test_head_probe(api: FastAPI) -> None:
+    client = TestClient(HealthProbes(api))
+
+    response = client.head("/healthz")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == "15"
+
+
+@pytest.mark.unit
+def test_passes_other_requests(api: FastAPI) -> None:
+    client = TestClient(HealthProbes(api))
+
+    response = client.get("/")
+
+    assert response.json() == {"Hello": "World"}
+    assert api.state.middleware_calls == 1
+
+
+@pytest.mark.benchmark
+def test_benchmark_probe_cost() -> None:
+    root = per_call(lambda: asgi_request(main.app, "/"), number=200)
+    probe = per_call(lambda: asgi_request(main.app, "/healthz"), number=200)
+
+    print(f"GET /: {root * 1e6:.1f} us, GET /healthz: {probe * 1e6:.1f} us")
+    assert probe * 5 < root
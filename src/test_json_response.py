@@ -0,0 +1,54 @@
+import datetime
+import json
+import math
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from .json_response import FastJSONResponse, dumps
+
+
+class Point(BaseModel):
+    x: int
+    label: str | None = None
+
+
+@pytest.mark.unit
+def test_dumps() -> None:
+    content = {"name": "café", "values": [1, 2.5, None, True], "nested": {"a": []}}
+
+    assert dumps(content) == JSONResponse(content).body
+    assert json.loads(dumps(content)) == content
+
+
+@pytest.mark.unit
+def test_dumps_rich_types() -> None:
+    content = {
+        "point": Point(x=1),
+        "at": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.UTC),
+        "nan": math.nan,
+    }
+
+    assert json.loads(dumps(content)) == {
+        "point": {"x": 1, "label": None},
+        "at": "2024-01-02T03:04:05Z",
+        "nan": None,
+    }
+
+
+@pytest.mark.unit
+def test_default_response_class() -> None:
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/points/{x}", response_model=Point)
+    async def read_point(x: int) -> dict:
+        return {"x": x, "label": "p"}
+
+    response = TestClient(app).get("/points/3")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == b'{"x":3,"label":"p"}'
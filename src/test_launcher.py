@@ -0,0 +1,124 @@
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from .launcher import (
+    MiB,
+    LaunchSettings,
+    Resources,
+    apply_overrides,
+    detect_resources,
+    size_settings,
+)
+
+ROOT_DIR = Path(__file__).parent.parent
+GiB = 1024 * MiB
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("resources", "workers"),
+    [
+        # Smallest and largest instances of the fleet
+        (Resources(cpus=2, memory=4 * GiB), 2),
+        (Resources(cpus=4, memory=8 * GiB), 4),
+        # Bounded by memory
+        (Resources(cpus=16, memory=3 * GiB), 4),
+        (Resources(cpus=4, memory=1 * GiB), 1),
+        (Resources(cpus=1, memory=8 * GiB), 1),
+    ],
+)
+def test_size_settings(resources: Resources, workers: int) -> None:
+    settings = size_settings(resources)
+
+    assert settings.workers == workers
+    assert settings.backlog == 1024 * workers
+    assert settings.timeout_keep_alive > 300
+
+
+@pytest.mark.unit
+def test_apply_overrides() -> None:
+    settings = LaunchSettings(
+        workers=4,
+        backlog=4096,
+        limit_concurrency=1024,
+        timeout_keep_alive=305,
+    )
+
+    overridden = apply_overrides(
+        settings,
+        {"APP_WORKERS": "2", "APP_BACKLOG": "512", "OTHER": "1"},
+        {"workers": 3, "backlog": None, "limit_concurrency": None},
+    )
+
+    # Options take precedence over environment variables
+    assert overridden == LaunchSettings(
+        workers=3,
+        backlog=512,
+        limit_concurrency=1024,
+        timeout_keep_alive=305,
+    )
+
+
+@pytest.mark.unit
+def test_detect_resources() -> None:
+    resources = detect_resources()
+
+    assert resources.cpus >= 1
+    assert resources.memory > 0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.integration
+def test_launch_workers() -> None:
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.launcher",
+            "--host=127.0.0.1",
+            f"--port={port}",
+            "--workers=2",
+        ],
+        cwd=ROOT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert process.stderr is not None
+        started: list[str] = []
+        deadline = time.monotonic() + 30
+        while len(started) < 2 and time.monotonic() < deadline:
+            line = process.stderr.readline()
+            if not line:
+                break
+            if "Started server process" in line:
+                started.append(line)
+
+        assert len(started) == 2
+
+        url = f"http://127.0.0.1:{port}/"
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    assert response.status == 200
+                    break
+            except OSError:  # * Refused until the workers listen
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
@@ -0,0 +1,182 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from . import loadtest
+from .loadtest import (
+    REFERENCE,
+    Baseline,
+    LoadResult,
+    Regression,
+    Route,
+    Settings,
+    compare,
+    load_baseline,
+    run,
+    runner,
+    save_baseline,
+)
+
+SMALL_LOAD = Settings(concurrency=4, requests=20)
+
+ROUTES = (
+    Route("GET /", "/"),
+    Route("GET /items/stream", "/items/stream", query_string="start=0&end=2000"),
+    Route("GET /missing", "/missing"),
+)
+
+
+def _result(p50: float, p95: float, p99: float, *, errors: int = 0) -> LoadResult:
+    return LoadResult(requests=100, errors=errors, seconds=1, p50=p50, p95=p95, p99=p99)
+
+
+@pytest.mark.unit
+def test_compare_latency() -> None:
+    baseline = {
+        REFERENCE: _result(0.001, 0.001, 0.001),
+        "GET /": _result(0.010, 0.020, 0.030),
+        "GET /removed": _result(0.010, 0.020, 0.030),
+    }
+    results = {
+        REFERENCE: _result(0.002, 0.002, 0.002),
+        "GET /": _result(0.015, 0.030, 0.070),
+        "GET /added": _result(1, 1, 1),
+    }
+
+    regressions = compare(results, baseline, threshold=1.0)
+    assert regressions == [Regression("GET /", "p99", 0.070, regressions[0].allowed)]
+    assert regressions[0].allowed == pytest.approx(0.060)
+
+    regressions = compare(results, baseline, threshold=0.2)
+    assert [(r.metric, r.value) for r in regressions] == [
+        ("p50", 0.015),
+        ("p95", 0.030),
+        ("p99", 0.070),
+    ]
+    assert [r.allowed for r in regressions] == pytest.approx([0.012, 0.024, 0.036])
+    assert compare(results, baseline, threshold=0.2, latency=False) == []
+
+
+@pytest.mark.unit
+def test_compare_errors() -> None:
+    baseline = {"GET /": _result(0.010, 0.020, 0.030)}
+    # * Failing fast, well within the latency baseline
+    results = {
+        "GET /": _result(0.001, 0.001, 0.001, errors=100),
+        "GET /added": _result(0.001, 0.001, 0.001, errors=1),
+    }
+
+    regressions = compare(results, baseline, latency=False)
+
+    assert regressions == [
+        Regression("GET /", "errors", 100, 0),
+        Regression("GET /added", "errors", 1, 0),
+    ]
+    assert str(regressions[0]) == "GET / 100 errors > 0"
+
+
+@pytest.mark.unit
+def test_baseline(tmp_path: Path) -> None:
+    path = tmp_path / "baseline.json"
+    baseline = Baseline(
+        SMALL_LOAD,
+        {"ci": {"asgi": {REFERENCE: _result(0.001, 0.002, 0.003)}}, "laptop": {}},
+    )
+
+    save_baseline(baseline, path)
+
+    assert load_baseline(path) == baseline
+
+
+@pytest.mark.unit
+def test_runner() -> None:
+    assert runner({"LOADTEST_RUNNER": "github-ubuntu-24.04"}) == "github-ubuntu-24.04"
+    assert runner({}) == loadtest.machine()
+
+
+@pytest.mark.unit
+def test_main_records_runner_baseline(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "baseline.json"
+    save_baseline(Baseline(SMALL_LOAD, {"other": {}}), path)
+    monkeypatch.setenv("LOADTEST_RUNNER", "ci")
+    fast = {REFERENCE: _result(0.001, 0.001, 0.001), "GET /": _result(1, 1, 1)}
+    slow = {**fast, "GET /": _result(3, 3, 3)}
+    runs = iter([fast, slow])
+    monkeypatch.setattr(loadtest, "run", lambda *_args, **_kwargs: next(runs))
+    argv = ["--mode", "asgi", "--baseline", str(path)]
+
+    assert loadtest.main([*argv, "--update-baseline"]) == 0
+    # Latencies are compared with the baseline of the same runner class
+    assert loadtest.main(argv) == 1
+    assert load_baseline(path).runners == {"ci": {"asgi": fast}, "other": {}}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("response", "status", "keep_alive"),
+    [
+        (b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok", 200, True),
+        (
+            b"HTTP/1.1 404 Not Found\r\ntransfer-encoding: chunked\r\n\r\n"
+            b"2\r\nok\r\n3;x=y\r\nabc\r\n0\r\n\r\n",
+            404,
+            True,
+        ),
+        (b"HTTP/1.1 503 Unavailable\r\nconnection: close\r\n\r\n", 503, False),
+    ],
+)
+def test_read_response(response: bytes, status: int, keep_alive: bool) -> None:
+    async def read() -> tuple[int, bool]:
+        reader = asyncio.StreamReader()
+        reader.feed_data(response + b"HTTP/1.1 next response")
+        result = await loadtest._read_response(reader)
+        # The whole response is consumed, and nothing more
+        assert await reader.readexactly(8) == b"HTTP/1.1"
+        return result
+
+    assert asyncio.run(read()) == (status, keep_alive)
+
+
+@pytest.mark.parametrize(
+    "mode",
+    [
+        pytest.param("asgi", marks=pytest.mark.unit),
+        # * Serves the applications in uvicorn subprocesses
+        pytest.param("http", marks=pytest.mark.integration),
+    ],
+)
+def test_run(mode: str) -> None:
+    results = run("main:app", mode, routes=ROUTES, settings=SMALL_LOAD)
+
+    assert list(results) == [REFERENCE, *(route.name for route in ROUTES)]
+    for name, result in results.items():
+        assert result.requests == 20
+        assert result.errors == (20 if name == "GET /missing" else 0)
+        assert 0 < result.p50 <= result.p95 <= result.p99
+        assert result.rps > 0
+
+
+@pytest.mark.unit
+def test_scenario_without_errors() -> None:
+    results = run("main:app", "asgi", settings=SMALL_LOAD)
+
+    assert compare(results, {}, latency=False) == []
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("mode", loadtest.MODES)
+def test_benchmark_latency_regression(mode: str) -> None:
+    baseline = load_baseline()
+    if mode not in (expected := baseline.runners.get(runner(), {})):
+        pytest.skip(
+            f"No {mode} baseline recorded on runner {runner()!r}, record one with"
+            " `python -m src.loadtest --update-baseline` on the base revision"
+        )
+
+    results = run("main:app", mode, settings=baseline.settings)
+
+    assert compare(results, expected[mode]) == []
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from .benchmark import asgi_request, per_call
+from .metrics import (
+    BUCKETS,
+    Metrics,
+    MetricsMiddleware,
+    RouteMetrics,
+    publish_emf,
+    remove_stale_emf,
+    write_emf,
+)
+
+
+def _api() -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/items/{item_id}")
+    async def read_item(item_id: int) -> dict:
+        return {"item_id": item_id}
+
+    @api.get("/error")
+    async def read_error() -> None:
+        raise RuntimeError
+
+    return api
+
+
+@pytest.fixture
+def metrics() -> Metrics:
+    return Metrics()
+
+
+@pytest.fixture
+def client(metrics: Metrics) -> TestClient:
+    app = MetricsMiddleware(_api(), metrics=metrics)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+@pytest.mark.unit
+def test_route_metrics() -> None:
+    metrics = RouteMetrics()
+
+    metrics.observe(200, 0.0005)
+    metrics.observe(200, BUCKETS[0])
+    metrics.observe(404, 0.003)
+    metrics.observe(500, 60)
+
+    assert metrics.buckets[:3] == [2, 0, 1]
+    assert metrics.buckets[-1] == 1
+    assert sum(metrics.buckets) == 4
+    assert metrics.latency_sum == pytest.approx(60.0045)
+    assert metrics.statuses == {200: 2, 404: 1, 500: 1}
+
+
+@pytest.mark.unit
+def test_middleware(client: TestClient, metrics: Metrics) -> None:
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/a")
+    client.get("/missing")
+    client.get("/error")
+    client.request("PURGE", "/items/1")
+
+    assert {key: dict(route.statuses) for key, route in metrics.routes.items()} == {
+        # Labelled by route template, not path
+        ("GET", "/items/{item_id}"): {200: 2, 422: 1},
+        ("GET", "unmatched"): {404: 1},
+        ("GET", "/error"): {500: 1},
+        ("OTHER", "/items/{item_id}"): {405: 1},
+    }
+    assert metrics.in_flight == 0
+
+
+@pytest.mark.unit
+def test_prometheus(client: TestClient, metrics: Metrics) -> None:
+    client.get("/items/1")
+
+    lines = metrics.prometheus().splitlines()
+
+    labels = f'worker="{os.getpid()}",method="GET",route="/items/{{item_id}}"'
+    assert f'http_requests_in_flight{{worker="{os.getpid()}"}} 0' in lines
+    assert f'http_responses_total{{{labels},status="200"}} 1' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in lines
+    assert f"http_request_duration_seconds_count{{{labels}}} 1" in lines
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+
+
+@pytest.mark.unit
+def test_emf(metrics: Metrics) -> None:
+    metrics.observe("GET", "/", 200, 0.0005)
+    metrics.observe("GET", "/", 200, 0.0007)
+    metrics.observe("GET", "/", 503, 0.02)
+
+    in_flight, route = metrics.emf(namespace="Test", timestamp=1000)
+
+    assert in_flight["InFlight"] == 0
+    assert route["_aws"] == {
+        "Timestamp": 1000,
+        "CloudWatchMetrics": [
+            {
+                "Namespace": "Test",
+                "Dimensions": [["Method", "Route"]],
+                "Metrics": [
+                    {"Name": "Latency", "Unit": "Milliseconds"},
+                    {"Name": "Requests", "Unit": "Count"},
+                    {"Name": "2xx", "Unit": "Count"},
+                    {"Name": "5xx", "Unit": "Count"},
+                ],
+            }
+        ],
+    }
+    assert route["Method"] == "GET"
+    assert route["Route"] == "/"
+    assert route["Latency"] == {"Values": [1.0, 25.0], "Counts": [2, 1]}
+    assert (route["Requests"], route["2xx"], route["5xx"]) == (3, 2, 1)
+
+    # Only requests completed since the previous records are reported
+    assert len(metrics.emf()) == 1
+    metrics.observe("GET", "/", 200, 0.0005)
+    route = metrics.emf()[1]
+    assert route["Latency"] == {"Values": [1.0], "Counts": [1]}
+    assert (route["Requests"], route["2xx"], "5xx" in route) == (1, 1, False)
+
+
+@pytest.mark.unit
+def test_publish_emf(metrics: Metrics, tmp_path: Path) -> None:
+    environ = {"APP_METRICS_EMF_DIR": str(tmp_path / "emf")}
+
+    async def serve() -> None:
+        async with publish_emf(metrics, environ, interval=0.01):
+            metrics.observe("GET", "/", 200, 0.001)
+            await asyncio.sleep(0.05)
+            metrics.observe("GET", "/", 200, 0.001)
+
+    asyncio.run(serve())
+
+    path = tmp_path / "emf" / f"emf-{os.getpid()}.log"
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    # Both requests reported, the last one when stopping
+    assert sum(record.get("Requests", 0) for record in records) == 2
+    assert records[-1]["Requests"] == 1
+
+
+@pytest.mark.unit
+def test_write_emf_rotates(metrics: Metrics, tmp_path: Path) -> None:
+    path = tmp_path / "emf-1.log"
+
+    for _ in range(3):
+        write_emf(metrics, path, max_bytes=1)
+
+    # A single previous file is kept, every file holding the records of one write
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["emf-1.log", "emf-1.log.1"]
+    assert len(path.read_text().splitlines()) == 1
+    assert len((tmp_path / "emf-1.log.1").read_text().splitlines()) == 1
+
+
+@pytest.mark.unit
+def test_remove_stale_emf(tmp_path: Path) -> None:
+    for name in ("emf-1.log", "emf-1.log.1", "emf-2.log", "other.log"):
+        (tmp_path / name).write_text("{}\n")
+
+    stale = time.time() - 2 * 60 * 60
+    for name in ("emf-1.log", "emf-1.log.1", "other.log"):
+        os.utime(tmp_path / name, (stale, stale))
+
+    remove_stale_emf(tmp_path, stale_after=60 * 60)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["emf-2.log", "other.log"]
+
+
+@pytest.mark.unit
+def test_publish_emf_disabled(metrics: Metrics) -> None:
+    async def serve() -> None:
+        async with publish_emf(metrics, {}):
+            pass
+
+    asyncio.run(serve())
+
+
+@pytest.mark.benchmark
+def test_benchmark_overhead(metrics: Metrics) -> None:
+    api = _api()
+    instrumented = MetricsMiddleware(api, metrics=metrics)
+
+    bare = per_call(lambda: asgi_request(api, "/items/1"), number=2000)
+    measured = per_call(lambda: asgi_request(instrumented, "/items/1"), number=2000)
+
+    print(
+        f"Per request: {bare * 1e6:.1f} us bare, {measured * 1e6:.1f} us with metrics,"
+        f" {(measured - bare) * 1e6:.1f} us overhead",
+    )
+    assert measured - bare < 10e-6
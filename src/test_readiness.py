@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from .health import HealthProbes
+from .readiness import (
+    EXITED,
+    READY,
+    TIMEOUT,
+    Backoff,
+    Endpoint,
+    main,
+    probe,
+    process_alive,
+)
+
+ENDPOINTS = (Endpoint("/healthz", 0.2), Endpoint("/readyz", 0.2), Endpoint("/", 0.2))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _api(*, startup: float = 0, latency: float = 0, status: int = 200) -> FastAPI:
+    @contextlib.asynccontextmanager
+    async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+        await asyncio.sleep(startup)
+        yield
+
+    api = FastAPI(lifespan=lifespan)
+
+    @api.get("/")
+    async def read_root() -> JSONResponse:
+        await asyncio.sleep(latency)
+        return JSONResponse({}, status_code=status)
+
+    return api
+
+
+@contextlib.contextmanager
+def _serve(api: FastAPI, port: int, *, wait: bool = True) -> Iterator[None]:
+    server = uvicorn.Server(
+        uvicorn.Config(
+            HealthProbes(api), host="127.0.0.1", port=port, ws="none", log_level="error"
+        )
+    )
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    try:
+        while wait and not server.started:
+            time.sleep(0.01)
+
+        yield
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+@pytest.mark.unit
+def test_backoff() -> None:
+    intervals = Backoff(initial=0.05, factor=2, maximum=0.3).intervals()
+
+    assert list(itertools.islice(intervals, 5)) == [0.05, 0.1, 0.2, 0.3, 0.3]
+
+
+@pytest.mark.unit
+def test_endpoint_parse() -> None:
+    assert Endpoint.parse("/items/1?q=a=b=0.5") == Endpoint("/items/1?q=a=b", 0.5)
+
+
+@pytest.mark.unit
+def test_probe_slow_start() -> None:
+    port = _free_port()
+
+    # * The server listens once its startup completes
+    with _serve(_api(startup=0.5), port, wait=False):
+        report = asyncio.run(probe(f"http://127.0.0.1:{port}", ENDPOINTS, timeout=5))
+
+    assert report.outcome == READY
+    assert set(report.ready) == {"/healthz", "/readyz", "/"}
+    assert 0.5 < min(report.ready.values()) < 1.5
+    # Fast polling first, then backing off
+    rounds = [attempt for attempt in report.attempts if attempt.path == "/healthz"]
+    assert 4 <= len(rounds) <= 8
+    assert report.attempts[0].error is not None
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("api", "error"),
+    [
+        (_api(status=503), None),
+        (_api(latency=0.5), "no response within 0.2 seconds"),
+    ],
+)
+def test_probe_failing(api: FastAPI, error: str | None) -> None:
+    port = _free_port()
+
+    with _serve(api, port):
+        report = asyncio.run(probe(f"http://127.0.0.1:{port}", ENDPOINTS, timeout=1))
+
+    assert report.outcome == TIMEOUT
+    assert 0.9 < report.seconds < 2
+    assert list(report.ready) == ["/healthz", "/readyz"]
+    failed = [attempt for attempt in report.attempts if attempt.path == "/"]
+    assert len(failed) > 2
+    assert {(attempt.status, attempt.error) for attempt in failed} == {
+        (None, error) if error else (503, None)
+    }
+
+
+@pytest.mark.unit
+def test_process_alive() -> None:
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.2)"])
+
+    assert process_alive(process.pid)
+    time.sleep(0.5)
+    assert not process_alive(process.pid)
+
+
+@pytest.mark.unit
+def test_main_process_exited(tmp_path: Path) -> None:
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.3)"])
+    report_path = tmp_path / "reports" / "readiness.json"
+
+    status = main(
+        [
+            f"--url=http://127.0.0.1:{_free_port()}",
+            f"--pid={process.pid}",
+            f"--report={report_path}",
+            "--endpoint=/readyz=0.1",
+        ]
+    )
+
+    report = json.loads(report_path.read_text())
+    assert status == 1
+    assert report["outcome"] == EXITED
+    # Given up as soon as the process exited, long before the timeout
+    assert report["seconds"] < 2
+    assert report["attempts"][0]["path"] == "/readyz"
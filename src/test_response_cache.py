@@ -0,0 +1,310 @@
+import contextlib
+import multiprocessing
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+
+from .response_cache import APP_DIR, SharedCache, app_version, cached, default_path
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> SharedCache:
+    return SharedCache(tmp_path / "test.cache", sets=4, ways=2, slot_size=256)
+
+
+@pytest.mark.unit
+def test_get_set(cache: SharedCache) -> None:
+    assert cache.get(b"a") is None
+    assert cache.set(b"a", b"1", ttl=60)
+    assert cache.set(b"b", b"2", ttl=60)
+    assert cache.set(b"a", b"3", ttl=60)
+
+    assert cache.get(b"a") == b"3"
+    assert cache.get(b"b") == b"2"
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (2, 1)
+    assert stats.hit_rate == pytest.approx(2 / 3)
+
+
+@pytest.mark.unit
+def test_ttl(tmp_path: Path) -> None:
+    clock = _Clock()
+    cache = SharedCache(tmp_path / "test.cache", sets=1, ways=2, clock=clock)
+    cache.set(b"a", b"1", ttl=10)
+
+    clock.now += 9
+    assert cache.get(b"a") == b"1"
+    clock.now += 1
+    assert cache.get(b"a") is None
+
+
+@pytest.mark.unit
+def test_lru_eviction(tmp_path: Path) -> None:
+    cache = SharedCache(tmp_path / "test.cache", sets=1, ways=2)
+    cache.set(b"a", b"1", ttl=60)
+    cache.set(b"b", b"2", ttl=60)
+    assert cache.get(b"a") == b"1"
+
+    cache.set(b"c", b"3", ttl=60)
+
+    assert cache.get(b"a") == b"1"
+    assert cache.get(b"b") is None
+    assert cache.get(b"c") == b"3"
+
+
+@pytest.mark.unit
+def test_expired_evicted_first(tmp_path: Path) -> None:
+    clock = _Clock()
+    cache = SharedCache(tmp_path / "test.cache", sets=1, ways=2, clock=clock)
+    cache.set(b"a", b"1", ttl=60)
+    cache.set(b"b", b"2", ttl=1)
+    clock.now += 2
+    assert cache.get(b"a") == b"1"
+
+    cache.set(b"c", b"3", ttl=60)
+
+    assert cache.get(b"a") == b"1"
+    assert cache.get(b"c") == b"3"
+
+
+@pytest.mark.unit
+def test_too_large(cache: SharedCache) -> None:
+    assert not cache.set(b"a", b"x" * cache.capacity, ttl=60)
+    assert cache.set(b"a", b"x" * (cache.capacity - 1), ttl=60)
+    assert cache.get(b"a") == b"x" * (cache.capacity - 1)
+
+
+@pytest.mark.unit
+def test_shared_between_instances(tmp_path: Path) -> None:
+    first = SharedCache(tmp_path / "test.cache")
+    second = SharedCache(tmp_path / "test.cache")
+    first.set(b"a", b"1", ttl=60)
+
+    assert second.get(b"a") == b"1"
+
+    first.clear()
+    assert second.get(b"a") is None
+
+
+@pytest.mark.unit
+def test_reinitialized_on_layout_change(tmp_path: Path) -> None:
+    previous = SharedCache(tmp_path / "test.cache", sets=2)
+    previous.set(b"a", b"1", ttl=60)
+
+    cache = SharedCache(tmp_path / "test.cache", sets=4)
+
+    assert cache.get(b"a") is None
+    assert (tmp_path / "test.cache").stat().st_size > 4 * 8 * 1024
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "test.cache",
+        "test.cache.lock",
+    ]
+    # The file still mapped by another process is left untouched
+    assert previous.get(b"a") == b"1"
+
+
+def _hold_sets(path: Path, locked: threading.Event, release: threading.Event) -> None:
+    """Lock every set of the cache until released."""
+    cache = SharedCache(path, sets=4, ways=2, slot_size=256)
+    with contextlib.ExitStack() as stack:
+        for index in range(cache.sets):
+            stack.enter_context(cache._locked(index))
+
+        locked.set()
+        release.wait()
+
+
+@pytest.mark.unit
+def test_nonblocking_contended(tmp_path: Path) -> None:
+    path = tmp_path / "test.cache"
+    cache = SharedCache(path, sets=4, ways=2, slot_size=256)
+    cache.set(b"a", b"1", ttl=60)
+
+    context = multiprocessing.get_context("spawn")
+    locked, release = context.Event(), context.Event()
+    process = context.Process(target=_hold_sets, args=(path, locked, release))
+    process.start()
+    try:
+        assert locked.wait(timeout=30)
+        with pytest.raises(BlockingIOError):
+            cache.get(b"a", blocking=False)
+        with pytest.raises(BlockingIOError):
+            cache.set(b"b", b"2", ttl=60, blocking=False)
+    finally:
+        release.set()
+        process.join(timeout=30)
+
+    assert cache.get(b"a", blocking=False) == b"1"
+
+
+@pytest.mark.unit
+def test_cached_async_route_contended(cache: SharedCache) -> None:
+    api = FastAPI()
+
+    @api.get("/async/{item_id}")
+    @cached(cache, ttl=60)
+    async def read_async(item_id: int) -> dict:
+        return {"item_id": item_id}
+
+    client = TestClient(api)
+    client.get("/async/1")
+    locked, release = threading.Event(), threading.Event()
+
+    def hold() -> None:
+        with contextlib.ExitStack() as stack:
+            for index in range(cache.sets):
+                stack.enter_context(cache._locked(index))
+
+            locked.set()
+            time.sleep(0.2)
+
+        release.set()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+    response = client.get("/async/1")
+    thread.join()
+
+    # Waited for the set from the threadpool rather than failing
+    assert release.is_set()
+    assert response.json() == {"item_id": 1}
+
+
+def _hammer(path: Path, worker: int, rounds: int) -> int:
+    """Read and write overlapping keys, returning the number of corrupt reads."""
+    cache = SharedCache(path, sets=8, ways=4, slot_size=256)
+    corrupt = 0
+    for i in range(rounds):
+        key = f"key-{(i * 7 + worker) % 64}".encode()
+        value = cache.get(key)
+        if value is None:
+            cache.set(key, key * 4, ttl=60)
+        elif value != key * 4:
+            corrupt += 1
+
+    cache.close()
+    return corrupt
+
+
+@pytest.mark.unit
+def test_concurrent_processes(tmp_path: Path) -> None:
+    path = tmp_path / "test.cache"
+    SharedCache(path, sets=8, ways=4, slot_size=256).close()
+    workers, rounds = 4, 500
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers) as pool:
+        corrupt = pool.starmap(
+            _hammer,
+            [(path, worker, rounds) for worker in range(workers)],
+        )
+
+    assert corrupt == [0] * workers
+    stats = SharedCache(path, sets=8, ways=4, slot_size=256).stats()
+    assert stats.hits + stats.misses == workers * rounds
+    assert stats.hits > 0
+
+
+@pytest.mark.unit
+def test_cached_route(cache: SharedCache) -> None:
+    api = FastAPI()
+    calls: list[tuple[int, str | None]] = []
+
+    @api.get("/items/{item_id}")
+    @cached(cache, ttl=60)
+    def read_item(item_id: int, q: str | None = None) -> dict:
+        calls.append((item_id, q))
+        return {"item_id": item_id, "q": q}
+
+    @api.get("/async/{item_id}")
+    @cached(cache, ttl=60)
+    async def read_async(item_id: int) -> dict:
+        calls.append((item_id, "async"))
+        return {"item_id": item_id}
+
+    client = TestClient(api)
+    responses = [
+        client.get("/items/1"),
+        client.get("/items/1"),
+        client.get("/items/1?q=x"),
+        client.get("/items/1?q=x"),
+        client.get("/async/1"),
+        client.get("/async/1"),
+    ]
+
+    assert [r.json() for r in responses] == [
+        {"item_id": 1, "q": None},
+        {"item_id": 1, "q": None},
+        {"item_id": 1, "q": "x"},
+        {"item_id": 1, "q": "x"},
+        {"item_id": 1},
+        {"item_id": 1},
+    ]
+    assert {r.headers["content-type"] for r in responses} == {"application/json"}
+    assert calls == [(1, None), (1, "x"), (1, "async")]
+    # Validation and documentation still follow the route signature
+    assert client.get("/items/abc").status_code == 422
+    assert "q" in str(api.openapi()["paths"]["/items/{item_id}"])
+
+
+@pytest.mark.unit
+def test_cached_by_version(cache: SharedCache) -> None:
+    calls: list[str] = []
+
+    def route(version: str) -> Any:
+        @cached(cache, ttl=60, version=version)
+        def read_item(item_id: int) -> dict:
+            calls.append(version)
+            return {"item_id": item_id}
+
+        return read_item
+
+    previous, current = route("d-1"), route("d-2")
+    previous(1)
+    current(1)
+    current(1)
+
+    # Entries of a previous deployment are not served
+    assert calls == ["d-1", "d-2"]
+
+
+@pytest.mark.unit
+def test_default_path() -> None:
+    assert default_path("items", {}) == APP_DIR / ".cache" / "items.cache"
+    assert default_path("items", {"APP_CACHE_DIR": "/run/app"}) == Path(
+        "/run/app/items.cache"
+    )
+    assert app_version({"APP_VERSION": "d-ABC"}) == "d-ABC"
+    assert app_version({}) == ""
+
+
+@pytest.mark.unit
+def test_read_item_cached() -> None:
+    # * Private to the test run, see `conftest.py`
+    assert main.item_cache.path.is_relative_to(os.environ["APP_CACHE_DIR"])
+    main.item_cache.clear()
+    client = TestClient(main.app)
+
+    first = client.get("/items/5?q=somequery")
+    second = client.get("/items/5?q=somequery")
+
+    assert first.json() == second.json() == {"item_id": 5, "q": "somequery"}
+    stats = main.item_cache.stats()
+    assert (stats.hits, stats.misses) == (1, 1)
@@ -0,0 +1,50 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+
+from .streaming import ndjson_chunks
+
+
+async def _collect(chunks: AsyncIterator[bytes]) -> list[bytes]:
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.unit
+def test_ndjson_chunks() -> None:
+    records = [{"id": i, "name": f"item-{i}"} for i in range(5)]
+
+    chunks = asyncio.run(_collect(ndjson_chunks(records, chunk_records=2)))
+
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line) for line in lines] == records
+    assert chunks[0] == b'{"id":0,"name":"item-0"}\n{"id":1,"name":"item-1"}\n'
+
+
+@pytest.mark.unit
+def test_ndjson_chunks_empty() -> None:
+    assert asyncio.run(_collect(ndjson_chunks([]))) == []
+
+
+@pytest.mark.unit
+def test_ndjson_chunks_lazy() -> None:
+    produced: list[int] = []
+
+    def records() -> Iterator[int]:
+        for i in range(1_000_000):
+            produced.append(i)
+            yield i
+
+    async def take(count: int) -> None:
+        chunks = ndjson_chunks(records(), chunk_records=10)
+        for _ in range(count):
+            await anext(chunks)
+
+        await chunks.aclose()
+
+    asyncio.run(take(2))
+
+    # Records are only serialized as the consumer asks for more
+    assert len(produced) == 20
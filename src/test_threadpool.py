@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+from anyio import to_thread
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from . import threadpool
+from .benchmark import asgi_request, concurrent_latencies
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("environ", "tokens"),
+    [
+        ({}, 40),
+        ({"APP_THREADPOOL_TOKENS": ""}, 40),
+        ({"APP_THREADPOOL_TOKENS": "100"}, 100),
+    ],
+)
+def test_tokens(environ: dict[str, str], tokens: int) -> None:
+    assert threadpool.tokens(environ) == tokens
+
+
+@pytest.mark.unit
+def test_tokens_invalid() -> None:
+    with pytest.raises(ValueError, match="at least 1"):
+        threadpool.tokens({"APP_THREADPOOL_TOKENS": "0"})
+
+
+@pytest.mark.unit
+def test_lifespan(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("APP_THREADPOOL_TOKENS", "8")
+    app = FastAPI(lifespan=threadpool.lifespan)
+
+    @app.get("/tokens")
+    async def read_tokens() -> float:
+        return to_thread.current_default_thread_limiter().total_tokens
+
+    with TestClient(app) as client:
+        assert client.get("/tokens").json() == 8
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("tokens", [4, 12])
+def test_threadpool_tokens_bound_sync_routes(tokens: int) -> None:
+    app = FastAPI()
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    @app.get("/")
+    def read_blocking() -> None:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def request() -> None:
+        threadpool.configure(tokens)
+        await asgi_request(app, "/")
+
+    # * All requests arrive at once; a request arriving as a token is released can
+    # * take it ahead of the waiter notified
+    concurrent_latencies(request, concurrency=16, total=16)
+
+    # Requests beyond the threadpool size wait for a thread
+    assert peak[0] == tokens
@@ -0,0 +1,48 @@
+"""Threadpool running the sync routes of the application.
+
+Starlette runs sync routes and dependencies in a threadpool, limited by anyio
+to 40 threads per worker, so a request waits for a thread once 40 are busy.
+Routes doing no blocking work are async and never use it; for those that must
+stay sync, the limit is set at startup from the `APP_THREADPOOL_TOKENS`
+environment variable:
+
+    app = FastAPI(lifespan=threadpool.lifespan)
+"""
+
+import os
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from typing import Any
+
+from anyio import to_thread
+
+ENV_VARIABLE = "APP_THREADPOOL_TOKENS"
+
+# Default limit of anyio
+DEFAULT_TOKENS = 40
+
+
+def tokens(environ: Mapping[str, str]) -> int:
+    """Threadpool size set in the environment, or the default one."""
+    value = environ.get(ENV_VARIABLE)
+    if not value:
+        return DEFAULT_TOKENS
+
+    total = int(value)
+    if total < 1:
+        msg = f"{ENV_VARIABLE} must be at least 1, got {total}"
+        raise ValueError(msg)
+
+    return total
+
+
+def configure(total_tokens: int) -> None:
+    """Resize the threadpool of the running event loop."""
+    to_thread.current_default_thread_limiter().total_tokens = total_tokens
+
+
+@asynccontextmanager
+async def lifespan(_app: Any) -> AsyncIterator[None]:
+    """Lifespan sizing the threadpool from the environment."""
+    configure(tokens(os.environ))
+    yield
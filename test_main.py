@@ -0,0 +1,212 @@
+import asyncio
+import json
+import tracemalloc
+from collections.abc import Awaitable, Callable
+
+import pytest
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+
+from main import MAX_BATCH_SIZE, app, get_item
+from src.benchmark import asgi_request, concurrent_latencies, per_call, percentile
+from src.json_response import FastJSONResponse
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+def test_read_items() -> None:
+    response = client.post(
+        "/items:batch",
+        json={"items": [{"item_id": 1}, {"item_id": 2, "q": "x"}]},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [
+            {"item_id": 1, "q": None},
+            {"item_id": 2, "q": "x"},
+        ],
+    }
+    # Same as looking up each item
+    assert response.json()["items"][1] == client.get("/items/2?q=x").json()
+
+
+@pytest.mark.unit
+def test_read_items_limits() -> None:
+    too_many = {"items": [{"item_id": i} for i in range(MAX_BATCH_SIZE + 1)]}
+
+    assert client.post("/items:batch", json={"items": []}).json() == {"items": []}
+    assert client.post("/items:batch", json=too_many).status_code == 422
+    assert (
+        client.post("/items:batch", json={"items": [{"item_id": "a"}]}).status_code
+        == 422
+    )
+
+
+@pytest.mark.unit
+def test_read_items_compressed() -> None:
+    batch = {"items": [{"item_id": i} for i in range(MAX_BATCH_SIZE)]}
+
+    response = client.post(
+        "/items:batch",
+        json=batch,
+        headers={"accept-encoding": "gzip"},
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert len(response.json()["items"]) == MAX_BATCH_SIZE
+
+
+@pytest.mark.benchmark
+def test_benchmark_batch_throughput() -> None:
+    size = MAX_BATCH_SIZE
+    body = json.dumps({"items": [{"item_id": i, "q": "x"} for i in range(size)]})
+    headers = [(b"content-type", b"application/json")]
+
+    async def per_item() -> None:
+        for i in range(size):
+            await asgi_request(app, f"/items/{i}", query_string=b"q=x")
+
+    async def batch() -> None:
+        await asgi_request(
+            app,
+            "/items:batch",
+            method="POST",
+            headers=headers,
+            body=body.encode(),
+        )
+
+    per_item_time = per_call(per_item, number=5, repeat=3)
+    batch_time = per_call(batch, number=5, repeat=3)
+
+    print(
+        f"{size} items: per-item calls {per_item_time * 1e3:.2f} ms,"
+        f" batch {batch_time * 1e3:.2f} ms",
+    )
+    assert batch_time * 5 < per_item_time
+
+
+@pytest.mark.unit
+def test_stream_items() -> None:
+    with client.stream("GET", "/items/stream?start=3&end=1203&q=x") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = list(response.iter_lines())
+
+    assert len(lines) == 1200
+    assert json.loads(lines[0]) == {"item_id": 3, "q": "x"}
+    assert json.loads(lines[-1]) == {"item_id": 1202, "q": "x"}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "query",
+    ["start=5&end=5", "start=-1&end=5", "start=0&end=20000001", "end=5"],
+)
+def test_stream_items_invalid_range(query: str) -> None:
+    assert client.get(f"/items/stream?{query}").status_code == 422
+
+
+def _stream_peak_memory(end: int) -> tuple[int, int]:
+    """Peak memory allocated while streaming a range, and bytes received."""
+    received: list[int] = []
+
+    async def on_body(chunk: bytes) -> None:
+        received.append(len(chunk))
+
+    async def stream() -> None:
+        await asgi_request(
+            app,
+            "/items/stream",
+            query_string=f"start=0&end={end}".encode(),
+            on_body=on_body,
+        )
+
+    tracemalloc.start()
+    try:
+        asyncio.run(stream())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak, sum(received)
+
+
+@pytest.mark.benchmark
+def test_benchmark_stream_memory_flat() -> None:
+    small_peak, small_received = _stream_peak_memory(10_000)
+    large_peak, large_received = _stream_peak_memory(200_000)
+
+    print(
+        f"Peak memory streaming {small_received} bytes: {small_peak} bytes,"
+        f" {large_received} bytes: {large_peak} bytes",
+    )
+    assert large_received > 15 * small_received
+    assert large_peak < small_peak * 1.5
+
+
+@pytest.mark.benchmark
+def test_benchmark_json_responses() -> None:
+    # * The API before fast JSON responses: default responses, untyped sync route
+    baseline = FastAPI()
+    baseline.get("/")(lambda: {"Hello": "World"})
+    item = get_item(5, "x")
+
+    async def render_before() -> Response:
+        return JSONResponse(jsonable_encoder(item))
+
+    async def render_after() -> Response:
+        return FastJSONResponse(item)
+
+    root_before = per_call(lambda: asgi_request(baseline, "/"), number=500)
+    root_after = per_call(lambda: asgi_request(app, "/"), number=500)
+    # * Cached item responses are sent as-is; a miss renders the item like this
+    item_before = per_call(render_before, number=10_000)
+    item_after = per_call(render_after, number=10_000)
+
+    print(
+        f"read_root {root_before * 1e6:.1f} us before, {root_after * 1e6:.1f} us"
+        f" after; read_item rendering {item_before * 1e6:.2f} us before,"
+        f" {item_after * 1e6:.2f} us after",
+    )
+    assert root_after < root_before
+    assert item_after * 2 < item_before
+
+
+@pytest.mark.benchmark
+def test_benchmark_read_item_p99() -> None:
+    # The route as first implemented, sync and uncached, run in the threadpool
+    baseline = FastAPI()
+
+    @baseline.get("/items/{item_id}")
+    def read_item(item_id: int, q: str | None = None) -> dict:
+        return {"item_id": item_id, "q": q}
+
+    def p99(target: Callable[..., Awaitable[None]]) -> float:
+        latencies = concurrent_latencies(
+            lambda: asgi_request(target, "/items/5", query_string=b"q=somequery"),
+            concurrency=100,
+            total=4000,
+        )
+        return percentile(latencies, 99)
+
+    # * Both apps are warmed up, filling the cache of `app`
+    p99(baseline)
+    p99(app)
+
+    assert p99(app) < p99(baseline)
+
+
+@pytest.mark.unit
+def test_read_metrics() -> None:
+    client.get("/items/7")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'method="GET",route="/items/{item_id}",status="200"' in response.text